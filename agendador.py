@@ -0,0 +1,142 @@
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from perfilamento import Perfilador
+from conversa import criar_conversa
+from memoizacao import executar_com_cache
+
+# Análises que carregam modelos pesados (BERT, SpellChecker) e rodam em processos separados
+ANALISES_EM_PROCESSO = ('analise_sentimento', 'erros_ortograficos_por_pessoa')
+
+
+# Função para executar uma análise em uma thread, medindo só o tempo de CPU da própria thread
+# Devolve (resultado, registros do perfil) para que o perfil seja montado na ordem do relatório.
+def executar_em_thread(funcao, argumento, linhas, analise_detalhada, cache=None):
+    perfil = Perfilador(analise_detalhada, relogio_cpu=time.thread_time)
+    with perfil.medir(funcao.__name__, linhas) as registro:
+        resultado = executar_com_cache(cache, funcao, argumento, registro)
+    return resultado, perfil.registros
+
+
+# Função para executar várias análises de texto em sequência na mesma thread
+def executar_sequencia_em_thread(funcoes, mensagens, analise_detalhada, cache=None):
+    return [executar_em_thread(funcao, mensagens, len(mensagens), analise_detalhada, cache) for funcao in funcoes]
+
+
+# Função para buscar no cache o resultado de uma análise pesada antes de enviá-la a um processo
+# Devolve (resultado, registros do perfil), ou None se o resultado não estiver guardado.
+def ler_do_cache(cache, funcao, mensagens, analise_detalhada):
+    perfil = Perfilador(analise_detalhada)
+    with perfil.medir(funcao.__name__, len(mensagens)) as registro:
+        resultado = cache.ler(cache.chave(funcao, mensagens))
+        registro['cache'] = resultado is not None
+    return (resultado, perfil.registros) if resultado is not None else None
+
+
+# Função executada no processo de trabalho para carregar o modelo antes de a conversa estar pronta
+# (o modelo fica no cache do processo; só None volta para o processo principal).
+# Uma falha aqui não interrompe o pipeline: a análise chama o carregador de novo quando precisa do modelo
+# e falha nesse ponto, como falharia na execução sequencial.
+def preparar_processo(carregar_modelo):
+    try:
+        carregar_modelo()
+    except Exception:
+        pass
+
+
+# Função executada no processo de trabalho: remonta a Conversa a partir das linhas materializadas
+# (uma Conversa mapeada em memória não pode ser enviada a outro processo) e executa a análise.
+def executar_em_processo(funcao, linhas, analise_detalhada):
+    mensagens = criar_conversa(linhas)
+    perfil = Perfilador(analise_detalhada)
+    with perfil.medir(funcao.__name__, len(mensagens)):
+        resultado = funcao(mensagens)
+    return resultado, perfil.registros
+
+
+# Função para executar o pipeline de análises com as etapas independentes sobrepostas:
+# - a mídia (hash das figurinhas, varredura dos áudios) roda em threads de E/S, junto com a leitura da conversa;
+# - sentimento e correção ortográfica rodam cada uma em seu processo; os modelos com função em 'preparar'
+#   (por nome da análise) começam a carregar logo no início, enquanto a conversa ainda está sendo lida;
+# - as demais análises de texto rodam em uma thread enquanto isso.
+# carregar_mensagens é chamada em uma thread e devolve a Conversa. Os resultados e os registros de perfil
+# são montados na ordem fixa dos registros de análises, independentemente de qual termina primeiro.
+# Com um cache de resultados, as análises guardadas não são recalculadas; nesse caso os modelos só começam
+# a carregar depois de a conversa ser lida, e apenas para as análises pesadas que não estavam no cache.
+async def executar_pipeline(carregar_mensagens, pastas, analises_midia, analises_texto, perfil, selecionadas=None,
+                            desde=None, ate=None, contar_arquivos=None, preparar=None, threads=4, cache=None):
+    laco = asyncio.get_running_loop()
+    detalhada = perfil.analise_detalhada
+    preparar = preparar or {}
+    funcoes_texto = [funcao for funcao in analises_texto if selecionadas is None or funcao.__name__ in selecionadas]
+    em_processo = [funcao for funcao in funcoes_texto if funcao.__name__ in ANALISES_EM_PROCESSO]
+    na_thread = [funcao for funcao in funcoes_texto if funcao.__name__ not in ANALISES_EM_PROCESSO]
+
+    # 'spawn' evita copiar, com fork, um processo que já tem threads de E/S em andamento
+    contexto = multiprocessing.get_context('spawn')
+    processos = {funcao.__name__: ProcessPoolExecutor(max_workers=1, mp_context=contexto) for funcao in em_processo}
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as entrada_saida:
+            def aquecer(nomes):
+                return [laco.run_in_executor(processos[nome], preparar_processo, carregar_modelo)
+                        for nome, carregar_modelo in preparar.items() if nome in nomes]
+
+            aquecimentos = [] if cache else aquecer(processos)
+            tarefas_midia = []
+            for funcao, argumento in analises_midia:
+                if selecionadas is None or funcao.__name__ in selecionadas:
+                    pasta = pastas[argumento]
+                    linhas = contar_arquivos(pasta) if contar_arquivos else None
+                    tarefas_midia.append(laco.run_in_executor(entrada_saida, executar_em_thread, funcao, pasta,
+                                                              linhas, detalhada, cache))
+
+            concluidas_texto = {}
+            if funcoes_texto:
+                mensagens = await laco.run_in_executor(entrada_saida, carregar_mensagens)
+                if desde is not None or ate is not None:
+                    mensagens = mensagens.intervalo(desde, ate)
+                a_calcular = em_processo
+                if cache:
+                    for funcao in em_processo:
+                        lido = ler_do_cache(cache, funcao, mensagens, detalhada)
+                        if lido is not None:
+                            concluidas_texto[funcao.__name__] = lido
+                    a_calcular = [funcao for funcao in em_processo if funcao.__name__ not in concluidas_texto]
+                    aquecimentos = aquecer([funcao.__name__ for funcao in a_calcular])
+                tarefas_processo = []
+                if a_calcular:
+                    linhas = [tuple(mensagem) for mensagem in mensagens]
+                    tarefas_processo = [laco.run_in_executor(processos[funcao.__name__], executar_em_processo,
+                                                             funcao, linhas, detalhada) for funcao in a_calcular]
+                sequencia = await laco.run_in_executor(entrada_saida, executar_sequencia_em_thread, na_thread,
+                                                       mensagens, detalhada, cache)
+                concluidas_texto.update(zip([funcao.__name__ for funcao in na_thread], sequencia))
+                await asyncio.gather(*aquecimentos)
+                for funcao, (resultado, registros) in zip(a_calcular, await asyncio.gather(*tarefas_processo)):
+                    if cache:
+                        # O processo recebe só as linhas, então o resultado é guardado aqui, com a chave da Conversa
+                        cache.gravar(cache.chave(funcao, mensagens), resultado)
+                        for registro in registros:
+                            registro['cache'] = False
+                    concluidas_texto[funcao.__name__] = (resultado, registros)
+
+            concluidas = list(await asyncio.gather(*tarefas_midia))
+            concluidas.extend(concluidas_texto[funcao.__name__] for funcao in funcoes_texto)
+    finally:
+        for executor in processos.values():
+            executor.shutdown()
+
+    resultados = []
+    for resultado, registros in concluidas:
+        resultados.append(resultado)
+        perfil.registros.extend(registros)
+    return resultados
+
+
+# Função para executar o pipeline concorrente a partir de código síncrono
+def executar_concorrente(carregar_mensagens, pastas, analises_midia, analises_texto, perfil, selecionadas=None,
+                         desde=None, ate=None, contar_arquivos=None, preparar=None, threads=4, cache=None):
+    return asyncio.run(executar_pipeline(carregar_mensagens, pastas, analises_midia, analises_texto, perfil,
+                                         selecionadas, desde, ate, contar_arquivos, preparar, threads, cache))
@@ -0,0 +1,166 @@
+import os
+import heapq
+import pickle
+import shutil
+import sqlite3
+import tempfile
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+
+# Estimativa de memória por chave mantida no contador (entrada do dicionário, chave e contagem),
+# usada para converter o orçamento em MB em um número máximo de chaves
+BYTES_POR_CHAVE = 200
+
+# Entradas gravadas (e lidas) por vez em cada run despejado em disco
+ENTRADAS_POR_LOTE = 10_000
+
+# Número máximo de runs abertos juntos em um merge; acima disso os runs são mesclados em um só antes
+MAXIMO_RUNS = 64
+
+# Configuração usada pelos contadores criados sem parâmetros (definida pela linha de comando):
+# - orcamento_mb: memória máxima de cada contador (None = sem limite, tudo em memória)
+# - modo: 'disco' (runs ordenados em arquivos temporários) ou 'sqlite' (tabela em um banco temporário)
+# - pasta: onde os arquivos temporários são criados (None = pasta temporária do sistema)
+configuracao = {'orcamento_mb': None, 'modo': 'disco', 'pasta': None}
+
+
+# Função para definir o orçamento de memória e o modo de despejo dos contadores
+def configurar(orcamento_mb=None, modo='disco', pasta=None):
+    if modo not in ('disco', 'sqlite'):
+        raise ValueError("Modo deve ser 'disco' ou 'sqlite'")
+    configuracao.update(orcamento_mb=orcamento_mb, modo=modo, pasta=pasta)
+
+
+# Função para gravar (chave, total) ordenados em um run, em lotes de pickle
+def gravar_run(caminho, itens, tamanho_lote):
+    with open(caminho, 'wb') as f:
+        lote = []
+        for item in itens:
+            lote.append(item)
+            if len(lote) >= tamanho_lote:
+                pickle.dump(lote, f, pickle.HIGHEST_PROTOCOL)
+                lote = []
+        if lote:
+            pickle.dump(lote, f, pickle.HIGHEST_PROTOCOL)
+
+
+# Função para mesclar runs ordenados, somando os totais de chaves iguais
+def mesclar_runs(caminhos):
+    mesclados = heapq.merge(*(ler_run(caminho) for caminho in caminhos), key=itemgetter(0))
+    for chave, grupo in groupby(mesclados, key=itemgetter(0)):
+        yield chave, sum(total for _, total in grupo)
+
+
+# Função para ler um run gravado por gravar_run(), lote por lote
+def ler_run(caminho):
+    with open(caminho, 'rb') as f:
+        while True:
+            try:
+                lote = pickle.load(f)
+            except EOFError:
+                return
+            yield from lote
+
+
+# Contador (chave -> total) com orçamento de memória.
+# Enquanto cabe no orçamento, funciona como um Counter. Quando passa do limite, as contagens em memória
+# são despejadas como um run ordenado pela chave (ou somadas em uma tabela SQLite) e a memória é liberada;
+# itens() junta tudo no final com um merge de k vias. A memória de pico fica proporcional ao orçamento,
+# não ao número de chaves distintas. Use com 'with' para apagar os arquivos temporários.
+class ContadorExterno:
+    def __init__(self, orcamento_mb=None, modo=None, pasta=None):
+        orcamento_mb = configuracao['orcamento_mb'] if orcamento_mb is None else orcamento_mb
+        self.limite = None if orcamento_mb is None else max(1, int(orcamento_mb * 1024 * 1024) // BYTES_POR_CHAVE)
+        # No merge há um lote carregado por run, então os lotes dividem o orçamento entre os runs
+        self.tamanho_lote = (ENTRADAS_POR_LOTE if self.limite is None
+                             else max(1, min(ENTRADAS_POR_LOTE, self.limite // MAXIMO_RUNS)))
+        self.modo = modo or configuracao['modo']
+        self.pasta = pasta or configuracao['pasta']
+        self.memoria = Counter()
+        self.runs = []
+        self.contador_runs = 0
+        self.banco = None
+        self.temporaria = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        self.fechar()
+
+    # Função para somar 'quantidade' a uma chave
+    def adicionar(self, chave, quantidade=1):
+        self.memoria[chave] += quantidade
+        if self.limite is not None and len(self.memoria) > self.limite:
+            self.despejar()
+
+    # Função para somar 1 a cada chave de um iterável (como Counter.update)
+    def atualizar(self, chaves):
+        self.memoria.update(chaves)
+        if self.limite is not None and len(self.memoria) > self.limite:
+            self.despejar()
+
+    # Função para mover as contagens em memória para o disco
+    def despejar(self):
+        if not self.memoria:
+            return
+        if self.temporaria is None:
+            if self.pasta:
+                os.makedirs(self.pasta, exist_ok=True)
+            self.temporaria = tempfile.mkdtemp(prefix='contador_', dir=self.pasta)
+        if self.modo == 'sqlite':
+            if self.banco is None:
+                self.banco = sqlite3.connect(os.path.join(self.temporaria, 'contagem.sqlite'))
+                self.banco.execute('CREATE TABLE contagem (chave BLOB PRIMARY KEY, total) WITHOUT ROWID')
+            self.banco.executemany('INSERT INTO contagem VALUES (?, ?) '
+                                   'ON CONFLICT(chave) DO UPDATE SET total = total + excluded.total',
+                                   ((pickle.dumps(chave), total) for chave, total in self.memoria.items()))
+            self.banco.commit()
+        else:
+            self.runs.append(self.novo_run(sorted(self.memoria.items(), key=itemgetter(0))))
+            if len(self.runs) >= MAXIMO_RUNS:
+                self.compactar()
+        self.memoria = Counter()
+
+    # Função para gravar um novo run na pasta temporária
+    def novo_run(self, itens):
+        self.contador_runs += 1
+        caminho = os.path.join(self.temporaria, f'run_{self.contador_runs}.pickle')
+        gravar_run(caminho, itens, self.tamanho_lote)
+        return caminho
+
+    # Função para mesclar todos os runs em um só, limitando os arquivos e lotes abertos no merge final
+    def compactar(self):
+        mesclado = self.novo_run(mesclar_runs(self.runs))
+        for caminho in self.runs:
+            os.remove(caminho)
+        self.runs = [mesclado]
+
+    # Função para percorrer os totais finais (chave, total).
+    # Sem despejos, na ordem de inserção (como um Counter); no modo 'disco', em ordem de chave.
+    def itens(self):
+        if not self.runs and self.banco is None:
+            yield from self.memoria.items()
+            return
+        self.despejar()
+        if self.banco is not None:
+            for chave, total in self.banco.execute('SELECT chave, total FROM contagem'):
+                yield pickle.loads(chave), total
+            return
+        yield from mesclar_runs(self.runs)
+
+    # Função para obter as n chaves mais frequentes sem carregar todas (empates ficam na ordem de itens())
+    def mais_comuns(self, n):
+        return heapq.nlargest(n, self.itens(), key=itemgetter(1))
+
+    # Função para apagar os arquivos temporários
+    def fechar(self):
+        if self.banco is not None:
+            self.banco.close()
+            self.banco = None
+        if self.temporaria is not None:
+            shutil.rmtree(self.temporaria, ignore_errors=True)
+            self.temporaria = None
+        self.runs = []
+        self.memoria = Counter()
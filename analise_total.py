@@ -1,9 +1,16 @@
 import re
 import os
 import hashlib
-import emoji
+import argparse
 from collections import Counter
 from datetime import datetime
+from functools import lru_cache, partial
+from perfilamento import Perfilador
+from resultados import Resultado, salvar_relatorio
+from sessoes import INTERVALO_SESSAO_PADRAO
+from conversa import criar_conversa, criar_conversa_colunas, impressao_digital
+from agregacao_externa import ContadorExterno, configurar as configurar_agregacao
+from memoizacao import CacheResultados, executar_com_cache, versao_codigo, PASTA_RESULTADOS, TAMANHO_MAXIMO_MB
 
 
 # Função para calcular o hash de um arquivo (usado para identificar figurinhas duplicadas)
@@ -15,11 +22,12 @@ def calcular_hash_arquivo(caminho_arquivo):
     return hash_md5.hexdigest()
 
 # Função para encontrar a figurinha mais recorrente em uma pasta
-def encontrar_figurinha_recorrente(pasta, file):
+# Os avisos (pasta inexistente, erros de leitura) são acumulados na lista 'erros'
+def encontrar_figurinha_recorrente(pasta, erros):
     figurinhas = []
     hash_para_arquivo = {}
     if not os.path.exists(pasta):
-        file.write(f"A pasta '{pasta}' não existe.\n")
+        erros.append(f"A pasta '{pasta}' não existe.")
         return None, None
     for arquivo in os.listdir(pasta):
         caminho_arquivo = os.path.join(pasta, arquivo)
@@ -29,7 +37,7 @@ def encontrar_figurinha_recorrente(pasta, file):
                 figurinhas.append(hash_arquivo)
                 hash_para_arquivo[hash_arquivo] = caminho_arquivo
             except Exception as e:
-                file.write(f"Erro ao processar {arquivo}: {e}\n")
+                erros.append(f"Erro ao processar {arquivo}: {e}")
     contador_figurinhas = Counter(figurinhas)
     if contador_figurinhas:
         hash_mais_recorrente, ocorrencias = contador_figurinhas.most_common(1)[0]
@@ -37,10 +45,10 @@ def encontrar_figurinha_recorrente(pasta, file):
     return None, None
 
 # Função para encontrar os N arquivos de áudio .opus mais longos em uma pasta com base no tamanho do arquivo
-def encontrar_audios_maiores(pasta, file, quantidade=10):
+def encontrar_audios_maiores(pasta, erros, quantidade=10):
     audios = []
     if not os.path.exists(pasta):
-        file.write(f"A pasta '{pasta}' não existe.\n")
+        erros.append(f"A pasta '{pasta}' não existe.")
         return []
     for arquivo in os.listdir(pasta):
         caminho_arquivo = os.path.join(pasta, arquivo)
@@ -49,13 +57,32 @@ def encontrar_audios_maiores(pasta, file, quantidade=10):
                 tamanho = os.path.getsize(caminho_arquivo)
                 audios.append((arquivo, tamanho))
             except Exception as e:
-                file.write(f"Erro ao processar {arquivo}: {e}\n")
+                erros.append(f"Erro ao processar {arquivo}: {e}")
     audios_ordenados = sorted(audios, key=lambda x: x[1], reverse=True)
     return audios_ordenados[:quantidade]
 
-# Função para processar e limpar os dados (removendo datas, horas, etc.)
-# Função para processar e limpar os dados (removendo datas, horas, etc.)
-def media_mensagens_diarias_por_contato(mensagens, file):
+# Função para montar o resultado da figurinha mais usada
+def figurinha_mais_usada(pasta_midia):
+    erros = []
+    figurinha, ocorrencias = encontrar_figurinha_recorrente(pasta_midia, erros)
+    texto = ''.join(f"{erro}\n" for erro in erros)
+    texto += f"Figurinha mais usada: {figurinha}, Ocorrências: {ocorrencias}\n\n"
+    return Resultado('figurinha_mais_usada', {'arquivo': figurinha, 'ocorrencias': ocorrencias, 'erros': erros}, texto)
+
+# Função para montar o resultado dos maiores áudios
+def maiores_audios(pasta_audio, quantidade=10):
+    erros = []
+    audios = encontrar_audios_maiores(pasta_audio, erros, quantidade)
+    linhas = [f"{erro}\n" for erro in erros]
+    linhas.append("Maiores arquivos de áudio:\n")
+    for i, (arquivo, tamanho) in enumerate(audios, start=1):
+        linhas.append(f"{i}. {arquivo} - Tamanho: {tamanho / 1024:.2f} KB\n")
+    linhas.append("\n")
+    dados = {'audios': [{'arquivo': arquivo, 'bytes': tamanho} for arquivo, tamanho in audios], 'erros': erros}
+    return Resultado('maiores_audios', dados, ''.join(linhas))
+
+# Função para calcular a média de mensagens diárias de cada contato
+def media_mensagens_diarias_por_contato(mensagens):
     from collections import defaultdict
 
     mensagens_por_dia = defaultdict(lambda: defaultdict(int))
@@ -72,118 +99,167 @@ def media_mensagens_diarias_por_contato(mensagens, file):
         dias_participados = len(mensagens_por_dia[usuario])
         medias[usuario] = total_mensagens / dias_participados if dias_participados else 0
 
-    file.write("Média de mensagens diárias por contato:\n")
+    linhas = ["Média de mensagens diárias por contato:\n"]
     for usuario, media in medias.items():
-        file.write(f"{usuario}: {media:.2f} mensagens por dia\n")
-    file.write("\n")
-
-
-def numero_palavras_por_pessoa(mensagens, file):
-    contador_palavras = Counter()
-    for _, _, usuario, conteudo in mensagens:
-        if len(conteudo) <= 500:
-            palavras = conteudo.split()
-            contador_palavras[usuario] += len(palavras)
-    file.write("Número de palavras enviadas por cada participante (ignorando mensagens com mais de 500 caracteres):\n")
+        linhas.append(f"{usuario}: {media:.2f} mensagens por dia\n")
+    linhas.append("\n")
+    return Resultado('media_mensagens_diarias_por_contato', medias, ''.join(linhas))
+
+
+# As contagens saem dos arrays da Conversa, então na conversa mapeada nenhum texto é decodificado.
+def numero_palavras_por_pessoa(mensagens):
+    import numpy as np
+    curtas = mensagens.comprimentos() <= 500
+    usuario_id = mensagens.usuario_id[curtas]
+    n_usuarios = len(mensagens.nomes)
+    palavras = np.bincount(usuario_id, weights=mensagens.contagem_palavras()[curtas], minlength=n_usuarios)
+    com_mensagem = np.bincount(usuario_id, minlength=n_usuarios) > 0
+    contador_palavras = {mensagens.nomes[i]: int(palavras[i]) for i in np.flatnonzero(com_mensagem)}
+    linhas = ["Número de palavras enviadas por cada participante (ignorando mensagens com mais de 500 caracteres):\n"]
     for usuario, total_palavras in contador_palavras.items():
-        file.write(f"{usuario}: {total_palavras} palavras\n")
-    file.write("\n")
-
-def tempo_resposta_medio(mensagens, file):
-    tempos_resposta = {}
-    ultimas_mensagens = {}
-
-    for data_str, hora_str, usuario, _ in mensagens:
-        tempo_atual = datetime.strptime(f'{data_str} {hora_str}', '%d/%m/%Y %H:%M')
-        for outro_usuario in ultimas_mensagens:
-            if outro_usuario != usuario:
-                delta = (tempo_atual - ultimas_mensagens[outro_usuario]).total_seconds()
-                if usuario not in tempos_resposta:
-                    tempos_resposta[usuario] = []
-                tempos_resposta[usuario].append(delta)
-        ultimas_mensagens[usuario] = tempo_atual
-
-    medias_resposta = {usuario: sum(tempos)/len(tempos) for usuario, tempos in tempos_resposta.items() if tempos}
-    file.write("Tempo de resposta médio de cada usuário (em segundos):\n")
+        linhas.append(f"{usuario}: {total_palavras} palavras\n")
+    linhas.append("\n")
+    return Resultado('numero_palavras_por_pessoa', dict(contador_palavras), ''.join(linhas))
+
+# Função para calcular o tempo médio que cada usuário leva desde a última mensagem de outra pessoa
+# Só conta respostas dentro da mesma sessão de conversa, para que pausas longas (como a noite) não entrem na média.
+def tempo_resposta_medio(mensagens, intervalo_sessao=INTERVALO_SESSAO_PADRAO):
+    from sessoes import segmentar_sessoes, tempos_resposta, media_por_usuario
+
+    timestamps, usuario_id, nomes = mensagens.timestamps, mensagens.usuario_id, mensagens.nomes
+    sessoes = segmentar_sessoes(timestamps, usuario_id, intervalo_sessao)
+    indices, tempos = tempos_resposta(timestamps, usuario_id, sessoes.sessao_id)
+    medias_resposta = {nomes[usuario]: media
+                       for usuario, media in media_por_usuario(usuario_id[indices], tempos, len(nomes)).items()}
+
+    linhas = ["Tempo de resposta médio de cada usuário (em segundos):\n"]
     for usuario, media in medias_resposta.items():
-        file.write(f"{usuario}: {media:.2f} segundos\n")
-    file.write("\n")
-
-def conexoes_entre_membros(mensagens, file):
-    conexoes = Counter()
-    for i in range(1, len(mensagens)):
-        usuario_anterior = mensagens[i-1][2]
-        usuario_atual = mensagens[i][2]
-        if usuario_anterior != usuario_atual:
-            par = (usuario_anterior, usuario_atual)
-            conexoes[par] += 1
-    file.write("Conexões entre membros (quem interage mais com quem):\n")
-    for (usuario1, usuario2), freq in conexoes.most_common():
-        file.write(f"{usuario1} -> {usuario2}: {freq} interações\n")
-    file.write("\n")
-def uso_girias_abreviacoes(mensagens, file):
+        linhas.append(f"{usuario}: {media:.2f} segundos\n")
+    linhas.append("\n")
+    return Resultado('tempo_resposta_medio', medias_resposta, ''.join(linhas))
+
+# Função para identificar quem inicia as conversas (a primeira mensagem de cada sessão)
+def quem_inicia_conversas(mensagens, intervalo_sessao=INTERVALO_SESSAO_PADRAO):
+    import numpy as np
+    from sessoes import segmentar_sessoes, media_por_usuario
+
+    timestamps, usuario_id, nomes = mensagens.timestamps, mensagens.usuario_id, mensagens.nomes
+    sessoes = segmentar_sessoes(timestamps, usuario_id, intervalo_sessao)
+    iniciadas = np.bincount(sessoes.iniciador, minlength=len(nomes))
+    tamanho_medio = media_por_usuario(sessoes.iniciador, sessoes.tamanho, len(nomes))
+
+    linhas = [f"Quem inicia as conversas ({len(sessoes.inicio)} sessões, "
+              f"separadas por mais de {intervalo_sessao // 60} minutos de silêncio):\n"]
+    dados = {}
+    for usuario in iniciadas.argsort()[::-1]:
+        if not iniciadas[usuario]:
+            break
+        dados[nomes[usuario]] = {'sessoes': int(iniciadas[usuario]), 'tamanho_medio': tamanho_medio[usuario]}
+        linhas.append(f"{nomes[usuario]}: {iniciadas[usuario]} conversas iniciadas "
+                      f"(média de {tamanho_medio[usuario]:.1f} mensagens)\n")
+    linhas.append("\n")
+    return Resultado('quem_inicia_conversas', dados, ''.join(linhas))
+
+# Função para mapear quem interage com quem, usando o grafo de interações esparso
+# Cada mensagem credita os falantes recentes (até 'max_anteriores', dentro de 'janela' segundos) com peso
+# que decai pelo tempo; o relatório lista só as 'top_n' conexões mais fortes, além da centralidade e das comunidades.
+def conexoes_entre_membros(mensagens, top_n=20, janela=600, meia_vida=120, max_anteriores=5):
+    import numpy as np
+    from grafo_interacoes import construir_grafo, graus, pagerank, comunidades
+
+    timestamps, usuario_id, nomes = mensagens.timestamps, mensagens.usuario_id, mensagens.nomes
+    grafo = construir_grafo(usuario_id, timestamps, len(nomes), janela, meia_vida, max_anteriores)
+    grau_saida, grau_entrada = graus(grafo)
+    rank = pagerank(grafo)
+    comunidade = comunidades(grafo)
+
+    linhas = ["Conexões entre membros (quem interage mais com quem):\n"]
+    arestas = []
+    for indice in grafo.peso.argsort()[::-1][:top_n]:
+        usuario1, usuario2 = nomes[grafo.origem[indice]], nomes[grafo.destino[indice]]
+        peso = float(grafo.peso[indice])
+        linhas.append(f"{usuario1} -> {usuario2}: {peso:.2f} interações\n")
+        arestas.append({'de': usuario1, 'para': usuario2, 'interacoes': peso})
+
+    # Em um recorte de datas, usuários sem mensagens no período ficam de fora
+    ativos = np.bincount(usuario_id, minlength=len(nomes)) > 0
+    linhas.append("\nMembros mais centrais (PageRank):\n")
+    centralidade = {}
+    for indice in rank.argsort()[::-1]:
+        if not ativos[indice]:
+            continue
+        centralidade[nomes[indice]] = {'pagerank': float(rank[indice]), 'respondido': float(grau_saida[indice]),
+                                       'respondeu': float(grau_entrada[indice])}
+    for usuario, valores in list(centralidade.items())[:top_n]:
+        linhas.append(f"{usuario}: {valores['pagerank']:.4f} (respondido {valores['respondido']:.1f}, "
+                      f"respondeu {valores['respondeu']:.1f})\n")
+
+    grupos = [[] for _ in range(int(comunidade.max()) + 1)] if len(nomes) else []
+    for indice in rank.argsort()[::-1]:
+        if ativos[indice]:
+            grupos[comunidade[indice]].append(nomes[indice])
+    grupos = [grupo for grupo in grupos if grupo]
+    linhas.append("\nGrupos de conversa:\n")
+    for i, grupo in enumerate(grupos[:top_n], start=1):
+        linhas.append(f"{i}. {', '.join(grupo)}\n")
+    linhas.append("\n")
+    dados = {'arestas': arestas, 'centralidade': centralidade, 'comunidades': grupos}
+    return Resultado('conexoes_entre_membros', dados, ''.join(linhas))
+# Função para contar, por usuário do recorte, as ocorrências de uma lista de termos (palavras ou expressões)
+# Consulta o índice invertido da conversa, então o custo é o das listas de ocorrências, não o da conversa.
+def contar_termos_por_usuario(mensagens, termos):
+    import numpy as np
+    from indice_invertido import obter_indice
+    contagem = obter_indice(mensagens).contar_por_usuario(mensagens, termos)
+    presentes = np.bincount(mensagens.usuario_id, minlength=len(mensagens.nomes)) > 0
+    return {mensagens.nomes[i]: int(contagem[i]) for i in np.flatnonzero(presentes)}
+
+def uso_girias_abreviacoes(mensagens):
     girias = ['blz', 'vc', 'pq', 'tb', 'td', 'q', 'kd', 'n', 'vlw', 'vlr', 'qq', 'eh', 'krl', 'mano', 'ta', 'tá', 'tmj', 'vlw', 'vcs', 'tbm', 'blz', 'aff', 'kkkk', 'kkk']
-    contagem_girias = Counter()
+    contagem_girias = contar_termos_por_usuario(mensagens, girias)
 
-    for _, _, usuario, conteudo in mensagens:
-        palavras = conteudo.lower().split()
-        count = sum(palavras.count(giria) for giria in girias)
-        contagem_girias[usuario] += count
-
-    file.write("Uso de gírias e abreviações por participante:\n")
+    linhas = ["Uso de gírias e abreviações por participante:\n"]
     for usuario, total in contagem_girias.items():
-        file.write(f"{usuario}: {total} gírias/abreviações\n")
-    file.write("\n")
-def nivel_formalidade(mensagens, file):
-    formalidade_por_usuario = {}
-
-    for _, _, usuario, conteudo in mensagens:
-        palavras = conteudo.split()
-        total_palavras = len(palavras)
-        if total_palavras == 0:
-            continue
-        palavras_formais = sum(1 for palavra in palavras if palavra.istitle())
-        porcentagem_formal = (palavras_formais / total_palavras) * 100
-
-        if usuario not in formalidade_por_usuario:
-            formalidade_por_usuario[usuario] = []
-
-        formalidade_por_usuario[usuario].append(porcentagem_formal)
-
-    file.write("Nível de formalidade por participante (baseado no uso de palavras iniciadas com maiúsculas):\n")
-    for usuario, formalidades in formalidade_por_usuario.items():
-        media_formalidade = sum(formalidades) / len(formalidades)
-        file.write(f"{usuario}: {media_formalidade:.2f}% palavras formais\n")
-    file.write("\n")
-def analise_estilo_escrita(mensagens, file):
-    estilo_por_usuario = {}
-
-    for _, _, usuario, conteudo in mensagens:
-        num_maiusculas = sum(1 for c in conteudo if c.isupper())
-        num_caracteres = len(conteudo)
-        num_pontuacao = sum(1 for c in conteudo if c in '.,!?;:')
-        if num_caracteres == 0:
-            continue
-
-        porcentagem_maiusculas = (num_maiusculas / num_caracteres) * 100
-        porcentagem_pontuacao = (num_pontuacao / num_caracteres) * 100
-
-        if usuario not in estilo_por_usuario:
-            estilo_por_usuario[usuario] = {'maiusculas': [], 'pontuacao': []}
-
-        estilo_por_usuario[usuario]['maiusculas'].append(porcentagem_maiusculas)
-        estilo_por_usuario[usuario]['pontuacao'].append(porcentagem_pontuacao)
-
-    file.write("Análise do estilo de escrita de cada usuário (uso de maiúsculas e pontuação):\n")
-    for usuario, dados in estilo_por_usuario.items():
-        media_maiusculas = sum(dados['maiusculas']) / len(dados['maiusculas'])
-        media_pontuacao = sum(dados['pontuacao']) / len(dados['pontuacao'])
-        file.write(f"{usuario}: {media_maiusculas:.2f}% maiúsculas, {media_pontuacao:.2f}% pontuação\n")
-    file.write("\n")
-def erros_ortograficos_por_pessoa(mensagens, file):
+        linhas.append(f"{usuario}: {total} gírias/abreviações\n")
+    linhas.append("\n")
+    return Resultado('uso_girias_abreviacoes', contagem_girias, ''.join(linhas))
+# As porcentagens por mensagem são calculadas em blocos e só as somas por usuário são mantidas.
+def nivel_formalidade(mensagens):
+    from estatisticas_caracteres import porcentagens_medias_por_usuario
+    contagens, medias = porcentagens_medias_por_usuario(mensagens.textos, mensagens.usuario_id, len(mensagens.nomes),
+                                                        [('palavras_titulo', 'palavras')])
+
+    linhas = ["Nível de formalidade por participante (baseado no uso de palavras iniciadas com maiúsculas):\n"]
+    formalidade = {}
+    for u in contagens[0].nonzero()[0].tolist():
+        formalidade[mensagens.nomes[u]] = float(medias[0, u])
+        linhas.append(f"{mensagens.nomes[u]}: {medias[0, u]:.2f}% palavras formais\n")
+    linhas.append("\n")
+    return Resultado('nivel_formalidade', formalidade, ''.join(linhas))
+# Maiúsculas e pontuação de cada mensagem são contadas em uma passada vetorizada sobre os caracteres.
+def analise_estilo_escrita(mensagens):
+    from estatisticas_caracteres import porcentagens_medias_por_usuario
+    contagens, medias = porcentagens_medias_por_usuario(mensagens.textos, mensagens.usuario_id, len(mensagens.nomes),
+                                                        [('maiusculas', 'caracteres'), ('pontuacao', 'caracteres')],
+                                                        palavras=False)
+
+    linhas = ["Análise do estilo de escrita de cada usuário (uso de maiúsculas e pontuação):\n"]
+    estilo = {}
+    for u in contagens[0].nonzero()[0].tolist():
+        media_maiusculas, media_pontuacao = float(medias[0, u]), float(medias[1, u])
+        estilo[mensagens.nomes[u]] = {'maiusculas': media_maiusculas, 'pontuacao': media_pontuacao}
+        linhas.append(f"{mensagens.nomes[u]}: {media_maiusculas:.2f}% maiúsculas, {media_pontuacao:.2f}% pontuação\n")
+    linhas.append("\n")
+    return Resultado('analise_estilo_escrita', estilo, ''.join(linhas))
+# Função para carregar o corretor ortográfico uma única vez por processo
+@lru_cache(maxsize=None)
+def carregar_corretor_ortografico():
     from spellchecker import SpellChecker
 
-    spell = SpellChecker(language='pt')
+    return SpellChecker(language='pt')
+
+def erros_ortograficos_por_pessoa(mensagens):
+    spell = carregar_corretor_ortografico()
     erros_por_usuario = Counter()
 
     for _, _, usuario, conteudo in mensagens:
@@ -191,85 +267,127 @@ def erros_ortograficos_por_pessoa(mensagens, file):
         erros = spell.unknown(palavras)
         erros_por_usuario[usuario] += len(erros)
 
-    file.write("Quantidade de erros ortográficos por pessoa:\n")
+    linhas = ["Quantidade de erros ortográficos por pessoa:\n"]
     for usuario, total_erros in erros_por_usuario.items():
-        file.write(f"{usuario}: {total_erros} erros\n")
-    file.write("\n")
-def analise_sentimento(mensagens, file):
+        linhas.append(f"{usuario}: {total_erros} erros\n")
+    linhas.append("\n")
+    return Resultado('erros_ortograficos_por_pessoa', dict(erros_por_usuario), ''.join(linhas))
+# Função para carregar o modelo de análise de sentimento uma única vez por processo
+@lru_cache(maxsize=None)
+def carregar_modelo_sentimento():
     from transformers import pipeline
 
     # Carregando o modelo de análise de sentimento em português
-    sentiment_analysis = pipeline("sentiment-analysis", model="nlptown/bert-base-multilingual-uncased-sentiment", framework="pt")
-
-
-    sentimento_por_usuario = {'Positivo': Counter(), 'Negativo': Counter(), 'Neutro': Counter()}
-
-    for _, _, usuario, conteudo in mensagens:
-        try:
-            resultado = sentiment_analysis(conteudo[:512])[0]  # Limitar a 512 caracteres
-            label = resultado['label']
-            if 'positive' in label.lower():
-                sentimento_por_usuario['Positivo'][usuario] += 1
-            elif 'negative' in label.lower():
-                sentimento_por_usuario['Negativo'][usuario] += 1
-            else:
-                sentimento_por_usuario['Neutro'][usuario] += 1
-        except Exception:
-            continue  # Ignorar erros na análise
-
-    file.write("Análise de sentimento por usuário:\n")
+    return pipeline("sentiment-analysis", model="nlptown/bert-base-multilingual-uncased-sentiment", framework="pt")
+
+# Função para classificar o sentimento das mensagens por usuário, em cascata:
+# o léxico em português (sentimento_lexico) rotula todas as mensagens e só as de baixa confiança vão para o BERT.
+def analise_sentimento(mensagens):
+    import numpy as np
+    from sentimento_lexico import classificar_cascata, NOMES_SENTIMENTO, POSITIVO, NEGATIVO, NEUTRO
+
+    rotulos, escaladas = classificar_cascata(mensagens.textos, carregar_modelo_sentimento)
+
+    # Contagem por (sentimento, usuário); os usuários de cada sentimento ficam na ordem da primeira mensagem
+    usuario_id, nomes = mensagens.usuario_id, mensagens.nomes
+    sentimento_por_usuario = {}
+    for codigo in (POSITIVO, NEGATIVO, NEUTRO):
+        indices = np.flatnonzero(rotulos == codigo)
+        usuarios, primeira, contagens = np.unique(usuario_id[indices], return_index=True, return_counts=True)
+        ordem = np.argsort(primeira, kind='stable')
+        sentimento_por_usuario[NOMES_SENTIMENTO[codigo]] = {nomes[usuario]: int(total) for usuario, total
+                                                            in zip(usuarios[ordem].tolist(), contagens[ordem])}
+
+    linhas = ["Análise de sentimento por usuário:\n"]
     for sentimento, usuarios in sentimento_por_usuario.items():
-        file.write(f"\nSentimento {sentimento}:\n")
+        linhas.append(f"\nSentimento {sentimento}:\n")
         for usuario, count in usuarios.items():
-            file.write(f"{usuario}: {count} mensagens\n")
-    file.write("\n")
-def palavras_carinhosas_por_pessoa(mensagens, file):
+            linhas.append(f"{usuario}: {count} mensagens\n")
+    linhas.append(f"\nMensagens classificadas pelo modelo: {len(escaladas)} de {len(rotulos)}\n\n")
+    dados = {sentimento: dict(usuarios) for sentimento, usuarios in sentimento_por_usuario.items()}
+    return Resultado('analise_sentimento', dados, ''.join(linhas))
+def palavras_carinhosas_por_pessoa(mensagens):
     palavras_carinhosas = ['parabéns', 'obrigado', 'valeu', 'bom trabalho', 'gostei', 'amigo', 'amiga', 'querido', 'querida', 'saudades', 'desculpa', 'amo', 'adoro']
-    contagem_carinhosas = Counter()
-
-    for _, _, usuario, conteudo in mensagens:
-        palavras = conteudo.lower().split()
-        count = sum(palavras.count(palavra) for palavra in palavras_carinhosas)
-        contagem_carinhosas[usuario] += count
+    contagem_carinhosas = contar_termos_por_usuario(mensagens, palavras_carinhosas)
 
-    file.write("Uso de palavras carinhosas ou de incentivo por usuário:\n")
+    linhas = ["Uso de palavras carinhosas ou de incentivo por usuário:\n"]
     for usuario, total in contagem_carinhosas.items():
-        file.write(f"{usuario}: {total} palavras carinhosas\n")
-    file.write("\n")
-def expressoes_frustracao_por_pessoa(mensagens, file):
+        linhas.append(f"{usuario}: {total} palavras carinhosas\n")
+    linhas.append("\n")
+    return Resultado('palavras_carinhosas_por_pessoa', contagem_carinhosas, ''.join(linhas))
+def expressoes_frustracao_por_pessoa(mensagens):
     expressoes_frustracao = ['estressado', 'cansado', 'não aguento', 'chateado', 'raiva', 'triste', 'irritado', 'frustrado', 'pior', 'odeio']
-    contagem_frustracao = Counter()
+    contagem_frustracao = contar_termos_por_usuario(mensagens, expressoes_frustracao)
 
-    for _, _, usuario, conteudo in mensagens:
-        palavras = conteudo.lower().split()
-        count = sum(palavras.count(exp) for exp in expressoes_frustracao)
-        contagem_frustracao[usuario] += count
-
-    file.write("Expressões de frustração ou desabafo por usuário:\n")
+    linhas = ["Expressões de frustração ou desabafo por usuário:\n"]
     for usuario, total in contagem_frustracao.items():
-        file.write(f"{usuario}: {total} expressões de frustração\n")
-    file.write("\n")
-def mensagens_mais_citadas(mensagens, file):
-    padrao_citacao = re.compile(r'^".+"$')
-    citacoes = Counter()
-
-    for _, _, _, conteudo in mensagens:
-        if padrao_citacao.match(conteudo):
-            citacoes[conteudo] += 1
-
-    mensagens_mais_citadas = citacoes.most_common(5)
-    file.write("Mensagens mais respondidas ou citadas:\n")
+        linhas.append(f"{usuario}: {total} expressões de frustração\n")
+    linhas.append("\n")
+    return Resultado('expressoes_frustracao_por_pessoa', contagem_frustracao, ''.join(linhas))
+# Só as mensagens entre aspas (marcadas sobre os arrays da Conversa) são decodificadas e contadas.
+def mensagens_mais_citadas(mensagens):
+    import numpy as np
+    citadas = np.flatnonzero(mensagens.entre_aspas())
+    with ContadorExterno() as citacoes:
+        citacoes.atualizar(mensagens.texto(i) for i in citadas)
+        mensagens_mais_citadas = citacoes.mais_comuns(5)
+
+    linhas = ["Mensagens mais respondidas ou citadas:\n"]
     for mensagem, count in mensagens_mais_citadas:
-        file.write(f"\"{mensagem}\": {count} citações\n")
-    file.write("\n")
-def mensagem_mais_longa(mensagens, file):
-    mensagem_maior = max(mensagens, key=lambda x: len(x[3]))
-    usuario = mensagem_maior[2]
-    conteudo = mensagem_maior[3]
+        linhas.append(f"\"{mensagem}\": {count} citações\n")
+    linhas.append("\n")
+    dados = [{'mensagem': mensagem, 'citacoes': count} for mensagem, count in mensagens_mais_citadas]
+    return Resultado('mensagens_mais_citadas', dados, ''.join(linhas))
+# Função para encontrar conteúdos repetidos ou encaminhados (correntes, avisos com pequenas edições)
+# As mensagens longas são agrupadas por MinHash + LSH; para os grupos mais repetidos, mostra quem
+# enviou primeiro e quem mais espalhou, além de quem mais repete conteúdo no total.
+# Anexos e mídias (bit MIDIA das características) não são conteúdo repetido e ficam de fora.
+def mensagens_encaminhadas(mensagens, min_caracteres=50, top_n=5):
+    import numpy as np
+    from duplicatas import agrupar_quase_duplicatas
+    from caracteristicas import caracteristicas_mensagens, MIDIA
+    anexos = (caracteristicas_mensagens(mensagens) & MIDIA) != 0
+    candidatas = np.flatnonzero((mensagens.comprimentos() >= min_caracteres) & ~anexos)
+    grupos = agrupar_quase_duplicatas([mensagens.texto(i) for i in candidatas])
+    rotulos, tamanhos = np.unique(grupos, return_counts=True)
+    repetidos = tamanhos >= 2
+    rotulos, tamanhos = rotulos[repetidos], tamanhos[repetidos]
+    usuario_id = mensagens.usuario_id
+
+    linhas = ["Mensagens repetidas ou encaminhadas (conteúdo quase idêntico):\n"]
+    dados = {'grupos': [], 'quem_mais_repete': {}}
+    mais_repetidos = np.argsort(-tamanhos, kind='stable')[:top_n]
+    for rotulo, tamanho in zip(rotulos[mais_repetidos].tolist(), tamanhos[mais_repetidos].tolist()):
+        indices = candidatas[grupos == rotulo]
+        remetentes = Counter(mensagens.nomes[u] for u in usuario_id[indices].tolist())
+        data, hora, primeiro, conteudo = mensagens[int(indices[0])]
+        trecho = conteudo if len(conteudo) <= 80 else conteudo[:77] + '...'
+        linhas.append(f"\"{trecho}\": {tamanho} vezes, por {len(remetentes)} pessoas "
+                      f"(primeiro: {primeiro} em {data} {hora})\n")
+        espalhadores = ', '.join(f"{usuario} ({count})" for usuario, count in remetentes.most_common(3))
+        linhas.append(f"  Quem mais espalhou: {espalhadores}\n")
+        dados['grupos'].append({'mensagem': conteudo, 'repeticoes': tamanho, 'primeiro_envio': primeiro,
+                                'data': data, 'hora': hora, 'remetentes': dict(remetentes)})
+
+    em_grupos = candidatas[np.isin(grupos, rotulos)]
+    por_usuario = np.bincount(usuario_id[em_grupos], minlength=len(mensagens.nomes))
+    linhas.append("Quem mais envia conteúdo repetido:\n")
+    for u in np.argsort(-por_usuario, kind='stable')[:top_n].tolist():
+        if por_usuario[u]:
+            dados['quem_mais_repete'][mensagens.nomes[u]] = int(por_usuario[u])
+            linhas.append(f"{mensagens.nomes[u]}: {por_usuario[u]} mensagens\n")
+    linhas.append("\n")
+    return Resultado('mensagens_encaminhadas', dados, ''.join(linhas))
+def mensagem_mais_longa(mensagens):
+    if not len(mensagens):
+        return Resultado('mensagem_mais_longa', None, "Nenhuma mensagem no período.\n\n")
+    indice = int(mensagens.comprimentos().argmax())
+    usuario = mensagens.nomes[mensagens.usuario_id[indice]]
+    conteudo = mensagens.texto(indice)
     tamanho = len(conteudo)
-    file.write(f"Mensagem mais longa enviada por {usuario} ({tamanho} caracteres):\n")
-    file.write(f"{conteudo}\n\n")
-def recorde_mensagens_em_um_dia(mensagens, file):
+    texto = f"Mensagem mais longa enviada por {usuario} ({tamanho} caracteres):\n{conteudo}\n\n"
+    return Resultado('mensagem_mais_longa', {'usuario': usuario, 'caracteres': tamanho, 'mensagem': conteudo}, texto)
+def recorde_mensagens_em_um_dia(mensagens):
     mensagens_por_dia = Counter()
     usuarios_por_dia = {}
 
@@ -280,14 +398,18 @@ def recorde_mensagens_em_um_dia(mensagens, file):
             usuarios_por_dia[data] = Counter()
         usuarios_por_dia[data][usuario] += 1
 
+    if not mensagens_por_dia:
+        return Resultado('recorde_mensagens_em_um_dia', None, "Nenhuma mensagem no período.\n\n")
     dia_recorde, total_mensagens = mensagens_por_dia.most_common(1)[0]
     usuarios_no_dia = usuarios_por_dia[dia_recorde]
 
-    file.write(f"Recorde de mensagens em um dia ({dia_recorde}): {total_mensagens} mensagens\n")
-    file.write("Participação dos usuários nesse dia:\n")
+    linhas = [f"Recorde de mensagens em um dia ({dia_recorde}): {total_mensagens} mensagens\n",
+              "Participação dos usuários nesse dia:\n"]
     for usuario, count in usuarios_no_dia.items():
-        file.write(f"{usuario}: {count} mensagens\n")
-    file.write("\n")
+        linhas.append(f"{usuario}: {count} mensagens\n")
+    linhas.append("\n")
+    dados = {'dia': dia_recorde.isoformat(), 'mensagens': total_mensagens, 'participacao': dict(usuarios_no_dia)}
+    return Resultado('recorde_mensagens_em_um_dia', dados, ''.join(linhas))
 
 
 def processar_mensagens(dados):
@@ -305,8 +427,9 @@ def processar_mensagens(dados):
     return mensagens
 
 
-# Função para contar quem manda mais mensagens seguidas
-def mensagens_seguidas(mensagens, file):
+# Função para contar as sequências de mensagens seguidas de cada usuário
+# Para as sequências com mais de 3 mensagens guarda só a soma e a quantidade por usuário (para a média).
+def contar_sequencias(mensagens):
     usuario_anterior = ''
     contador = 0
     max_mensagens = {}
@@ -318,117 +441,131 @@ def mensagens_seguidas(mensagens, file):
             if usuario_anterior:
                 max_mensagens[usuario_anterior] = max(max_mensagens.get(usuario_anterior, 0), contador)
                 if contador > 3:
-                    seq_usuarios[usuario_anterior] = seq_usuarios.get(usuario_anterior, []) + [contador]
+                    soma, quantidade = seq_usuarios.get(usuario_anterior, (0, 0))
+                    seq_usuarios[usuario_anterior] = (soma + contador, quantidade + 1)
             usuario_anterior = usuario
             contador = 1
     return max_mensagens, seq_usuarios
 
+# Função para contar quem manda mais mensagens seguidas (Top 5)
+def mensagens_seguidas(mensagens):
+    max_mensagens_seguidas, seq_usuarios = contar_sequencias(mensagens)
+    linhas = ["Top 5 usuários com mais mensagens seguidas:\n"]
+    dados = []
+    top5_mensagens_seguidas = Counter(max_mensagens_seguidas).most_common(5)
+    for i, (usuario, max_msgs) in enumerate(top5_mensagens_seguidas, start=1):
+        soma, quantidade = seq_usuarios.get(usuario, (0, 0))
+        media_seguidas = soma / quantidade if quantidade else 0
+        linhas.append(f"{i}. {usuario} - Máx: {max_msgs} mensagens seguidas, Média: {media_seguidas:.2f}\n")
+        dados.append({'usuario': usuario, 'maximo': max_msgs, 'media': media_seguidas})
+    linhas.append("\n")
+    return Resultado('mensagens_seguidas', dados, ''.join(linhas))
+
 # Função para identificar o usuário mais engraçado
-def pontuacao_usuarios_mais_engracados(mensagens, file):
-    padrao_risada = re.compile(r'(k{2,}|ha{2,}|rs{2,}|😂|🤣)', re.IGNORECASE)
-    pontuacao_risadas = Counter()
-    for i in range(1, len(mensagens)):
-        usuario_atual, mensagem_atual = mensagens[i-1][2], mensagens[i][3]
-        if padrao_risada.search(mensagem_atual):
-            pontuacao_risadas[usuario_atual] += 1
-    file.write("Pontuação dos usuários mais engraçados:\n")
-    for usuario, pontos in pontuacao_risadas.most_common():
-        file.write(f"{usuario}: {pontos} risadas\n")
-    file.write("\n")
+# Cada mensagem com risada (bit RISADA das características) dá um ponto a quem mandou a mensagem anterior.
+def pontuacao_usuarios_mais_engracados(mensagens):
+    from caracteristicas import caracteristicas_mensagens, mais_frequentes, RISADA
+    risadas = (caracteristicas_mensagens(mensagens)[1:] & RISADA) != 0
+    ranking = [(mensagens.nomes[usuario], pontos)
+               for usuario, pontos in mais_frequentes(mensagens.usuario_id[:-1][risadas])]
+    linhas = ["Pontuação dos usuários mais engraçados:\n"]
+    for usuario, pontos in ranking:
+        linhas.append(f"{usuario}: {pontos} risadas\n")
+    linhas.append("\n")
+    return Resultado('pontuacao_usuarios_mais_engracados', dict(ranking), ''.join(linhas))
 
 # Função para encontrar os emojis mais usados (Top 3)
-def top_emojis_usados(mensagens, file, top_n=3):
-    todos_emojis = ''.join([char for mensagem in mensagens for char in mensagem[3] if emoji.is_emoji(char)])
-    contagem_emojis = Counter(todos_emojis)
+def top_emojis_usados(mensagens, top_n=3):
+    import emoji
+
+    contagem_emojis = Counter()
+    for mensagem in mensagens:
+        contagem_emojis.update(char for char in mensagem[3] if emoji.is_emoji(char))
     emojis_mais_usados = contagem_emojis.most_common(top_n)
-    file.write("Top 3 emojis mais usados:\n")
+    linhas = ["Top 3 emojis mais usados:\n"]
     for emoji_char, count in emojis_mais_usados:
-        file.write(f"{emoji_char}: {count} vezes\n")
-    file.write("\n")
+        linhas.append(f"{emoji_char}: {count} vezes\n")
+    linhas.append("\n")
+    return Resultado('top_emojis_usados', dict(emojis_mais_usados), ''.join(linhas))
 
 # Função para calcular o menor tempo de resposta (média)
-def menor_tempo_resposta(mensagens, file):
-    tempos_resposta = {}
-    ultimo_usuario = None
-    ultimo_tempo = None
-
-    for i, (data, hora, usuario, _) in enumerate(mensagens):
-        # Parseando a data e hora com o formato correto
-        tempo_atual = datetime.strptime(f'{data} {hora}', '%d/%m/%Y %H:%M')
-        
-        if ultimo_usuario and usuario != ultimo_usuario:
-            diferenca = (tempo_atual - ultimo_tempo).total_seconds()
-            if usuario not in tempos_resposta:
-                tempos_resposta[usuario] = []
-            tempos_resposta[usuario].append(diferenca)
-        
-        ultimo_usuario = usuario
-        ultimo_tempo = tempo_atual
+# Considera só as trocas de falante dentro da mesma sessão de conversa.
+def menor_tempo_resposta(mensagens, intervalo_sessao=INTERVALO_SESSAO_PADRAO):
+    from sessoes import segmentar_sessoes, tempos_resposta, media_por_usuario
+
+    timestamps, usuario_id, nomes = mensagens.timestamps, mensagens.usuario_id, mensagens.nomes
+    sessoes = segmentar_sessoes(timestamps, usuario_id, intervalo_sessao)
+    indices, tempos = tempos_resposta(timestamps, usuario_id, sessoes.sessao_id, apenas_trocas=True)
 
     # Calculando a média de tempo de resposta para cada usuário
-    medias_resposta = {
-        usuario: sum(tempos) / len(tempos)
-        for usuario, tempos in tempos_resposta.items() if tempos
-    }
+    medias_resposta = {nomes[usuario]: media
+                       for usuario, media in media_por_usuario(usuario_id[indices], tempos, len(nomes)).items()}
 
-    file.write("Média de tempo de resposta entre usuários (em segundos):\n")
+    linhas = ["Média de tempo de resposta entre usuários (em segundos):\n"]
     for usuario, media in medias_resposta.items():
-        file.write(f"{usuario}: {media:.2f} segundos\n")
-    file.write("\n")
+        linhas.append(f"{usuario}: {media:.2f} segundos\n")
+    linhas.append("\n")
+    return Resultado('menor_tempo_resposta', medias_resposta, ''.join(linhas))
 
 
 # Função para identificar a palavra mais usada por pessoa, ignorando arquivos e mídias
-def palavra_mais_usada_por_pessoa(mensagens, file, min_length=4):
-    palavras_por_usuario = {}
-    ignorar_mensagens = ["(arquivo", "<mídia", "whatsapp"]
-
-    for mensagem in mensagens:
-        usuario = mensagem[2]
-        conteudo = mensagem[3].lower()
-
-        # Ignorar completamente mensagens com palavras-chave como "(arquivo)" ou "<mídia>"
-        if any(ignorar in conteudo for ignorar in ignorar_mensagens):
-            continue
-
-        palavras = [palavra for palavra in conteudo.split() if len(palavra) >= min_length]
-
-        if usuario not in palavras_por_usuario:
-            palavras_por_usuario[usuario] = Counter(palavras)
-        else:
-            palavras_por_usuario[usuario].update(palavras)
-
-    file.write("Palavra mais usada por cada pessoa (ignorando arquivos e mídias):\n")
-    for usuario, contagem in palavras_por_usuario.items():
-        if contagem:  # Somente mostrar se houver palavras válidas
-            palavra_top = contagem.most_common(1)[0][0]
+# As contagens (usuário, palavra) ficam em um ContadorExterno, que respeita o orçamento de memória;
+# em memória só ficam a melhor palavra de cada usuário.
+def palavra_mais_usada_por_pessoa(mensagens, min_length=4):
+    from caracteristicas import caracteristicas_mensagens, MIDIA, SISTEMA
+    usuarios = {}  # Usuários com mensagens consideradas, na ordem em que aparecem
+    # Ignorar completamente mensagens com palavras-chave como "(arquivo)", "<mídia>" ou "whatsapp"
+    ignorar = ((caracteristicas_mensagens(mensagens) & (MIDIA | SISTEMA)) != 0).tolist()
+
+    with ContadorExterno() as contagem:
+        for usuario, conteudo, pular in zip(mensagens.usuario_id.tolist(), mensagens.textos, ignorar):
+            if pular:
+                continue
+            usuario = mensagens.nomes[usuario]
+            conteudo = conteudo.lower()
+            usuarios.setdefault(usuario, None)
+            contagem.atualizar((usuario, palavra) for palavra in conteudo.split() if len(palavra) >= min_length)
+
+        # Em empates fica a primeira palavra percorrida (a primeira usada, se nada foi despejado em disco)
+        mais_usada = {}
+        for (usuario, palavra), total in contagem.itens():
+            if usuario not in mais_usada or total > mais_usada[usuario][1]:
+                mais_usada[usuario] = (palavra, total)
+
+    linhas = ["Palavra mais usada por cada pessoa (ignorando arquivos e mídias):\n"]
+    dados = {}
+    for usuario in usuarios:
+        if usuario in mais_usada:  # Somente mostrar se houver palavras válidas
+            palavra_top = mais_usada[usuario][0]
         else:
             palavra_top = "Nenhuma palavra"
-        file.write(f"{usuario}: {palavra_top}\n")
-    file.write("\n")
+        dados[usuario] = palavra_top
+        linhas.append(f"{usuario}: {palavra_top}\n")
+    linhas.append("\n")
+    return Resultado('palavra_mais_usada_por_pessoa', dados, ''.join(linhas))
 # Função para identificar a palavra mais falada no grupo, ignorando arquivos e mídias
-def palavra_mais_falada_no_grupo(mensagens, file, min_length=4):
-    todas_palavras = []
-    ignorar_mensagens = ["(arquivo", "<mídia", "whatsapp"]
-
-    for mensagem in mensagens:
-        conteudo = mensagem[3].lower()
-
-        # Ignorar completamente mensagens com palavras-chave como "(arquivo)" ou "<mídia>"
-        if any(ignorar in conteudo for ignorar in ignorar_mensagens):
-            continue
-
-        palavras = [palavra for palavra in conteudo.split() if len(palavra) >= min_length]
-        todas_palavras.extend(palavras)
-
-    contagem_palavras = Counter(todas_palavras)
-    if contagem_palavras:
-        palavra_top = contagem_palavras.most_common(1)[0]
-        file.write(f"Palavra mais falada no grupo: {palavra_top[0]} (usada {palavra_top[1]} vezes)\n\n")
-    else:
-        file.write("Nenhuma palavra válida encontrada no grupo.\n\n")
+def palavra_mais_falada_no_grupo(mensagens, min_length=4):
+    from caracteristicas import caracteristicas_mensagens, MIDIA, SISTEMA
+    # Ignorar completamente mensagens com palavras-chave como "(arquivo)", "<mídia>" ou "whatsapp"
+    ignorar = ((caracteristicas_mensagens(mensagens) & (MIDIA | SISTEMA)) != 0).tolist()
+
+    with ContadorExterno() as contagem_palavras:
+        for conteudo, pular in zip(mensagens.textos, ignorar):
+            if pular:
+                continue
+            conteudo = conteudo.lower()
+            contagem_palavras.atualizar(palavra for palavra in conteudo.split() if len(palavra) >= min_length)
+        mais_comuns = contagem_palavras.mais_comuns(1)
+
+    if mais_comuns:
+        palavra_top = mais_comuns[0]
+        texto = f"Palavra mais falada no grupo: {palavra_top[0]} (usada {palavra_top[1]} vezes)\n\n"
+        return Resultado('palavra_mais_falada_no_grupo', {'palavra': palavra_top[0], 'usos': palavra_top[1]}, texto)
+    texto = "Nenhuma palavra válida encontrada no grupo.\n\n"
+    return Resultado('palavra_mais_falada_no_grupo', {'palavra': None, 'usos': 0}, texto)
 
 # Função para determinar o período mais ativo do dia (manhã, tarde, noite, madrugada)
-def periodo_mais_ativo(mensagens, file):
+def periodo_mais_ativo(mensagens):
     periodos = {'Madrugada': 0, 'Manhã': 0, 'Tarde': 0, 'Noite': 0}
     for mensagem in mensagens:
         hora = int(mensagem[1][:2])
@@ -441,9 +578,10 @@ def periodo_mais_ativo(mensagens, file):
         else:
             periodos['Noite'] += 1
     periodo_mais_frequente = max(periodos, key=periodos.get)
-    file.write(f"Período mais ativo do grupo: {periodo_mais_frequente}\n\n")
+    texto = f"Período mais ativo do grupo: {periodo_mais_frequente}\n\n"
+    return Resultado('periodo_mais_ativo', {'periodo': periodo_mais_frequente}, texto)
 # Função para contar a quantidade de mensagens por período do dia
-def soma_mensagens_por_periodo(mensagens, file):
+def soma_mensagens_por_periodo(mensagens):
     periodos = {'Madrugada': 0, 'Manhã': 0, 'Tarde': 0, 'Noite': 0}
 
     for mensagem in mensagens:
@@ -457,97 +595,285 @@ def soma_mensagens_por_periodo(mensagens, file):
         else:
             periodos['Noite'] += 1
 
-    # Grava no arquivo o resumo da contagem de mensagens por período
-    file.write("Soma de mensagens por período do dia:\n")
+    # Monta o resumo da contagem de mensagens por período
+    linhas = ["Soma de mensagens por período do dia:\n"]
     for periodo, contagem in periodos.items():
-        file.write(f"{periodo}: {contagem} mensagens\n")
-    file.write("\n")
+        linhas.append(f"{periodo}: {contagem} mensagens\n")
+    linhas.append("\n")
+    return Resultado('soma_mensagens_por_periodo', periodos, ''.join(linhas))
 
 # Função para contar mensagens por mês
-def mensagens_por_mes(mensagens, file):
+def mensagens_por_mes(mensagens):
     contagem_mensal = Counter()
     for mensagem in mensagens:
         data = datetime.strptime(mensagem[0], '%d/%m/%Y')
         mes_ano = data.strftime('%Y-%m')
         contagem_mensal[mes_ano] += 1
-    file.write("Quantidade de mensagens por mês:\n")
+    linhas = ["Quantidade de mensagens por mês:\n"]
     for mes, contagem in sorted(contagem_mensal.items()):
-        file.write(f"{mes}: {contagem} mensagens\n")
-    file.write("\n")
+        linhas.append(f"{mes}: {contagem} mensagens\n")
+    linhas.append("\n")
+    return Resultado('mensagens_por_mes', dict(sorted(contagem_mensal.items())), ''.join(linhas))
 
 # Função para encontrar o usuário que faz mais perguntas
-def usuario_que_faz_mais_perguntas(mensagens, file):
-    perguntas = [msg for msg in mensagens if '?' in msg[3]]  # Verifica se a mensagem contém "?"
-    contagem_perguntas = Counter([msg[2] for msg in perguntas])  # Conta quantas perguntas cada usuário fez
-    usuario_top = contagem_perguntas.most_common(1)[0] if contagem_perguntas else ('Ninguém', 0)
-    
-    # Gravar no arquivo
-    file.write(f"Usuário que mais faz perguntas: {usuario_top[0]} com {usuario_top[1]} perguntas\n\n")
-
-# Função para salvar todas as análises em um arquivo de texto
-# Função para salvar todas as análises em um arquivo de texto
-def salvar_resumo_txt(nome_arquivo, mensagens, pasta_midia, pasta_audio):
-    with open(nome_arquivo, 'w', encoding='utf-8') as file:
-        # Análises existentes
-        figurinha_mais_usada, ocorrencias_figurinhas = encontrar_figurinha_recorrente(pasta_midia, file)
-        file.write(f"Figurinha mais usada: {figurinha_mais_usada}, Ocorrências: {ocorrencias_figurinhas}\n\n")
-
-        maiores_audios = encontrar_audios_maiores(pasta_audio, file)
-        file.write("Maiores arquivos de áudio:\n")
-        for i, (arquivo, tamanho) in enumerate(maiores_audios, start=1):
-            file.write(f"{i}. {arquivo} - Tamanho: {tamanho / 1024:.2f} KB\n")
-        file.write("\n")
-
-        usuario_que_faz_mais_perguntas(mensagens, file)
-
-        max_mensagens_seguidas, seq_usuarios = mensagens_seguidas(mensagens, file)
-        file.write("Top 5 usuários com mais mensagens seguidas:\n")
-        top5_mensagens_seguidas = Counter(max_mensagens_seguidas).most_common(5)
-        for i, (usuario, max_msgs) in enumerate(top5_mensagens_seguidas, start=1):
-            media_seguidas = sum(seq_usuarios[usuario]) / len(seq_usuarios[usuario]) if usuario in seq_usuarios else 0
-            file.write(f"{i}. {usuario} - Máx: {max_msgs} mensagens seguidas, Média: {media_seguidas:.2f}\n")
-        file.write("\n")
-
-        pontuacao_usuarios_mais_engracados(mensagens, file)
-        top_emojis_usados(mensagens, file)
-        menor_tempo_resposta(mensagens, file)
-        palavra_mais_usada_por_pessoa(mensagens, file)
-        palavra_mais_falada_no_grupo(mensagens, file)
-        periodo_mais_ativo(mensagens, file)
-        soma_mensagens_por_periodo(mensagens, file)
-        mensagens_por_mes(mensagens, file)
-
-        # Novas análises
-        media_mensagens_diarias_por_contato(mensagens, file)
-        numero_palavras_por_pessoa(mensagens, file)
-        tempo_resposta_medio(mensagens, file)
-        conexoes_entre_membros(mensagens, file)
-        uso_girias_abreviacoes(mensagens, file)
-        nivel_formalidade(mensagens, file)
-        analise_estilo_escrita(mensagens, file)
-        erros_ortograficos_por_pessoa(mensagens, file)
-        analise_sentimento(mensagens, file)
-        palavras_carinhosas_por_pessoa(mensagens, file)
-        expressoes_frustracao_por_pessoa(mensagens, file)
-        mensagens_mais_citadas(mensagens, file)
-        mensagem_mais_longa(mensagens, file)
-        recorde_mensagens_em_um_dia(mensagens, file)
-
-        file.write("Análises concluídas e salvas no arquivo.\n")
-
-# Função para carregar o arquivo de conversa
-def carregar_conversa(arquivo_conversa):
+def usuario_que_faz_mais_perguntas(mensagens):
+    from caracteristicas import caracteristicas_mensagens, mais_frequentes, PERGUNTA
+    # Conta quantas perguntas (mensagens com "?") cada usuário fez, pelo bit PERGUNTA das características
+    perguntas = (caracteristicas_mensagens(mensagens) & PERGUNTA) != 0
+    ranking = mais_frequentes(mensagens.usuario_id[perguntas])
+    usuario_top = (mensagens.nomes[ranking[0][0]], ranking[0][1]) if ranking else ('Ninguém', 0)
+
+    texto = f"Usuário que mais faz perguntas: {usuario_top[0]} com {usuario_top[1]} perguntas\n\n"
+    return Resultado('usuario_que_faz_mais_perguntas', {'usuario': usuario_top[0], 'perguntas': usuario_top[1]}, texto)
+
+# Análises de mídia, na ordem do relatório, com o argumento de pasta que cada uma recebe
+ANALISES_MIDIA = [
+    (figurinha_mais_usada, 'pasta_midia'),
+    (maiores_audios, 'pasta_audio'),
+]
+
+# Carregadores dos modelos que o modo concorrente adianta nos processos separados, enquanto a conversa é lida.
+# O BERT fica de fora: na cascata ele só é carregado se alguma mensagem for escalada pelo léxico, e adiantá-lo
+# pagaria (ou faria falhar) um carregamento que a execução sequencial muitas vezes não faz.
+PREPARACAO_MODELOS = {
+    'erros_ortograficos_por_pessoa': carregar_corretor_ortografico,
+}
+
+# Análises de texto, na ordem do relatório
+ANALISES_TEXTO = [
+    usuario_que_faz_mais_perguntas,
+    mensagens_seguidas,
+    pontuacao_usuarios_mais_engracados,
+    top_emojis_usados,
+    menor_tempo_resposta,
+    palavra_mais_usada_por_pessoa,
+    palavra_mais_falada_no_grupo,
+    periodo_mais_ativo,
+    soma_mensagens_por_periodo,
+    mensagens_por_mes,
+    # Novas análises
+    media_mensagens_diarias_por_contato,
+    numero_palavras_por_pessoa,
+    tempo_resposta_medio,
+    quem_inicia_conversas,
+    conexoes_entre_membros,
+    uso_girias_abreviacoes,
+    nivel_formalidade,
+    analise_estilo_escrita,
+    erros_ortograficos_por_pessoa,
+    analise_sentimento,
+    palavras_carinhosas_por_pessoa,
+    expressoes_frustracao_por_pessoa,
+    mensagens_mais_citadas,
+    mensagens_encaminhadas,
+    mensagem_mais_longa,
+    recorde_mensagens_em_um_dia,
+]
+
+# Todas as análises indexadas pelo nome (usado por quem pede uma análise específica)
+ANALISES_POR_NOME = {funcao.__name__: funcao for funcao in [f for f, _ in ANALISES_MIDIA] + ANALISES_TEXTO}
+
+# Função para contar os arquivos de uma pasta de mídia (linhas processadas no perfil)
+def contar_arquivos(pasta):
+    return len(os.listdir(pasta)) if os.path.isdir(pasta) else 0
+
+# Função para escolher as análises a executar a partir das listas --only/--skip
+def selecionar_analises(apenas=None, pular=None):
+    desconhecidas = set(apenas or []) | set(pular or [])
+    desconhecidas -= set(ANALISES_POR_NOME)
+    if desconhecidas:
+        raise ValueError(f"Análises desconhecidas: {', '.join(sorted(desconhecidas))}")
+    selecionadas = [nome for nome in ANALISES_POR_NOME if not apenas or nome in apenas]
+    return [nome for nome in selecionadas if nome not in (pular or [])]
+
+# Função para executar as análises selecionadas (todas, por padrão), medindo cada uma com o Perfilador
+# Com desde/ate, as análises de texto recebem só o recorte da conversa nesse intervalo (sem cópia).
+# Com um cache (memoizacao.CacheResultados), só as análises cuja entrada ou código mudou são recalculadas.
+def executar_analises(mensagens, pasta_midia, pasta_audio, perfil, selecionadas=None, desde=None, ate=None,
+                      cache=None):
+    pastas = {'pasta_midia': pasta_midia, 'pasta_audio': pasta_audio}
+    resultados = []
+    for funcao, argumento in ANALISES_MIDIA:
+        if selecionadas is not None and funcao.__name__ not in selecionadas:
+            continue
+        with perfil.medir(funcao.__name__, contar_arquivos(pastas[argumento])) as registro:
+            resultados.append(executar_com_cache(cache, funcao, pastas[argumento], registro))
+
+    if desde is not None or ate is not None:
+        mensagens = mensagens.intervalo(desde, ate)
+    for funcao in ANALISES_TEXTO:
+        if selecionadas is not None and funcao.__name__ not in selecionadas:
+            continue
+        with perfil.medir(funcao.__name__, len(mensagens)) as registro:
+            resultados.append(executar_com_cache(cache, funcao, mensagens, registro))
+    return resultados
+
+# Função para executar as análises de texto separadamente em cada mês ('mes') ou semana ('semana')
+# Cada período é um recorte da conversa, então cada análise só percorre as mensagens daquele período.
+def executar_por_periodo(mensagens, frequencia, perfil, selecionadas=None, desde=None, ate=None, cache=None):
+    resultados = []
+    if desde is not None or ate is not None:
+        mensagens = mensagens.intervalo(desde, ate)
+    for rotulo, recorte in mensagens.periodos(frequencia):
+        resultados.append(Resultado(f'{rotulo}', {'mensagens': len(recorte)},
+                                    f"===== {rotulo} ({len(recorte)} mensagens) =====\n\n"))
+        for funcao in ANALISES_TEXTO:
+            if selecionadas is not None and funcao.__name__ not in selecionadas:
+                continue
+            with perfil.medir(f'{rotulo}/{funcao.__name__}', len(recorte)) as registro:
+                resultado = executar_com_cache(cache, funcao, recorte, registro)
+            resultados.append(resultado._replace(nome=f'{rotulo}/{resultado.nome}'))
+    return resultados
+
+# Função para salvar todas as análises em um arquivo (texto, JSON ou Parquet)
+# Cada análise é medida pelo Perfilador; a tabela de tempos vai ao final do relatório em texto
+# e, se arquivo_perfil for informado, os registros completos são salvos em JSON.
+# Com frequencia='mes' ou 'semana', as análises de texto são repetidas para cada período.
+# Com concorrente=True, mídia, leitura da conversa, modelos e análises de texto rodam sobrepostos (agendador.py);
+# nesse caso 'mensagens' pode ser também uma função sem argumentos que carrega a conversa.
+# Com um cache de resultados, as análises já calculadas para a mesma entrada e o mesmo código são reaproveitadas.
+def salvar_resumo_txt(nome_arquivo, mensagens, pasta_midia, pasta_audio, arquivo_perfil=None, analise_detalhada=None,
+                      formato='txt', selecionadas=None, desde=None, ate=None, frequencia=None, concorrente=False,
+                      cache=None):
+    perfil = Perfilador(analise_detalhada)
+    if concorrente and not frequencia:
+        from agendador import executar_concorrente
+
+        carregar = mensagens if callable(mensagens) else lambda: mensagens
+        resultados = executar_concorrente(carregar, {'pasta_midia': pasta_midia, 'pasta_audio': pasta_audio},
+                                          ANALISES_MIDIA, ANALISES_TEXTO, perfil, selecionadas, desde, ate,
+                                          contar_arquivos, PREPARACAO_MODELOS, cache=cache)
+    else:
+        if callable(mensagens):
+            mensagens = mensagens()
+        if frequencia:
+            resultados = executar_por_periodo(mensagens, frequencia, perfil, selecionadas, desde, ate, cache)
+        else:
+            resultados = executar_analises(mensagens, pasta_midia, pasta_audio, perfil, selecionadas, desde, ate,
+                                           cache)
+
+    rodape = "Análises concluídas e salvas no arquivo.\n\n" + perfil.tabela_resumo()
+    salvar_relatorio(nome_arquivo, resultados, formato, rodape=rodape, extras={'perfil': perfil.registros})
+
+    if arquivo_perfil:
+        perfil.salvar_json(arquivo_perfil)
+    return resultados
+
+# Função para carregar o arquivo de conversa, com as mensagens ordenadas e indexadas por timestamp
+# Com mapear=True os textos ficam no arquivo mapeado em memória e só são decodificados quando lidos.
+# A versão do código de leitura (este carregador e os parsers que ele chama) vai na Conversa, para que mudar
+# o parser invalide os resultados guardados no cache.
+def carregar_conversa(arquivo_conversa, mapear=False):
+    if mapear:
+        return carregar_conversa_mapeada(arquivo_conversa)
     with open(arquivo_conversa, 'r', encoding='utf-8') as f:
         dados = f.readlines()
-    return processar_mensagens(dados)
-
-# Função principal para execução da análise
-def executar_analise():
-    arquivo_conversa = 'conversa.txt'  # Substitua pelo caminho correto do seu arquivo
-    pasta_midia = 'pastaconversa'  # Substitua pelo caminho da sua pasta de mídia
-    pasta_audio = 'pastaconversa'  # Substitua pelo caminho da sua pasta de áudios
-    mensagens = carregar_conversa(arquivo_conversa)
-    salvar_resumo_txt('resumo_analises_final.txt', mensagens, pasta_midia, pasta_audio)
+    return criar_conversa(processar_mensagens(dados), impressao_digital(arquivo_conversa),
+                          versao_codigo(carregar_conversa))
+
+# Função para carregar a conversa sobre um mmap do arquivo: só data, hora e usuário viram strings,
+# o texto de cada mensagem é guardado como (deslocamento, tamanho) em bytes.
+def carregar_conversa_mapeada(arquivo_conversa):
+    import mmap
+    from array import array
+    from textos_mapeados import TextosMapeados
+    padrao_mensagem = re.compile(rb'^(\d{2}/\d{2}/\d{4}) (\d{2}:\d{2}) - (.*?): ([^\n]*)', re.MULTILINE)
+    with open(arquivo_conversa, 'rb') as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+    datas, horas, usuarios = [], [], []
+    deslocamentos, tamanhos = array('q'), array('q')
+    # Datas, horas e nomes se repetem muito: cada valor distinto vira uma única string compartilhada
+    nomes, textos_datas, textos_horas = {}, {}, {}
+    for resultado in padrao_mensagem.finditer(mapa):
+        data, hora, usuario = resultado.group(1, 2, 3)
+        texto_data = textos_datas.get(data)
+        if texto_data is None:
+            texto_data = textos_datas[data] = data.decode()
+        datas.append(texto_data)
+        texto_hora = textos_horas.get(hora)
+        if texto_hora is None:
+            texto_hora = textos_horas[hora] = hora.decode()
+        horas.append(texto_hora)
+        nome = nomes.get(usuario)
+        if nome is None:
+            nome = nomes[usuario] = usuario.decode('utf-8')
+        usuarios.append(nome)
+        inicio, fim = resultado.span(4)
+        # Arquivos exportados no Windows terminam as linhas em \r\n
+        if fim > inicio and mapa[fim - 1] == 13:
+            fim -= 1
+        deslocamentos.append(inicio)
+        tamanhos.append(fim - inicio)
+    return criar_conversa_colunas(datas, horas, usuarios, TextosMapeados(mapa, deslocamentos, tamanhos),
+                                  impressao_digital(arquivo_conversa), versao_codigo(carregar_conversa))
+
+# Função principal para execução da análise pela linha de comando
+# As dependências pesadas (transformers, spellchecker, emoji) só são importadas pelas análises que as usam,
+# então um relatório apenas com análises baratas inicia sem carregá-las.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Gera o relatório de análises de uma conversa exportada do WhatsApp.')
+    parser.add_argument('conversa', nargs='*', default=['conversa.txt'],
+                        help='Arquivo exportado da conversa; várias exportações do mesmo grupo são mescladas sem duplicatas')
+    parser.add_argument('--pasta-midia', default='pastaconversa', help='Pasta com as figurinhas (.webp)')
+    parser.add_argument('--pasta-audio', default='pastaconversa', help='Pasta com os áudios (.opus)')
+    parser.add_argument('--saida', default='resumo_analises_final.txt')
+    parser.add_argument('--formato', choices=['txt', 'json', 'parquet'], default='txt')
+    parser.add_argument('--only', '--apenas', dest='apenas', nargs='+', metavar='ANALISE',
+                        help='Executa apenas essas análises')
+    parser.add_argument('--skip', '--pular', dest='pular', nargs='+', metavar='ANALISE',
+                        help='Não executa essas análises')
+    parser.add_argument('--desde', help='Só mensagens a partir dessa data (aaaa-mm-dd ou "aaaa-mm-dd HH:MM")')
+    parser.add_argument('--ate', help='Só mensagens até essa data (uma data sem hora inclui o dia inteiro)')
+    parser.add_argument('--por', choices=['mes', 'semana'], help='Repete as análises de texto para cada mês ou semana')
+    parser.add_argument('--mmap', action='store_true',
+                        help='Mapeia o arquivo em memória e decodifica os textos só quando necessário')
+    parser.add_argument('--concorrente', action='store_true',
+                        help='Sobrepõe mídia, leitura da conversa, modelos e análises de texto')
+    parser.add_argument('--memoria-mb', type=float, metavar='MB',
+                        help='Orçamento de memória de cada contagem; acima dele as contagens vão para o disco')
+    parser.add_argument('--despejo', choices=['disco', 'sqlite'], default='disco',
+                        help='Onde as contagens acima do orçamento são guardadas (runs ordenados ou SQLite)')
+    parser.add_argument('--pasta-temporaria', help='Pasta para os arquivos temporários das contagens')
+    parser.add_argument('--sem-cache', action='store_true', help='Recalcula todas as análises, sem usar o cache')
+    parser.add_argument('--pasta-cache', default=PASTA_RESULTADOS, help='Pasta do cache de resultados das análises')
+    parser.add_argument('--cache-mb', type=float, default=TAMANHO_MAXIMO_MB,
+                        help='Tamanho máximo do cache de resultados (os menos usados são apagados)')
+    parser.add_argument('--listar', action='store_true', help='Lista as análises disponíveis e sai')
+    parser.add_argument('--perfil', default='perfil_analises.json', help='Arquivo JSON com o perfil de execução')
+    parser.add_argument('--detalhar', metavar='ANALISE', help='Captura cProfile/tracemalloc dessa análise')
+    args = parser.parse_args(argv)
+
+    if args.listar:
+        print('\n'.join(ANALISES_POR_NOME))
+        return
+    try:
+        selecionadas = selecionar_analises(args.apenas, args.pular)
+    except ValueError as e:
+        parser.error(str(e))
+    if len(args.conversa) > 1 and args.mmap:
+        parser.error('--mmap lê uma única exportação; não pode ser usado ao mesclar várias')
+    configurar_agregacao(args.memoria_mb, args.despejo, args.pasta_temporaria)
+
+    # Só lê a conversa se alguma análise de texto foi selecionada
+    precisa_conversa = any(funcao.__name__ in selecionadas for funcao in ANALISES_TEXTO)
+    if len(args.conversa) > 1:
+        from mesclar_exportacoes import mesclar_exportacoes
+        carregar = partial(mesclar_exportacoes, args.conversa)
+    else:
+        carregar = partial(carregar_conversa, args.conversa[0], args.mmap)
+    if not precisa_conversa:
+        mensagens = criar_conversa([])
+    elif args.concorrente:
+        # A conversa é lida pelo agendador, enquanto a mídia é processada
+        mensagens = carregar
+    else:
+        mensagens = carregar()
+    salvar_resumo_txt(args.saida, mensagens, args.pasta_midia, args.pasta_audio, arquivo_perfil=args.perfil,
+                      analise_detalhada=args.detalhar, formato=args.formato, selecionadas=selecionadas,
+                      desde=args.desde, ate=args.ate, frequencia=args.por, concorrente=args.concorrente,
+                      cache=None if args.sem_cache else CacheResultados(args.pasta_cache, args.cache_mb,
+                                                                        ignorar=filter(None, [args.detalhar])))
 
 # Execução da análise
-executar_analise()
+if __name__ == '__main__':
+    main()
@@ -1,164 +1,253 @@
-# Importando bibliotecas
-import re
-import pandas as pd
-from collections import Counter
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import emoji
-from datetime import datetime
-from textblob import TextBlob
-
-# Função para carregar o arquivo de texto
-def carregar_mensagens(arquivo):
-    with open(arquivo, 'r', encoding='utf-8') as f:
-        dados = f.readlines()
-    return dados
-
-# Função para processar e limpar os dados (removendo datas, horas, etc.)
-def processar_mensagens(dados):
-    mensagens = []
-    # Regex para capturar data, hora, usuário e mensagem
-    padrao_mensagem = re.compile(r'\[(\d{2}/\d{2}/\d{4}), (\d{2}:\d{2}:\d{2})\] (.*?): (.*)')
-
-    # Lista de palavras-chave que indicam mensagens do sistema ou metadados
-    ignorar_mensagens = [
-        "protegidas com a criptografia de ponta a ponta",
-        "criou o grupo",
-        "mudou a descrição do grupo",
-        "adicionou",
-        "anexado"
-    ]
-
-    for linha in dados:
-        resultado = padrao_mensagem.match(linha)
-        if resultado:
-            data = resultado.group(1)
-            hora = resultado.group(2)
-            usuario = resultado.group(3)
-            mensagem = resultado.group(4)
-            
-            # Ignorar mensagens que contenham palavras-chave de metadados
-            if any(frase in mensagem.lower() for frase in ignorar_mensagens):
-                continue
-
-            # Adicionar as mensagens processadas
-            mensagens.append([data, hora, usuario, mensagem])
-
-    return pd.DataFrame(mensagens, columns=['Data', 'Hora', 'Usuário', 'Mensagem'])
-
-# Função para contar as palavras mais usadas
-def palavras_mais_usadas(df, top_n=10):
-    todas_palavras = ' '.join(df['Mensagem']).lower()
-    todas_palavras = re.findall(r'\b\w{4,}\b', todas_palavras)
-    contagem = Counter(todas_palavras)
-    return contagem.most_common(top_n)
-
-# Função para criar uma nuvem de palavras
-def gerar_nuvem_palavras(df):
-    todas_palavras = ' '.join(df['Mensagem']).lower()
-    
-    if todas_palavras.strip():  # Verifica se há palavras para gerar a nuvem
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate(todas_palavras)
-        
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        plt.show()
-    else:
-        print("Nenhuma palavra encontrada para gerar a nuvem de palavras.")
-
-# Função para contar mensagens por usuário
-def mensagens_por_usuario(df):
-    return df['Usuário'].value_counts()
-
-# Função para contar emojis
-def contar_emojis(df):
-    # Usar emoji.is_emoji para detectar emojis corretamente
-    todos_emojis = ''.join([char for mensagem in df['Mensagem'] for char in mensagem if emoji.is_emoji(char)])
-    contagem = Counter(todos_emojis)
-    return contagem.most_common(10)
-
-
-# Função para contar as mensagens por horário
-def analisar_horarios(df):
-    df['Hora'] = pd.to_datetime(df['Hora'], format='%H:%M:%S')
-    df['Faixa_Horaria'] = pd.cut(df['Hora'].dt.hour, bins=[0, 6, 12, 18, 24], labels=['Madrugada', 'Manhã', 'Tarde', 'Noite'], include_lowest=True)
-    return df['Faixa_Horaria'].value_counts()
-
-# Função para contar mensagens por dia da semana
-def analisar_dias_semana(df):
-    df['Data'] = pd.to_datetime(df['Data'], format='%d/%m/%Y')
-    df['Dia_Semana'] = df['Data'].dt.day_name()
-    return df['Dia_Semana'].value_counts()
-
-# Função para contar mensagens por mês
-def analisar_mensagens_por_mes(df):
-    df['Data'] = pd.to_datetime(df['Data'], format='%d/%m/%Y')
-    df['Mes'] = df['Data'].dt.month_name()
-    return df['Mes'].value_counts()
-
-# Função para calcular a média de palavras por mensagem por usuário
-def media_palavras_por_usuario(df):
-    df['Contagem_Palavras'] = df['Mensagem'].apply(lambda x: len(re.findall(r'\b\w+\b', x)))
-    return df.groupby('Usuário')['Contagem_Palavras'].mean()
-
-# Função para identificar quem manda a primeira e última mensagem do dia
-def primeira_e_ultima_mensagem(df):
-    df['Data'] = pd.to_datetime(df['Data'], format='%d/%m/%Y')
-    df['Hora'] = pd.to_datetime(df['Hora'], format='%H:%M:%S').dt.time
-    primeira_mensagem = df.groupby('Data').first()['Usuário'].value_counts()
-    ultima_mensagem = df.groupby('Data').last()['Usuário'].value_counts()
-    return primeira_mensagem, ultima_mensagem
-
-# Função para análise de sentimento com TextBlob
-def analisar_sentimento(df):
-    def calcular_sentimento(mensagem):
-        blob = TextBlob(mensagem)
-        return blob.sentiment.polarity  # Retorna a polaridade: -1 (negativo), 0 (neutro), 1 (positivo)
-
-    df['Sentimento'] = df['Mensagem'].apply(calcular_sentimento)
-    
-    # Classificar o sentimento em positivo, negativo ou neutro
-    df['Classificacao_Sentimento'] = df['Sentimento'].apply(lambda x: 'Positivo' if x > 0 else ('Negativo' if x < 0 else 'Neutro'))
-    
-    return df['Classificacao_Sentimento'].value_counts()
-
-# Carregando e processando as mensagens
-arquivo = ''  # Coloque o caminho para o arquivo exportado
-dados = carregar_mensagens(arquivo)
-df_mensagens = processar_mensagens(dados)
-
-# Exibindo as primeiras linhas do DataFrame para garantir que foi processado corretamente
-print("Primeiras linhas do DataFrame processado:")
-print(df_mensagens.head())
-
-# Exibir análises no console
-print("Palavras mais usadas:")
-print(palavras_mais_usadas(df_mensagens, top_n=10))
-
-print("Mensagens por usuário:")
-print(mensagens_por_usuario(df_mensagens))
-
-print("Emojis mais usados:")
-print(contar_emojis(df_mensagens))
-
-print("Mensagens por faixa horária:")
-print(analisar_horarios(df_mensagens))
-
-print("Mensagens por dia da semana:")
-print(analisar_dias_semana(df_mensagens))
-
-print("Mensagens por mês:")
-print(analisar_mensagens_por_mes(df_mensagens))
-
-print("Média de palavras por mensagem por usuário:")
-print(media_palavras_por_usuario(df_mensagens))
-
-primeira_mensagem, ultima_mensagem = primeira_e_ultima_mensagem(df_mensagens)
-print("Quem manda a primeira mensagem do dia:")
-print(primeira_mensagem)
-print("Quem manda a última mensagem do dia:")
-print(ultima_mensagem)
-
-print("Classificação de sentimentos (Positivo, Neutro, Negativo):")
-print(analisar_sentimento(df_mensagens))
+# Importando bibliotecas
+# pandas, wordcloud, matplotlib, emoji e transformers são importados apenas pelas análises que os usam
+import os
+import re
+import hashlib
+import argparse
+from collections import Counter
+
+# Máximo de palavras distintas mantidas na tabela de frequências (o restante é podado durante a contagem,
+# o que torna a contagem aproximada; veja contar_palavras)
+LIMITE_VOCABULARIO = 50_000
+
+# Pasta onde as nuvens de palavras já renderizadas ficam guardadas
+PASTA_NUVENS = os.path.join('cache_analises', 'nuvens')
+
+# Função para carregar o arquivo de texto
+def carregar_mensagens(arquivo):
+    with open(arquivo, 'r', encoding='utf-8') as f:
+        dados = f.readlines()
+    return dados
+
+# Função para processar e limpar os dados (removendo datas, horas, etc.)
+def processar_mensagens(dados):
+    mensagens = []
+    # Regex para capturar data, hora, usuário e mensagem
+    padrao_mensagem = re.compile(r'\[(\d{2}/\d{2}/\d{4}), (\d{2}:\d{2}:\d{2})\] (.*?): (.*)')
+
+    # Lista de palavras-chave que indicam mensagens do sistema ou metadados
+    ignorar_mensagens = [
+        "protegidas com a criptografia de ponta a ponta",
+        "criou o grupo",
+        "mudou a descrição do grupo",
+        "adicionou",
+        "anexado"
+    ]
+
+    for linha in dados:
+        resultado = padrao_mensagem.match(linha)
+        if resultado:
+            data = resultado.group(1)
+            hora = resultado.group(2)
+            usuario = resultado.group(3)
+            mensagem = resultado.group(4)
+
+            # Ignorar mensagens que contenham palavras-chave de metadados
+            if any(frase in mensagem.lower() for frase in ignorar_mensagens):
+                continue
+
+            # Adicionar as mensagens processadas
+            mensagens.append([data, hora, usuario, mensagem])
+
+    return mensagens
+
+# Função para montar o DataFrame, usado apenas pelas análises que dependem do pandas
+def criar_dataframe(mensagens):
+    import pandas as pd
+
+    return pd.DataFrame(mensagens, columns=['Data', 'Hora', 'Usuário', 'Mensagem'])
+
+# Função para contar as palavras (4 letras ou mais) de todas as mensagens em uma única passada.
+# Sempre que o vocabulário passa do dobro do limite, só as 'limite_vocabulario' mais frequentes são mantidas.
+# A memória fica limitada, mas a contagem passa a ser aproximada: uma palavra podada perde as ocorrências contadas
+# até ali e, se voltar a aparecer, recomeça do zero. Nenhuma contagem passa da real, e nenhuma fica mais de
+# 'erro_maximo' abaixo dela (a soma, em todas as podas, da maior contagem descartada em cada uma).
+# Sem poda, erro_maximo é 0 e a contagem é exata. Devolve (contagem, erro_maximo).
+def contar_palavras(mensagens, limite_vocabulario=LIMITE_VOCABULARIO):
+    padrao_palavra = re.compile(r'\b\w{4,}\b')
+    contagem = Counter()
+    erro_maximo = 0
+    for mensagem in mensagens:
+        contagem.update(padrao_palavra.findall(mensagem[3].lower()))
+        if len(contagem) > 2 * limite_vocabulario:
+            mais_comuns = contagem.most_common(limite_vocabulario + 1)
+            erro_maximo += mais_comuns.pop()[1]
+            contagem = Counter(dict(mais_comuns))
+    return contagem, erro_maximo
+
+# Tabela de frequências de palavras da conversa, compartilhada pelas análises de palavras.
+# A contagem só é feita na primeira vez que alguém a usa; 'impressao' identifica o arquivo de origem.
+# 'erro_maximo' é quanto cada contagem pode estar abaixo da real por causa da poda (0 quando é exata).
+class FrequenciasPalavras:
+    def __init__(self, mensagens, impressao=None, limite_vocabulario=LIMITE_VOCABULARIO):
+        self.mensagens = mensagens
+        self.impressao = impressao
+        self.limite_vocabulario = limite_vocabulario
+        self._contagem = None
+        self._erro_maximo = 0
+
+    @property
+    def contagem(self):
+        if self._contagem is None:
+            self._contagem, self._erro_maximo = contar_palavras(self.mensagens, self.limite_vocabulario)
+        return self._contagem
+
+    @property
+    def erro_maximo(self):
+        self.contagem  # A poda só é conhecida depois da contagem
+        return self._erro_maximo
+
+# Função para listar as palavras mais usadas a partir da tabela de frequências
+def palavras_mais_usadas(frequencias, top_n=10):
+    return frequencias.contagem.most_common(top_n)
+
+# Função para criar uma nuvem de palavras a partir da tabela de frequências
+# A imagem fica guardada por (impressão digital da conversa, parâmetros), então uma conversa que não mudou
+# não é contada nem renderizada de novo.
+def gerar_nuvem_palavras(frequencias, largura=800, altura=400, fundo='white', max_palavras=200):
+    import matplotlib.pyplot as plt
+
+    caminho = None
+    if frequencias.impressao is not None:
+        parametros = f'{frequencias.impressao}|{largura}|{altura}|{fundo}|{max_palavras}|{frequencias.limite_vocabulario}'
+        caminho = os.path.join(PASTA_NUVENS, hashlib.sha256(parametros.encode()).hexdigest() + '.png')
+
+    if caminho and os.path.exists(caminho):
+        imagem = plt.imread(caminho)
+    elif frequencias.contagem:  # Verifica se há palavras para gerar a nuvem
+        from wordcloud import WordCloud
+
+        imagem = WordCloud(width=largura, height=altura, background_color=fundo, max_words=max_palavras)
+        imagem.generate_from_frequencies(dict(frequencias.contagem.most_common(max_palavras)))
+        if caminho:
+            os.makedirs(PASTA_NUVENS, exist_ok=True)
+            imagem.to_file(caminho)
+    else:
+        print("Nenhuma palavra encontrada para gerar a nuvem de palavras.")
+        return
+
+    plt.figure(figsize=(10, 5))
+    plt.imshow(imagem, interpolation='bilinear')
+    plt.axis('off')
+    plt.show()
+
+# Função para contar mensagens por usuário
+def mensagens_por_usuario(mensagens):
+    return Counter(mensagem[2] for mensagem in mensagens).most_common()
+
+# Função para contar emojis
+def contar_emojis(mensagens):
+    import emoji
+
+    # Usar emoji.is_emoji para detectar emojis corretamente
+    todos_emojis = ''.join([char for mensagem in mensagens for char in mensagem[3] if emoji.is_emoji(char)])
+    contagem = Counter(todos_emojis)
+    return contagem.most_common(10)
+
+
+# Função para contar as mensagens por horário
+def analisar_horarios(df):
+    import pandas as pd
+
+    df['Hora'] = pd.to_datetime(df['Hora'], format='%H:%M:%S')
+    df['Faixa_Horaria'] = pd.cut(df['Hora'].dt.hour, bins=[0, 6, 12, 18, 24], labels=['Madrugada', 'Manhã', 'Tarde', 'Noite'], include_lowest=True)
+    return df['Faixa_Horaria'].value_counts()
+
+# Função para contar mensagens por dia da semana
+def analisar_dias_semana(df):
+    import pandas as pd
+
+    df['Data'] = pd.to_datetime(df['Data'], format='%d/%m/%Y')
+    df['Dia_Semana'] = df['Data'].dt.day_name()
+    return df['Dia_Semana'].value_counts()
+
+# Função para contar mensagens por mês
+def analisar_mensagens_por_mes(df):
+    import pandas as pd
+
+    df['Data'] = pd.to_datetime(df['Data'], format='%d/%m/%Y')
+    df['Mes'] = df['Data'].dt.month_name()
+    return df['Mes'].value_counts()
+
+# Função para calcular a média de palavras por mensagem por usuário
+def media_palavras_por_usuario(df):
+    df['Contagem_Palavras'] = df['Mensagem'].apply(lambda x: len(re.findall(r'\b\w+\b', x)))
+    return df.groupby('Usuário')['Contagem_Palavras'].mean()
+
+# Função para identificar quem manda a primeira e última mensagem do dia
+def primeira_e_ultima_mensagem(df):
+    import pandas as pd
+
+    df['Data'] = pd.to_datetime(df['Data'], format='%d/%m/%Y')
+    df['Hora'] = pd.to_datetime(df['Hora'], format='%H:%M:%S').dt.time
+    primeira_mensagem = df.groupby('Data').first()['Usuário'].value_counts()
+    ultima_mensagem = df.groupby('Data').last()['Usuário'].value_counts()
+    return primeira_mensagem, ultima_mensagem
+
+# Função para análise de sentimento em cascata: léxico em português para todas as mensagens
+# e o modelo BERT de analise_total só para as de baixa confiança
+def analisar_sentimento(mensagens):
+    from analise_total import carregar_modelo_sentimento
+    from sentimento_lexico import classificar_cascata, NOMES_SENTIMENTO
+
+    rotulos, _ = classificar_cascata((mensagem[3] for mensagem in mensagens), carregar_modelo_sentimento)
+    return Counter(NOMES_SENTIMENTO[rotulo] for rotulo in rotulos.tolist()).most_common()
+
+# Função para exibir as primeiras linhas do DataFrame e conferir o processamento
+def primeiras_linhas(df):
+    return df.head()
+
+# Análises na ordem de exibição: (nome, títulos, função, entrada)
+# A entrada é a lista de mensagens ('mensagens'), o DataFrame ('df') ou a tabela de frequências ('frequencias').
+# Funções que devolvem mais de um valor têm um título para cada valor
+ANALISES = [
+    ('primeiras_linhas', ["Primeiras linhas do DataFrame processado:"], primeiras_linhas, 'df'),
+    ('palavras_mais_usadas', ["Palavras mais usadas:"], palavras_mais_usadas, 'frequencias'),
+    ('nuvem_palavras', [], gerar_nuvem_palavras, 'frequencias'),
+    ('mensagens_por_usuario', ["Mensagens por usuário:"], mensagens_por_usuario, 'mensagens'),
+    ('emojis', ["Emojis mais usados:"], contar_emojis, 'mensagens'),
+    ('horarios', ["Mensagens por faixa horária:"], analisar_horarios, 'df'),
+    ('dias_semana', ["Mensagens por dia da semana:"], analisar_dias_semana, 'df'),
+    ('mensagens_por_mes', ["Mensagens por mês:"], analisar_mensagens_por_mes, 'df'),
+    ('media_palavras', ["Média de palavras por mensagem por usuário:"], media_palavras_por_usuario, 'df'),
+    ('primeira_e_ultima', ["Quem manda a primeira mensagem do dia:", "Quem manda a última mensagem do dia:"],
+     primeira_e_ultima_mensagem, 'df'),
+    ('sentimento', ["Classificação de sentimentos (Positivo, Neutro, Negativo):"], analisar_sentimento, 'mensagens'),
+]
+
+def main(argv=None):
+    nomes = [nome for nome, _, _, _ in ANALISES]
+    parser = argparse.ArgumentParser(description='Exibe análises de uma conversa exportada do WhatsApp (iOS).')
+    parser.add_argument('arquivo', help='Caminho para o arquivo exportado')
+    parser.add_argument('--only', '--apenas', dest='apenas', nargs='+', choices=nomes, metavar='ANALISE',
+                        help=f"Executa apenas essas análises ({', '.join(nomes)})")
+    parser.add_argument('--skip', '--pular', dest='pular', nargs='+', choices=nomes, metavar='ANALISE',
+                        help='Não executa essas análises')
+    args = parser.parse_args(argv)
+
+    selecionadas = [analise for analise in ANALISES
+                    if (not args.apenas or analise[0] in args.apenas) and analise[0] not in (args.pular or [])]
+
+    # Carregando e processando as mensagens
+    dados = carregar_mensagens(args.arquivo)
+    mensagens = processar_mensagens(dados)
+
+    # O DataFrame (e o pandas) só é criado se alguma análise selecionada precisar dele
+    entradas = {'mensagens': mensagens}
+    if any(entrada == 'df' for *_, entrada in selecionadas):
+        entradas['df'] = criar_dataframe(mensagens)
+    if any(entrada == 'frequencias' for *_, entrada in selecionadas):
+        from conversa import impressao_digital
+
+        entradas['frequencias'] = FrequenciasPalavras(mensagens, impressao_digital(args.arquivo))
+
+    # Exibir análises no console
+    for _, titulos, funcao, entrada in selecionadas:
+        resultado = funcao(entradas[entrada])
+        valores = resultado if len(titulos) > 1 else [resultado]
+        for titulo, valor in zip(titulos, valores):
+            print(titulo)
+            print(valor)
+
+if __name__ == '__main__':
+    main()
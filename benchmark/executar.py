@@ -0,0 +1,171 @@
+import os
+import sys
+import json
+import math
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from functools import partial
+
+from perfilamento import pico_rss_mb
+from benchmark.gerador import gerar_exportacao, gerar_pasta_midia
+
+# Nomes das análises registradas em analise_total.py (mídia primeiro, na ordem do relatório)
+def nomes_analises():
+    import analise_total
+
+    return ([funcao.__name__ for funcao, _ in analise_total.ANALISES_MIDIA] +
+            [funcao.__name__ for funcao in analise_total.ANALISES_TEXTO])
+
+
+# Função para medir uma chamada, devolvendo tempo (s) e crescimento do pico de RSS (MB)
+def medir(funcao, *args):
+    rss_antes = pico_rss_mb()
+    inicio = time.perf_counter()
+    funcao(*args)
+    duracao = time.perf_counter() - inicio
+    rss_depois = pico_rss_mb()
+    crescimento = rss_depois - rss_antes if rss_antes is not None else None
+    return {'segundos': duracao, 'crescimento_rss_mb': crescimento}
+
+
+# Função para descartar as estruturas derivadas que as análises compartilham: o bitmask de características e
+# o índice invertido em Conversa.cache, e os índices e nuvens em cache_analises/ (no diretório de trabalho, que
+# é temporário). Sem isso o tempo de uma análise dependeria de outra ter rodado antes e pago a construção.
+def limpar_derivados(mensagens):
+    mensagens.cache.clear()
+    shutil.rmtree('cache_analises', ignore_errors=True)
+
+
+# Executado em um processo separado para cada tamanho, para que o pico de RSS seja isolado.
+# Cada medição começa sem estruturas derivadas, então inclui o custo de construir as que usa.
+def medir_no_processo(arquivo, pasta, analises, incluir_resumo):
+    import analise_total
+
+    resultados = {}
+    carregada = {}
+
+    def carregar():
+        carregada['conversa'] = analise_total.carregar_conversa(arquivo)
+
+    resultados['carregar_conversa'] = medir(carregar)
+    mensagens = carregada['conversa']
+    analises_midia = {funcao.__name__ for funcao, _ in analise_total.ANALISES_MIDIA}
+    for nome in analises:
+        funcao = getattr(analise_total, nome)
+        limpar_derivados(mensagens)
+        resultados[nome] = medir(funcao, pasta if nome in analises_midia else mensagens)
+    if incluir_resumo:
+        limpar_derivados(mensagens)
+        with tempfile.TemporaryDirectory() as tmp:
+            saida = os.path.join(tmp, 'resumo.txt')
+            # O relatório completo roda só as análises medidas acima (respeita --analises e --pular)
+            resultados['salvar_resumo_txt'] = medir(partial(analise_total.salvar_resumo_txt, selecionadas=analises),
+                                                    saida, mensagens, pasta, pasta)
+    return {'mensagens': len(mensagens), 'pico_rss_mb': pico_rss_mb(), 'analises': resultados}
+
+
+# Função para calcular o expoente de escala (inclinação de log(tempo) x log(n)) por mínimos quadrados
+def expoente_escala(tamanhos, tempos):
+    pontos = [(math.log(n), math.log(t)) for n, t in zip(tamanhos, tempos) if n > 0 and t > 0]
+    if len(pontos) < 2:
+        return None
+    media_x = sum(x for x, _ in pontos) / len(pontos)
+    media_y = sum(y for _, y in pontos) / len(pontos)
+    variancia = sum((x - media_x) ** 2 for x, _ in pontos)
+    if variancia == 0:
+        return None
+    return sum((x - media_x) * (y - media_y) for x, y in pontos) / variancia
+
+
+# Função para gerar (ou reaproveitar) a exportação sintética de um tamanho
+def preparar_dados(diretorio, tamanho, args):
+    arquivo = os.path.join(diretorio, f'conversa_{tamanho}_{args.usuarios}u_{args.semente}.txt')
+    if not os.path.exists(arquivo):
+        gerar_exportacao(arquivo, tamanho, 'android', usuarios=args.usuarios,
+                         densidade_emoji=args.densidade_emoji, densidade_giria=args.densidade_giria,
+                         proporcao_multilinha=args.proporcao_multilinha, semente=args.semente)
+    pasta = os.path.join(diretorio, f'midia_{args.figurinhas}_{args.audios}_{args.semente}')
+    if not os.path.exists(pasta):
+        gerar_pasta_midia(pasta, args.figurinhas, args.audios, semente=args.semente)
+    return arquivo, pasta
+
+
+# Função para montar a tabela com vazão e expoente de escala de cada análise
+def formatar_relatorio(medicoes):
+    tamanhos = [m['tamanho'] for m in medicoes]
+    nomes = list(medicoes[0]['analises'])
+    linhas = []
+    cabecalho = f"{'análise':<38}" + ''.join(f'{f"{n} msgs":>22}' for n in tamanhos) + f"{'expoente':>10}"
+    linhas.append(cabecalho)
+    linhas.append('-' * len(cabecalho))
+    for nome in nomes:
+        tempos = [m['analises'][nome]['segundos'] for m in medicoes]
+        celulas = ''
+        for tamanho, segundos in zip(tamanhos, tempos):
+            vazao = tamanho / segundos if segundos > 0 else float('inf')
+            celulas += f'{f"{segundos:.3f}s {vazao:,.0f}/s":>22}'
+        expoente = expoente_escala(tamanhos, tempos)
+        linhas.append(f'{nome:<38}{celulas}{(f"{expoente:.2f}" if expoente is not None else "-"):>10}')
+    linhas.append('')
+    for m in medicoes:
+        pico = f"{m['pico_rss_mb']:.1f} MB" if m['pico_rss_mb'] is not None else 'indisponível'
+        linhas.append(f"Pico de RSS com {m['tamanho']} mensagens: {pico}")
+    return '\n'.join(linhas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mede o desempenho de analise_total.py em conversas sintéticas.')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument('--analises', nargs='+', help='Padrão: todas as análises do relatório')
+    parser.add_argument('--pular', nargs='+', default=[], help='Análises a não medir (ex.: analise_sentimento)')
+    parser.add_argument('--sem-resumo', action='store_true', help='Não mede salvar_resumo_txt completo')
+    parser.add_argument('--usuarios', type=int, default=20)
+    parser.add_argument('--densidade-emoji', type=float, default=0.05)
+    parser.add_argument('--densidade-giria', type=float, default=0.1)
+    parser.add_argument('--proporcao-multilinha', type=float, default=0.02)
+    parser.add_argument('--figurinhas', type=int, default=200)
+    parser.add_argument('--audios', type=int, default=100)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--diretorio', default=os.path.join(tempfile.gettempdir(), 'benchmark_whatsapp'))
+    parser.add_argument('--json', help='Salva as medições brutas nesse arquivo')
+    parser.add_argument('--filho', nargs=2, metavar=('ARQUIVO', 'PASTA'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    analises = [nome for nome in (args.analises or nomes_analises()) if nome not in args.pular]
+
+    if args.filho:
+        resultado = medir_no_processo(args.filho[0], args.filho[1], analises, not args.sem_resumo)
+        print(json.dumps(resultado))
+        return
+
+    os.makedirs(args.diretorio, exist_ok=True)
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # O filho roda em um diretório temporário, para que os caches em disco (cache_analises/) não fiquem no
+    # repositório nem passem de uma medição para outra
+    ambiente = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [raiz, os.environ.get('PYTHONPATH')])))
+    medicoes = []
+    for tamanho in sorted(args.tamanhos):
+        arquivo, pasta = (os.path.abspath(caminho) for caminho in preparar_dados(args.diretorio, tamanho, args))
+        comando = [sys.executable, '-m', 'benchmark.executar', '--filho', arquivo, pasta,
+                   '--analises', *analises]
+        if args.sem_resumo:
+            comando.append('--sem-resumo')
+        with tempfile.TemporaryDirectory() as trabalho:
+            saida = subprocess.run(comando, cwd=trabalho, env=ambiente, capture_output=True, text=True,
+                                   check=True).stdout
+        medicao = json.loads(saida.strip().splitlines()[-1])
+        medicao['tamanho'] = tamanho
+        medicoes.append(medicao)
+        print(f'{tamanho} mensagens medidas (pico de RSS: {medicao["pico_rss_mb"]} MB)', file=sys.stderr)
+
+    print(formatar_relatorio(medicoes))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(medicoes, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+import os
+import random
+import argparse
+from datetime import datetime, timedelta
+
+# Formatos de exportação aceitos pelos três parsers do projeto:
+# - 'android': analise_total.py         -> 25/12/2023 14:30 - Fulano: mensagem
+# - 'ios': analise.py                   -> [25/12/23, 14:30:05] Fulano: mensagem
+# - 'ios_ano_completo': analisesemgrafico.py -> [25/12/2023, 14:30:05] Fulano: mensagem
+DIALETOS = {
+    'android': '{data:%d/%m/%Y %H:%M} - {usuario}: {mensagem}\n',
+    'ios': '[{data:%d/%m/%y, %H:%M:%S}] {usuario}: {mensagem}\n',
+    'ios_ano_completo': '[{data:%d/%m/%Y, %H:%M:%S}] {usuario}: {mensagem}\n',
+}
+
+PALAVRAS = [
+    'hoje', 'amanhã', 'trabalho', 'reunião', 'almoço', 'festa', 'futebol', 'jogo', 'filme', 'série',
+    'cerveja', 'praia', 'viagem', 'projeto', 'prova', 'faculdade', 'casa', 'carro', 'ônibus', 'chuva',
+    'bom', 'ruim', 'ótimo', 'legal', 'chato', 'cansado', 'triste', 'feliz', 'obrigado', 'valeu',
+    'parabéns', 'saudades', 'amigo', 'raiva', 'pior', 'gostei', 'quando', 'onde', 'porque', 'muito',
+    'pouco', 'agora', 'depois', 'sempre', 'nunca', 'então', 'gente', 'pessoal', 'galera', 'verdade',
+]
+GIRIAS = ['blz', 'vc', 'pq', 'tb', 'td', 'kd', 'vlw', 'tmj', 'aff', 'mano', 'tá', 'krl', 'kkkk', 'kkk', 'rsrs', 'hahaha']
+EMOJIS = ['😂', '🤣', '❤️', '👍', '😍', '🙏', '😭', '🔥', '😅', '👏']
+PLACEHOLDERS_MIDIA = ['<Mídia oculta>', 'IMG-20230101-WA0001.jpg (arquivo anexado)', 'STK-20230101-WA0002.webp (arquivo anexado)']
+
+
+# Função para gerar os nomes dos participantes de forma determinística
+def gerar_usuarios(quantidade, rng):
+    nomes = ['Ana', 'Bruno', 'Carla', 'Diego', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela', 'João']
+    sobrenomes = ['Silva', 'Souza', 'Oliveira', 'Santos', 'Lima', 'Pereira', 'Costa', 'Almeida']
+    usuarios = []
+    for i in range(quantidade):
+        nome = f'{nomes[i % len(nomes)]} {sobrenomes[(i // len(nomes)) % len(sobrenomes)]}'
+        if i >= len(nomes) * len(sobrenomes):
+            nome = f'{nome} {i}'
+        usuarios.append(nome)
+    # Alguns contatos aparecem apenas como número de telefone
+    for i in range(0, quantidade, 7):
+        usuarios[i] = f'+55 {rng.randint(11, 99)} 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}'
+    return usuarios
+
+
+# Função para montar o texto de uma mensagem sintética
+def gerar_texto(rng, densidade_emoji, densidade_giria, proporcao_multilinha):
+    sorteio = rng.random()
+    if sorteio < 0.03:
+        return rng.choice(PLACEHOLDERS_MIDIA)
+    tamanho = max(1, int(rng.expovariate(1 / 8)))
+    palavras = []
+    for _ in range(tamanho):
+        if rng.random() < densidade_giria:
+            palavras.append(rng.choice(GIRIAS))
+        else:
+            palavras.append(rng.choice(PALAVRAS))
+        if rng.random() < densidade_emoji:
+            palavras.append(rng.choice(EMOJIS))
+    texto = ' '.join(palavras)
+    if sorteio < 0.08:
+        texto += '?'
+    elif sorteio < 0.10:
+        texto = f'"{texto}"'
+    elif sorteio < 0.11:
+        texto += ' https://exemplo.com.br/' + str(rng.randint(1, 10 ** 6))
+    if rng.random() < proporcao_multilinha:
+        texto += '\n' + ' '.join(rng.choice(PALAVRAS) for _ in range(rng.randint(1, 6)))
+    return texto
+
+
+# Função para gerar as mensagens como um iterador de (data, usuario, texto), sem guardar tudo em memória
+def gerar_mensagens(quantidade, usuarios=20, densidade_emoji=0.05, densidade_giria=0.1,
+                    proporcao_multilinha=0.02, semente=42, inicio=datetime(2019, 1, 1)):
+    rng = random.Random(semente)
+    participantes = gerar_usuarios(usuarios, rng)
+    # Distribuição de atividade desigual, como em grupos reais
+    pesos = [1 / (i + 1) for i in range(len(participantes))]
+    data = inicio
+    usuario = rng.choices(participantes, pesos)[0]
+    for _ in range(quantidade):
+        # Conversas em rajadas: intervalos curtos na maior parte do tempo e pausas longas ocasionais
+        if rng.random() < 0.02:
+            data += timedelta(seconds=rng.randint(3600, 16 * 3600))
+        else:
+            data += timedelta(seconds=int(rng.expovariate(1 / 90)))
+        if rng.random() < 0.6:
+            usuario = rng.choices(participantes, pesos)[0]
+        yield data, usuario, gerar_texto(rng, densidade_emoji, densidade_giria, proporcao_multilinha)
+
+
+# Função para escrever um arquivo de exportação sintético no dialeto escolhido
+def gerar_exportacao(caminho, quantidade, dialeto='android', **opcoes):
+    formato = DIALETOS[dialeto]
+    with open(caminho, 'w', encoding='utf-8') as f:
+        if dialeto == 'android':
+            f.write('01/01/2019 00:00 - As mensagens e as chamadas são protegidas com a criptografia de ponta a ponta.\n')
+        buffer = []
+        for data, usuario, texto in gerar_mensagens(quantidade, **opcoes):
+            buffer.append(formato.format(data=data, usuario=usuario, mensagem=texto))
+            if len(buffer) >= 10000:
+                f.writelines(buffer)
+                buffer = []
+        f.writelines(buffer)
+    return caminho
+
+
+# Função para gerar a pasta de mídia com figurinhas (.webp, com repetições) e áudios (.opus)
+def gerar_pasta_midia(pasta, figurinhas=200, audios=100, figurinhas_distintas=20, tamanho_medio_kb=32, semente=42):
+    rng = random.Random(semente)
+    os.makedirs(pasta, exist_ok=True)
+    conteudos = [rng.randbytes(max(1, int(rng.expovariate(1 / tamanho_medio_kb)) * 1024))
+                 for _ in range(figurinhas_distintas)]
+    pesos = [1 / (i + 1) for i in range(figurinhas_distintas)]
+    for i in range(figurinhas):
+        with open(os.path.join(pasta, f'STK-{i:08d}-WA{i:04d}.webp'), 'wb') as f:
+            f.write(rng.choices(conteudos, pesos)[0])
+    for i in range(audios):
+        with open(os.path.join(pasta, f'PTT-{i:08d}-WA{i:04d}.opus'), 'wb') as f:
+            f.write(rng.randbytes(max(1, int(rng.expovariate(1 / tamanho_medio_kb)) * 1024)))
+    return pasta
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera uma exportação sintética de conversa do WhatsApp.')
+    parser.add_argument('saida')
+    parser.add_argument('--mensagens', type=int, default=10000)
+    parser.add_argument('--dialeto', choices=sorted(DIALETOS), default='android')
+    parser.add_argument('--usuarios', type=int, default=20)
+    parser.add_argument('--densidade-emoji', type=float, default=0.05)
+    parser.add_argument('--densidade-giria', type=float, default=0.1)
+    parser.add_argument('--proporcao-multilinha', type=float, default=0.02)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--pasta-midia', help='Também gera uma pasta de mídia nesse caminho')
+    parser.add_argument('--figurinhas', type=int, default=200)
+    parser.add_argument('--audios', type=int, default=100)
+    args = parser.parse_args()
+
+    gerar_exportacao(args.saida, args.mensagens, args.dialeto, usuarios=args.usuarios,
+                     densidade_emoji=args.densidade_emoji, densidade_giria=args.densidade_giria,
+                     proporcao_multilinha=args.proporcao_multilinha, semente=args.semente)
+    if args.pasta_midia:
+        gerar_pasta_midia(args.pasta_midia, args.figurinhas, args.audios, semente=args.semente)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import re
+from itertools import islice
+
+import numpy as np
+
+# Bits do vetor de características de cada mensagem (uint16)
+RISADA = 1      # risada (mesmo padrão de pontuacao_usuarios_mais_engracados)
+PERGUNTA = 2    # contém "?"
+MIDIA = 4       # anexo ou mídia omitida ("(arquivo anexado)", "<Mídia oculta>")
+SISTEMA = 8     # menciona "whatsapp" (avisos do sistema, como as mensagens de criptografia)
+CITACAO = 16    # mensagem inteira entre aspas, como em Conversa.entre_aspas()
+URL = 32        # contém um link
+
+# Os bits 8 a 10 guardam a faixa de comprimento: 0 = vazia, 1 = até 20 caracteres, 2 = até 100,
+# 3 = até 500 e 4 = mais de 500 (FAIXA_MUITO_LONGA)
+DESLOCAMENTO_FAIXA = 8
+LIMITES_FAIXAS = np.array([0, 20, 100, 500])
+FAIXA_MUITO_LONGA = 4
+
+# Detectores compilados uma única vez; cada um roda sobre o texto de um bloco inteiro de mensagens.
+# Os emojis de risada ficam num detector à parte: misturados às letras na mesma alternância (e com
+# IGNORECASE), deixam a busca bem mais lenta. Links são procurados só em minúsculas, como o WhatsApp os exporta.
+DETECTORES = (
+    (RISADA, re.compile(r'k{2,}|ha{2,}|rs{2,}', re.IGNORECASE)),
+    (RISADA, re.compile(r'[😂🤣]')),
+    (PERGUNTA, re.compile(r'\?')),
+    (MIDIA, re.compile(r'\(arquivo|<mídia', re.IGNORECASE)),
+    (SISTEMA, re.compile(r'whatsapp', re.IGNORECASE)),
+    (URL, re.compile(r'https?://|www\.')),
+)
+
+# Mensagens processadas por bloco ao extrair as características
+MENSAGENS_POR_BLOCO = 100_000
+
+
+# Função para marcar os bits dos detectores em um bloco de textos.
+# Os textos são unidos por '\n' (que não aparece em nenhuma mensagem nem em nenhum padrão), cada detector
+# percorre o bloco uma vez e a posição de cada ocorrência é convertida na mensagem correspondente.
+def marcar_bloco(textos):
+    marcas = np.zeros(len(textos), dtype=np.uint16)
+    inicios = np.cumsum([0] + [len(texto) + 1 for texto in textos[:-1]])
+    bloco = '\n'.join(textos)
+    for bit, padrao in DETECTORES:
+        posicoes = np.fromiter((ocorrencia.start() for ocorrencia in padrao.finditer(bloco)), dtype=np.int64)
+        if len(posicoes):
+            marcas[np.searchsorted(inicios, posicoes, side='right') - 1] |= bit
+    return marcas
+
+
+# Função para calcular o vetor de características de todas as mensagens de uma conversa (ou recorte)
+def extrair_caracteristicas(mensagens):
+    comprimentos = mensagens.comprimentos()
+    caracteristicas = (np.searchsorted(LIMITES_FAIXAS, comprimentos).astype(np.uint16) << DESLOCAMENTO_FAIXA)
+    caracteristicas[mensagens.entre_aspas()] |= CITACAO
+    textos = iter(mensagens.textos)
+    for bloco in range(0, len(mensagens), MENSAGENS_POR_BLOCO):
+        lote = list(islice(textos, MENSAGENS_POR_BLOCO))
+        caracteristicas[bloco:bloco + len(lote)] |= marcar_bloco(lote)
+    return caracteristicas
+
+
+# Função para obter as características das mensagens do recorte.
+# São calculadas uma vez para a conversa inteira e guardadas em Conversa.cache, compartilhado pelos recortes
+# (como os períodos de --por), então as análises seguintes só fatiam o array.
+def caracteristicas_mensagens(mensagens):
+    caracteristicas = mensagens.derivado('caracteristicas', lambda: extrair_caracteristicas(mensagens.completa()))
+    return caracteristicas[mensagens.inicio:mensagens.fim]
+
+
+# Função para extrair a faixa de comprimento (0 a FAIXA_MUITO_LONGA) de cada mensagem
+def faixa_comprimento(caracteristicas):
+    return (caracteristicas >> DESLOCAMENTO_FAIXA) & 7
+
+
+# Função para ordenar usuários por contagem, como Counter.most_common: empates ficam na ordem da primeira
+# ocorrência. 'ids' são os ids de usuário das ocorrências, na ordem das mensagens.
+# Devolve uma lista de (id, contagem), só com contagens positivas.
+def mais_frequentes(ids):
+    usuarios, primeira, contagens = np.unique(ids, return_index=True, return_counts=True)
+    ordem = np.lexsort((primeira, -contagens))
+    return list(zip(usuarios[ordem].tolist(), contagens[ordem].tolist()))
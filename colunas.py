@@ -0,0 +1,20 @@
+import numpy as np
+
+
+# Função para converter data ('dd/mm/aaaa' ou 'dd/mm/aa') e hora ('HH:MM' ou 'HH:MM:SS') em segundos desde 1970
+# A conversão é feita de uma vez pelo NumPy (datetime64), sem um strptime por mensagem.
+def timestamps_epoch(datas, horas):
+    isos = []
+    for data, hora in zip(datas, horas):
+        ano = data[6:] if len(data) == 10 else '20' + data[6:]
+        isos.append(f'{ano}-{data[3:5]}-{data[0:2]}T{hora}')
+    return np.array(isos, dtype='datetime64[s]').astype(np.int64)
+
+
+# Função para trocar os nomes dos usuários por ids inteiros (na ordem da primeira aparição)
+def codificar_usuarios(usuarios):
+    ids_por_nome = {}
+    ids = np.fromiter((ids_por_nome.setdefault(usuario, len(ids_por_nome)) for usuario in usuarios),
+                      dtype=np.int32, count=len(usuarios))
+    return ids, list(ids_por_nome)
+
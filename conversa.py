@@ -0,0 +1,196 @@
+import hashlib
+import threading
+from datetime import datetime, date, timedelta
+from itertools import islice
+
+import numpy as np
+
+from colunas import timestamps_epoch, codificar_usuarios
+
+
+# Função para converter um limite de intervalo (datetime, date, 'aaaa-mm-dd', 'aaaa-mm-dd HH:MM' ou epoch) em epoch
+# Um limite final dado só como data inclui o dia inteiro.
+def limite_epoch(limite, final=False):
+    if limite is None or isinstance(limite, (int, np.integer)):
+        return limite
+    if isinstance(limite, str):
+        so_data = len(limite) == 10
+        limite = datetime.fromisoformat(limite)
+        if so_data and final:
+            limite += timedelta(days=1)
+    elif isinstance(limite, date) and not isinstance(limite, datetime):
+        limite = datetime(limite.year, limite.month, limite.day) + (timedelta(days=1) if final else timedelta())
+    return int(np.datetime64(limite.replace(tzinfo=None), 's').astype(np.int64))
+
+
+# Função para calcular a impressão digital (sha256) de um arquivo exportado, lendo em blocos
+def impressao_digital(caminho):
+    hash_sha = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1 << 20), b''):
+            hash_sha.update(bloco)
+    return hash_sha.hexdigest()
+
+
+# Conversa em colunas, ordenada por timestamp.
+# Iterar sobre ela produz tuplas (data, hora, usuario, texto), como a lista devolvida por processar_mensagens,
+# então as análises funcionam sem mudanças. Um recorte (intervalo, fatia) compartilha as mesmas colunas e
+# guarda apenas os índices [inicio, fim): nenhuma mensagem é copiada.
+# 'impressao' identifica o arquivo de origem (None para conversas montadas em memória) e 'cache' guarda
+# estruturas derivadas da conversa inteira (como o índice invertido), compartilhadas por todos os recortes.
+# 'travas' guarda uma trava por estrutura derivada, para que threads concorrentes não a construam juntas.
+# 'versao_carregador' identifica o código que leu o arquivo (o parser das linhas), para o cache de resultados.
+class Conversa:
+    def __init__(self, datas, horas, usuarios, textos, timestamps, usuario_id, nomes, inicio=0, fim=None,
+                 impressao=None, cache=None, travas=None, versao_carregador=None):
+        self.colunas = (datas, horas, usuarios, textos)
+        self._timestamps = timestamps
+        self._usuario_id = usuario_id
+        self.nomes = nomes
+        self.inicio = inicio
+        self.fim = len(timestamps) if fim is None else fim
+        self.impressao = impressao
+        self.cache = {} if cache is None else cache
+        self.travas = {} if travas is None else travas
+        self.versao_carregador = versao_carregador
+
+    def __len__(self):
+        return self.fim - self.inicio
+
+    def __iter__(self):
+        return zip(*(self.iterar_coluna(coluna) for coluna in self.colunas))
+
+    # Função para percorrer uma coluna só no trecho do recorte (colunas mapeadas decodificam só esse trecho)
+    def iterar_coluna(self, coluna):
+        if hasattr(coluna, 'iterar'):
+            return coluna.iterar(self.inicio, self.fim)
+        return islice(coluna, self.inicio, self.fim)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            inicio, fim, passo = indice.indices(len(self))
+            if passo != 1:
+                raise ValueError('Recortes de Conversa não aceitam passo')
+            return self.recorte(self.inicio + inicio, self.inicio + max(inicio, fim))
+        if indice < 0:
+            indice += len(self)
+        if not 0 <= indice < len(self):
+            raise IndexError('índice fora da conversa')
+        return tuple(coluna[self.inicio + indice] for coluna in self.colunas)
+
+    # Função para criar um recorte que compartilha as colunas desta conversa
+    def recorte(self, inicio, fim):
+        return Conversa(*self.colunas, self._timestamps, self._usuario_id, self.nomes, inicio, fim,
+                        self.impressao, self.cache, self.travas, self.versao_carregador)
+
+    # Função para obter uma estrutura derivada da conversa inteira, guardada em self.cache com esse nome.
+    # Com várias threads pedindo a mesma estrutura (como no servidor), só uma executa calcular(); as outras
+    # esperam e recebem o mesmo objeto.
+    def derivado(self, nome, calcular):
+        valor = self.cache.get(nome)
+        if valor is not None:
+            return valor
+        with self.travas.setdefault(nome, threading.Lock()):
+            valor = self.cache.get(nome)
+            if valor is None:
+                valor = self.cache[nome] = calcular()
+        return valor
+
+    # Função para obter a conversa inteira a partir de qualquer recorte
+    def completa(self):
+        return self.recorte(0, len(self._timestamps))
+
+    # Timestamps (epoch, em segundos) das mensagens do recorte, como visão do array completo
+    @property
+    def timestamps(self):
+        return self._timestamps[self.inicio:self.fim]
+
+    # Ids dos usuários (índices em self.nomes) das mensagens do recorte, como visão do array completo
+    @property
+    def usuario_id(self):
+        return self._usuario_id[self.inicio:self.fim]
+
+    # Textos das mensagens do recorte, decodificados sob demanda quando a coluna é mapeada
+    @property
+    def textos(self):
+        return self.iterar_coluna(self.colunas[3])
+
+    # Função para ler o texto de uma única mensagem do recorte
+    def texto(self, indice):
+        return self.colunas[3][self.inicio + indice]
+
+    # Função para obter o comprimento (em caracteres) de cada mensagem do recorte como array
+    def comprimentos(self):
+        textos = self.colunas[3]
+        if hasattr(textos, 'comprimentos'):
+            return textos.comprimentos(self.inicio, self.fim)
+        return np.fromiter(map(len, self.textos), dtype=np.int64, count=len(self))
+
+    # Função para obter o número de palavras (como em str.split()) de cada mensagem do recorte
+    def contagem_palavras(self):
+        textos = self.colunas[3]
+        if hasattr(textos, 'contagem_palavras'):
+            return textos.contagem_palavras(self.inicio, self.fim)
+        return np.fromiter((len(texto.split()) for texto in self.textos), dtype=np.int64, count=len(self))
+
+    # Função para marcar as mensagens do recorte que estão inteiramente entre aspas duplas
+    def entre_aspas(self):
+        textos = self.colunas[3]
+        if hasattr(textos, 'entre_aspas'):
+            return textos.entre_aspas(self.inicio, self.fim)
+        return np.fromiter((len(texto) >= 3 and texto[0] == '"' and texto[-1] == '"' for texto in self.textos),
+                           dtype=bool, count=len(self))
+
+    # Função para recortar as mensagens com timestamp em [desde, ate) por busca binária
+    def intervalo(self, desde=None, ate=None):
+        timestamps = self.timestamps
+        inicio = 0 if desde is None else int(np.searchsorted(timestamps, limite_epoch(desde), 'left'))
+        fim = len(timestamps) if ate is None else int(np.searchsorted(timestamps, limite_epoch(ate, final=True), 'left'))
+        return self.recorte(self.inicio + inicio, self.inicio + max(inicio, fim))
+
+    # Função para dividir a conversa em recortes mensais ('mes') ou semanais ('semana', começando na segunda)
+    # Devolve uma lista de (rótulo, recorte); períodos sem mensagens são omitidos.
+    def periodos(self, frequencia='mes'):
+        timestamps = self.timestamps
+        if not len(timestamps):
+            return []
+        segundos = timestamps.astype('datetime64[s]')
+        if frequencia == 'mes':
+            unidades = segundos.astype('datetime64[M]')
+        elif frequencia == 'semana':
+            # datetime64[W] começa na quinta (1970-01-01); desloca para que as semanas comecem na segunda
+            unidades = (segundos.astype('datetime64[D]') - np.timedelta64(4, 'D')).astype('datetime64[W]')
+        else:
+            raise ValueError("Frequência deve ser 'mes' ou 'semana'")
+        # Como os timestamps estão ordenados, as fronteiras dos períodos saem de uma diferença
+        fronteiras = np.flatnonzero(unidades[1:] != unidades[:-1]) + 1
+        inicios = np.concatenate([[0], fronteiras])
+        fins = np.concatenate([fronteiras, [len(timestamps)]])
+        recortes = []
+        for inicio, fim in zip(inicios, fins):
+            if frequencia == 'mes':
+                rotulo = str(unidades[inicio])
+            else:
+                rotulo = str((unidades[inicio] + np.timedelta64(4, 'D')).astype('datetime64[D]'))
+            recortes.append((rotulo, self.recorte(self.inicio + int(inicio), self.inicio + int(fim))))
+        return recortes
+
+
+# Função para montar a Conversa a partir de colunas já separadas, ordenando por timestamp
+# A coluna de textos pode ser uma lista de str ou uma coluna mapeada (TextosMapeados).
+def criar_conversa_colunas(datas, horas, usuarios, textos, impressao=None, versao_carregador=None):
+    timestamps = timestamps_epoch(datas, horas)
+    if len(timestamps) and (np.diff(timestamps) < 0).any():
+        ordem = np.argsort(timestamps, kind='stable')
+        timestamps = timestamps[ordem]
+        datas, horas, usuarios = ([coluna[i] for i in ordem] for coluna in (datas, horas, usuarios))
+        textos = textos.reordenar(ordem) if hasattr(textos, 'reordenar') else [textos[i] for i in ordem]
+    usuario_id, nomes = codificar_usuarios(usuarios)
+    return Conversa(datas, horas, usuarios, textos, timestamps, usuario_id, nomes, impressao=impressao,
+                    versao_carregador=versao_carregador)
+
+
+# Função para montar a Conversa a partir da lista [data, hora, usuario, texto]
+def criar_conversa(mensagens, impressao=None, versao_carregador=None):
+    return criar_conversa_colunas([m[0] for m in mensagens], [m[1] for m in mensagens],
+                                  [m[2] for m in mensagens], [m[3] for m in mensagens], impressao, versao_carregador)
@@ -0,0 +1,121 @@
+import numpy as np
+
+# Tamanho (em caracteres) dos trechos comparados entre mensagens
+TAMANHO_SHINGLE = 5
+
+# Assinatura MinHash: N_PERMUTACOES mínimos, divididos em BANDAS para o LSH.
+# Com 16 bandas de 4 linhas, pares com similaridade de Jaccard acima de ~0,5 quase sempre viram candidatos.
+N_PERMUTACOES = 64
+BANDAS = 16
+
+# Similaridade (estimada pelas assinaturas) mínima para dois candidatos serem considerados o mesmo conteúdo
+LIMIAR_SIMILARIDADE = 0.5
+
+# Mensagens processadas por bloco no cálculo das assinaturas, para limitar os arrays temporários
+MENSAGENS_POR_BLOCO = 50_000
+
+PRIMO_FNV = np.uint64(0x100000001B3)
+BASE_HASH = np.uint64(0x9E3779B97F4A7C15)
+
+
+# Função para normalizar o texto antes da comparação (minúsculas e espaços colapsados)
+def normalizar(texto):
+    return ' '.join(texto.lower().split())
+
+
+# Função para calcular o hash de todos os trechos de k caracteres de um bloco de textos de uma vez.
+# Devolve os hashes e, para cada texto, onde começam os seus trechos no array de hashes.
+def hashes_shingles(textos, k=TAMANHO_SHINGLE):
+    # Textos menores que k viram um único trecho (o texto inteiro, completado com zeros)
+    textos = [texto.ljust(k, '\0') for texto in textos]
+    tamanhos = np.fromiter(map(len, textos), dtype=np.int64, count=len(textos))
+    codigos = np.frombuffer(''.join(textos).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    n_trechos = len(codigos) - k + 1
+    hashes = np.zeros(n_trechos, dtype=np.uint64)
+    for j in range(k):
+        hashes = hashes * BASE_HASH + codigos[j:j + n_trechos]
+    # Descarta os trechos que atravessam a fronteira entre dois textos
+    fins = np.cumsum(tamanhos)
+    texto_de = np.repeat(np.arange(len(textos)), tamanhos)[:n_trechos]
+    validos = np.arange(n_trechos) + k <= fins[texto_de]
+    inicios = np.r_[0, np.cumsum(tamanhos - k + 1)[:-1]]
+    return hashes[validos], inicios
+
+
+# Função para calcular as assinaturas MinHash dos textos (uma linha de n_permutacoes valores por texto).
+# Cada permutação é simulada por um hash multiplicativo (a * h + b) sobre os hashes dos trechos.
+def assinaturas_minhash(textos, k=TAMANHO_SHINGLE, n_permutacoes=N_PERMUTACOES, semente=0):
+    rng = np.random.default_rng(semente)
+    a = rng.integers(1, 2 ** 63, n_permutacoes, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, n_permutacoes, dtype=np.uint64)
+    assinaturas = np.empty((len(textos), n_permutacoes), dtype=np.uint32)
+    for bloco in range(0, len(textos), MENSAGENS_POR_BLOCO):
+        hashes, inicios = hashes_shingles(textos[bloco:bloco + MENSAGENS_POR_BLOCO], k)
+        if not len(inicios):
+            continue
+        permutado = np.empty_like(hashes)
+        for p in range(n_permutacoes):
+            np.multiply(hashes, a[p], out=permutado)
+            np.add(permutado, b[p], out=permutado)
+            np.right_shift(permutado, np.uint64(32), out=permutado)
+            assinaturas[bloco:bloco + len(inicios), p] = np.minimum.reduceat(permutado, inicios)
+    return assinaturas
+
+
+# Função para encontrar pares candidatos pelo LSH: textos com todas as linhas iguais em alguma banda.
+# Cada grupo de uma banda gera arestas do seu primeiro texto para os demais (em vez de todos os pares).
+def pares_candidatos(assinaturas, bandas=BANDAS):
+    linhas_por_banda = assinaturas.shape[1] // bandas
+    origens, destinos = [], []
+    for banda in range(bandas):
+        chave = np.zeros(len(assinaturas), dtype=np.uint64)
+        for coluna in range(banda * linhas_por_banda, (banda + 1) * linhas_por_banda):
+            chave = (chave ^ assinaturas[:, coluna]) * PRIMO_FNV
+        ordem = np.argsort(chave, kind='stable')
+        chave = chave[ordem]
+        novo = np.r_[True, chave[1:] != chave[:-1]]
+        primeiro = ordem[np.maximum.accumulate(np.where(novo, np.arange(len(ordem)), 0))]
+        origens.append(primeiro[~novo])
+        destinos.append(ordem[~novo])
+    if not origens:
+        vazio = np.zeros(0, dtype=np.int64)
+        return vazio, vazio
+    return np.concatenate(origens), np.concatenate(destinos)
+
+
+# Função para juntar os textos ligados por arestas em grupos (componentes conexas).
+# Propaga o menor índice pelas arestas e encurta os caminhos até estabilizar; cada texto
+# recebe como rótulo o menor índice do seu grupo.
+def componentes(n, origens, destinos):
+    rotulos = np.arange(n)
+    while True:
+        menor = np.minimum(rotulos[origens], rotulos[destinos])
+        novos = rotulos.copy()
+        np.minimum.at(novos, origens, menor)
+        np.minimum.at(novos, destinos, menor)
+        novos = novos[novos]
+        if np.array_equal(novos, rotulos):
+            return rotulos
+        rotulos = novos
+
+
+# Função para agrupar textos quase idênticos em tempo quase linear (MinHash + LSH).
+# Devolve, para cada texto, o índice do primeiro texto do seu grupo (textos sem duplicatas são o próprio grupo).
+def agrupar_quase_duplicatas(textos, k=TAMANHO_SHINGLE, n_permutacoes=N_PERMUTACOES, bandas=BANDAS,
+                             limiar=LIMIAR_SIMILARIDADE, semente=0):
+    # Cópias exatas (após normalizar) compartilham a mesma assinatura, calculada uma vez só
+    ids_por_texto = {}
+    inverso = np.fromiter((ids_por_texto.setdefault(normalizar(texto), len(ids_por_texto)) for texto in textos),
+                          dtype=np.int64, count=len(textos))
+    primeiro = np.full(len(ids_por_texto), len(textos), dtype=np.int64)
+    np.minimum.at(primeiro, inverso, np.arange(len(textos)))
+    if len(ids_por_texto) < 2:
+        return primeiro[inverso]
+    assinaturas = assinaturas_minhash(list(ids_por_texto), k, n_permutacoes, semente)
+    origens, destinos = pares_candidatos(assinaturas, bandas)
+    # Confirma os candidatos pela fração de mínimos iguais, que estima a similaridade de Jaccard
+    similaridade = (assinaturas[origens] == assinaturas[destinos]).mean(axis=1)
+    confirmados = similaridade >= limiar
+    # Os textos distintos estão na ordem da primeira aparição, então o menor id do grupo é o do primeiro texto
+    rotulos = componentes(len(ids_por_texto), origens[confirmados], destinos[confirmados])
+    return primeiro[rotulos[inverso]]
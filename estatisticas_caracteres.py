@@ -0,0 +1,107 @@
+from collections import namedtuple
+from functools import lru_cache
+from itertools import islice
+
+import numpy as np
+
+# Classes de caractere, como bits de uma tabela indexada pelo código Unicode
+MAIUSCULA = 1    # str.isupper()
+PONTUACAO = 2    # um dos SINAIS_PONTUACAO
+DIGITO = 4       # str.isdigit()
+LETRA = 8        # str.isalpha()
+INICIAL = 16     # maiúscula ou titlecase (pode abrir uma palavra em str.istitle())
+MINUSCULA = 32   # str.islower()
+ESPACO = 64      # str.isspace() (separa palavras em str.split())
+
+SINAIS_PONTUACAO = '.,!?;:'
+
+# Mensagens processadas por bloco; só os arrays do bloco e as somas por usuário ficam em memória
+MENSAGENS_POR_BLOCO = 100_000
+
+# Contagens de cada mensagem de um bloco (caracteres como em len(), palavras como em str.split())
+EstatisticasMensagens = namedtuple('EstatisticasMensagens', ['caracteres', 'maiusculas', 'pontuacao', 'digitos',
+                                                             'letras', 'palavras', 'palavras_titulo'])
+
+
+# Função para calcular os bits de classe de um caractere
+def classe_caractere(caractere):
+    return ((MAIUSCULA if caractere.isupper() else 0) | (PONTUACAO if caractere in SINAIS_PONTUACAO else 0)
+            | (DIGITO if caractere.isdigit() else 0) | (LETRA if caractere.isalpha() else 0)
+            | (INICIAL if caractere.istitle() else 0) | (MINUSCULA if caractere.islower() else 0)
+            | (ESPACO if caractere.isspace() else 0))
+
+
+# Função para montar (uma vez por processo) a tabela de classes do plano básico multilíngue (BMP)
+@lru_cache(maxsize=None)
+def tabela_classes():
+    return np.fromiter((classe_caractere(chr(codigo)) for codigo in range(0x10000)), dtype=np.uint8, count=0x10000)
+
+
+# Função para obter a classe de cada código; fora do BMP (emojis etc.) cada código distinto é classificado uma vez
+def classes_codigos(codigos):
+    astrais = codigos > 0xFFFF
+    if not astrais.any():
+        return tabela_classes()[codigos]
+    classes = tabela_classes()[np.minimum(codigos, 0xFFFF)]
+    distintos, inverso = np.unique(codigos[astrais], return_inverse=True)
+    classes[astrais] = np.array([classe_caractere(chr(codigo)) for codigo in distintos.tolist()],
+                                dtype=np.uint8)[inverso]
+    return classes
+
+
+# Função para contar as classes de caractere de cada texto de um bloco em uma única passada vetorizada.
+# Os textos são concatenados em um buffer UTF-32 (um código por caractere) e cada contagem por mensagem
+# sai de uma redução por trechos. Com palavras=True também conta as palavras e as que seguem str.istitle().
+def estatisticas_bloco(textos, palavras=True):
+    caracteres = np.fromiter(map(len, textos), dtype=np.int64, count=len(textos))
+    codigos = np.frombuffer(''.join(textos).encode('utf-32-le'), dtype=np.uint32)
+    classes = classes_codigos(codigos)
+    com_texto = caracteres > 0
+    inicios = (np.cumsum(caracteres) - caracteres)[com_texto]
+
+    def somar(marcas):
+        somas = np.zeros(len(caracteres), dtype=np.int64)
+        if len(inicios):
+            somas[com_texto] = np.add.reduceat(marcas.view(np.uint8), inicios, dtype=np.int64)
+        return somas
+
+    contagens = [somar((classes & bit) != 0) for bit in (MAIUSCULA, PONTUACAO, DIGITO, LETRA)]
+    if not palavras:
+        return EstatisticasMensagens(caracteres, *contagens, None, None)
+
+    # Uma palavra começa em um caractere que não é espaço no início da mensagem ou depois de um espaço
+    espaco = (classes & ESPACO) != 0
+    inicio_palavra = ~espaco & np.r_[True, espaco[:-1]]
+    inicio_palavra[inicios] = ~espaco[inicios]
+    # Regras de str.istitle(): maiúscula só depois de caractere sem caixa, minúscula só depois de um com caixa
+    com_caixa = (classes & (INICIAL | MINUSCULA)) != 0
+    anterior_com_caixa = ~inicio_palavra & np.r_[False, com_caixa[:-1]]
+    violacao = (((classes & INICIAL) != 0) & anterior_com_caixa) | (((classes & MINUSCULA) != 0) & ~anterior_com_caixa)
+    # Cada palavra é reduzida do seu primeiro caractere até o início da próxima; os espaços no meio
+    # do caminho não têm caixa nem violam a regra, então não mudam o resultado
+    inicios_palavras = np.flatnonzero(inicio_palavra)
+    titulo = np.zeros(len(codigos), dtype=bool)
+    if len(inicios_palavras):
+        titulo[inicios_palavras] = (np.logical_or.reduceat(com_caixa, inicios_palavras)
+                                    & ~np.logical_or.reduceat(violacao, inicios_palavras))
+    return EstatisticasMensagens(caracteres, *contagens, somar(inicio_palavra), somar(titulo))
+
+
+# Função para calcular, por usuário, a média por mensagem de razões entre as contagens (em porcentagem).
+# 'razoes' é uma lista de pares (numerador, denominador) com nomes de campos de EstatisticasMensagens;
+# mensagens com denominador zero não entram na média daquela razão. Só somas e contagens por usuário
+# são mantidas entre os blocos. Devolve (mensagens consideradas, médias), cada um com uma linha por razão.
+def porcentagens_medias_por_usuario(textos, usuario_id, n_usuarios, razoes, palavras=True):
+    somas = np.zeros((len(razoes), n_usuarios))
+    contagens = np.zeros((len(razoes), n_usuarios), dtype=np.int64)
+    textos = iter(textos)
+    for bloco in range(0, len(usuario_id), MENSAGENS_POR_BLOCO):
+        ids = usuario_id[bloco:bloco + MENSAGENS_POR_BLOCO]
+        estatisticas = estatisticas_bloco(list(islice(textos, len(ids))), palavras)
+        for k, (numerador, denominador) in enumerate(razoes):
+            numerador, denominador = getattr(estatisticas, numerador), getattr(estatisticas, denominador)
+            validos = denominador > 0
+            porcentagens = numerador[validos] / denominador[validos] * 100
+            somas[k] += np.bincount(ids[validos], weights=porcentagens, minlength=n_usuarios)
+            contagens[k] += np.bincount(ids[validos], minlength=n_usuarios)
+    return contagens, somas / np.maximum(contagens, 1)
@@ -0,0 +1,127 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Grafo esparso em formato de coordenadas (COO): a aresta i vai de origem[i] para destino[i] com peso[i].
+# A origem é quem falou antes e o destino é quem respondeu, como em conexoes_entre_membros.
+Grafo = namedtuple('Grafo', ['origem', 'destino', 'peso', 'n_usuarios'])
+
+# Acima desse número de células a matriz usuário x usuário não é acumulada densamente
+LIMITE_MATRIZ_DENSA = 4_000_000
+
+# Mensagens processadas por bloco na construção do grafo, para limitar os arrays temporários
+MENSAGENS_POR_BLOCO = 1_000_000
+
+
+# Função para calcular as arestas creditadas pelas mensagens [inicio, fim), olhando até 'max_anteriores'
+# mensagens antes do bloco. Devolve (chaves origem * n_usuarios + destino, pesos), uma entrada por crédito.
+def arestas_bloco(usuario_id, timestamps, n_usuarios, inicio, fim, janela, meia_vida, max_anteriores):
+    base = max(0, inicio - max_anteriores)
+    usuario_id = usuario_id[base:fim]
+    timestamps = timestamps[base:fim]
+    contexto = inicio - base
+    n = len(usuario_id)
+    chaves = []
+    pesos = []
+    for k in range(1, min(max_anteriores, n - 1) + 1):
+        atual = usuario_id[k:]
+        anterior = usuario_id[:n - k]
+        decorrido = timestamps[k:] - timestamps[:n - k]
+        valido = (decorrido <= janela) & (anterior != atual)
+        # Um falante que já apareceu em uma defasagem menor já foi creditado por essa mensagem
+        for j in range(1, k):
+            valido &= usuario_id[k - j:n - j] != anterior
+        # As mensagens de contexto (antes do bloco) são creditadas no bloco anterior
+        valido[:max(0, contexto - k)] = False
+        chaves.append(anterior[valido] * n_usuarios + atual[valido])
+        pesos.append(np.exp2(-decorrido[valido] / meia_vida))
+    if not chaves:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+    return np.concatenate(chaves), np.concatenate(pesos)
+
+
+# Função para construir o grafo de interações com passadas vetorizadas por bloco de mensagens.
+# Cada mensagem credita até 'max_anteriores' falantes distintos que falaram nos 'janela' segundos anteriores,
+# com peso decaindo exponencialmente pelo tempo decorrido (metade a cada 'meia_vida' segundos).
+# Entre os blocos só ficam em memória os pesos acumulados por par de usuários, não os créditos de cada mensagem.
+def construir_grafo(usuario_id, timestamps, n_usuarios, janela=600, meia_vida=120, max_anteriores=5):
+    usuario_id = np.asarray(usuario_id, dtype=np.int64)
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    n = len(usuario_id)
+    densa = n_usuarios * n_usuarios <= LIMITE_MATRIZ_DENSA
+    matriz = np.zeros(n_usuarios * n_usuarios) if densa else None
+    chaves = np.array([], dtype=np.int64)
+    pesos = np.array([], dtype=np.float64)
+    for inicio in range(0, n, MENSAGENS_POR_BLOCO):
+        chaves_bloco, pesos_bloco = arestas_bloco(usuario_id, timestamps, n_usuarios, inicio,
+                                                  inicio + MENSAGENS_POR_BLOCO, janela, meia_vida, max_anteriores)
+        if densa:
+            matriz += np.bincount(chaves_bloco, weights=pesos_bloco, minlength=n_usuarios * n_usuarios)
+        else:
+            chaves, inverso = np.unique(np.concatenate([chaves, chaves_bloco]), return_inverse=True)
+            pesos = np.bincount(inverso, weights=np.concatenate([pesos, pesos_bloco]), minlength=len(chaves))
+
+    if densa:
+        chaves = np.flatnonzero(matriz)
+        pesos = matriz[chaves]
+    return Grafo(chaves // n_usuarios, chaves % n_usuarios, pesos, n_usuarios)
+
+
+# Função para calcular os graus ponderados: (quanto cada um foi respondido, quanto cada um respondeu)
+def graus(grafo):
+    grau_saida = np.bincount(grafo.origem, weights=grafo.peso, minlength=grafo.n_usuarios)
+    grau_entrada = np.bincount(grafo.destino, weights=grafo.peso, minlength=grafo.n_usuarios)
+    return grau_saida, grau_entrada
+
+
+# Função para calcular a centralidade no estilo PageRank por iteração de potência sobre as arestas esparsas.
+# A importância flui de quem responde para quem foi respondido.
+def pagerank(grafo, amortecimento=0.85, max_iteracoes=100, tolerancia=1e-10):
+    n = grafo.n_usuarios
+    if n == 0:
+        return np.array([])
+    de, para = grafo.destino, grafo.origem
+    saida = np.bincount(de, weights=grafo.peso, minlength=n)
+    peso_normalizado = grafo.peso / saida[de]
+    sem_saida = saida == 0
+    rank = np.full(n, 1 / n)
+    for _ in range(max_iteracoes):
+        novo = np.bincount(para, weights=peso_normalizado * rank[de], minlength=n)
+        novo = amortecimento * (novo + rank[sem_saida].sum() / n) + (1 - amortecimento) / n
+        if np.abs(novo - rank).sum() < tolerancia:
+            return novo
+        rank = novo
+    return rank
+
+
+# Função para agrupar os usuários em comunidades por propagação de rótulos sobre o grafo simetrizado.
+# A cada iteração metade dos nós (sorteados com semente fixa) adota o rótulo de maior peso entre os vizinhos,
+# o que evita as oscilações da versão totalmente síncrona. Devolve um id de comunidade por usuário,
+# numerado da maior para a menor comunidade.
+def comunidades(grafo, max_iteracoes=50, semente=0):
+    n = grafo.n_usuarios
+    if n == 0:  # Conversa (ou recorte) vazia
+        return np.zeros(0, dtype=np.int64)
+    rng = np.random.default_rng(semente)
+    u = np.concatenate([grafo.origem, grafo.destino, np.arange(n)])
+    v = np.concatenate([grafo.destino, grafo.origem, np.arange(n)])
+    # A aresta de cada nó para si mesmo tem peso mínimo, só para desempatar a favor do rótulo atual
+    w = np.concatenate([grafo.peso, grafo.peso, np.full(n, 1e-9)])
+    rotulos = np.arange(n)
+    for _ in range(max_iteracoes):
+        chaves, inverso = np.unique(u * n + rotulos[v], return_inverse=True)
+        somas = np.bincount(inverso, weights=w)
+        nos, candidatos = chaves // n, chaves % n
+        ordem = np.lexsort((-somas, nos))
+        nos, candidatos = nos[ordem], candidatos[ordem]
+        primeiro = np.r_[True, nos[1:] != nos[:-1]]
+        melhores = rotulos.copy()
+        melhores[nos[primeiro]] = candidatos[primeiro]
+        if np.array_equal(melhores, rotulos):
+            break
+        rotulos = np.where(rng.random(n) < 0.5, melhores, rotulos)
+    _, comunidade, tamanhos = np.unique(rotulos, return_inverse=True, return_counts=True)
+    ordem_tamanho = np.argsort(-tamanhos, kind='stable')
+    renumeracao = np.empty_like(ordem_tamanho)
+    renumeracao[ordem_tamanho] = np.arange(len(ordem_tamanho))
+    return renumeracao[comunidade]
@@ -0,0 +1,279 @@
+import os
+import sqlite3
+import argparse
+import tempfile
+import threading
+from array import array
+from itertools import islice
+
+import numpy as np
+
+from memoizacao import limitar_pasta
+
+# Versão do formato gravado; índices de outra versão são reconstruídos
+VERSAO_INDICE = 1
+
+# Pasta onde ficam os índices, um arquivo SQLite por conversa (nomeado pela impressão digital do arquivo)
+PASTA_INDICES = os.path.join('cache_analises', 'indices')
+
+# Tamanho máximo da pasta de índices; cada reexportação de uma conversa gera um índice novo, então acima dele
+# os índices usados há mais tempo são apagados
+TAMANHO_MAXIMO_MB = 1024
+
+# Mensagens tokenizadas por vez na construção; cada segmento vira um conjunto de linhas independente
+MENSAGENS_POR_SEGMENTO = 500_000
+
+# Multiplicador do id da mensagem nas chaves (mensagem, posição) das consultas de frase
+FATOR_POSICAO = 1 << 32
+
+
+# Função para separar um texto em termos, como as análises de palavras fazem (minúsculas, separadas por espaço)
+def tokenizar(texto):
+    return texto.lower().split()
+
+
+# Função para codificar inteiros não negativos em varint (7 bits por byte, o bit alto indica continuação)
+# Devolve os bytes e quantos bytes cada valor ocupou.
+def codificar_varint(valores):
+    valores = np.asarray(valores, dtype=np.uint64)
+    n_bytes = np.ones(len(valores), dtype=np.int64)
+    restante = valores >> np.uint64(7)
+    while restante.any():
+        n_bytes += restante > 0
+        restante >>= np.uint64(7)
+    fins = np.cumsum(n_bytes)
+    inicios = fins - n_bytes
+    saida = np.empty(int(fins[-1]) if len(fins) else 0, dtype=np.uint8)
+    for k in range(int(n_bytes.max()) if len(n_bytes) else 0):
+        tem = n_bytes > k
+        grupo = ((valores[tem] >> np.uint64(7 * k)) & np.uint64(0x7F)).astype(np.uint8)
+        continua = (n_bytes[tem] > k + 1).astype(np.uint8) << 7
+        saida[inicios[tem] + k] = grupo | continua
+    return saida, n_bytes
+
+
+# Função para decodificar uma sequência de varints de uma vez com o NumPy
+def decodificar_varint(dados):
+    codigos = np.frombuffer(dados, dtype=np.uint8)
+    if not len(codigos):
+        return np.zeros(0, dtype=np.int64)
+    fins = np.flatnonzero(codigos < 0x80)
+    inicios = np.r_[0, fins[:-1] + 1]
+    ordem = np.arange(len(codigos)) - np.repeat(inicios, fins - inicios + 1)
+    partes = (codigos & 0x7F).astype(np.int64) << (7 * ordem)
+    return np.add.reduceat(partes, inicios)
+
+
+# Função para transformar as ocorrências de um segmento em linhas da tabela 'termos'.
+# Para cada termo são gravados três fluxos de varints: ids das mensagens (em delta, o primeiro absoluto),
+# quantas vezes o termo aparece em cada mensagem e as posições (em delta dentro de cada mensagem).
+def linhas_segmento(segmento, termo_ids, ids, posicoes, nomes_termos):
+    if not len(termo_ids):
+        return []
+    ordem = np.argsort(termo_ids, kind='stable')
+    termo_ids, ids, posicoes = termo_ids[ordem], ids[ordem], posicoes[ordem]
+    n = len(termo_ids)
+    novo_termo = np.r_[True, termo_ids[1:] != termo_ids[:-1]]
+    novo_documento = novo_termo | np.r_[True, ids[1:] != ids[:-1]]
+
+    inicio_documentos = np.flatnonzero(novo_documento)
+    documentos = ids[inicio_documentos]
+    documento_abre_termo = novo_termo[inicio_documentos]
+    delta_documentos = np.where(documento_abre_termo, documentos, documentos - np.r_[0, documentos[:-1]])
+    contagens = np.diff(np.r_[inicio_documentos, n])
+    delta_posicoes = np.where(novo_documento, posicoes, posicoes - np.r_[0, posicoes[:-1]])
+
+    bytes_documentos, tamanhos_documentos = codificar_varint(delta_documentos)
+    bytes_contagens, tamanhos_contagens = codificar_varint(contagens)
+    bytes_posicoes, tamanhos_posicoes = codificar_varint(delta_posicoes)
+
+    # Fronteiras de cada termo, em bytes, em cada um dos três fluxos
+    limites_documentos = np.r_[np.flatnonzero(documento_abre_termo), len(documentos)]
+    limites_ocorrencias = np.r_[np.flatnonzero(novo_termo), n]
+    corte_documentos = np.r_[0, np.cumsum(tamanhos_documentos)][limites_documentos]
+    corte_contagens = np.r_[0, np.cumsum(tamanhos_contagens)][limites_documentos]
+    corte_posicoes = np.r_[0, np.cumsum(tamanhos_posicoes)][limites_ocorrencias]
+
+    linhas = []
+    for k, termo_id in enumerate(termo_ids[novo_termo].tolist()):
+        linhas.append((nomes_termos[termo_id], segmento, int(limites_documentos[k + 1] - limites_documentos[k]),
+                       bytes_documentos[corte_documentos[k]:corte_documentos[k + 1]].tobytes(),
+                       bytes_contagens[corte_contagens[k]:corte_contagens[k + 1]].tobytes(),
+                       bytes_posicoes[corte_posicoes[k]:corte_posicoes[k + 1]].tobytes()))
+    return linhas
+
+
+# Função para gravar o índice da conversa inteira em uma conexão SQLite vazia
+def gravar_indice(conexao, mensagens):
+    conversa = mensagens.completa()
+    conexao.execute('CREATE TABLE meta (chave TEXT PRIMARY KEY, valor TEXT)')
+    conexao.execute('CREATE TABLE termos (termo TEXT, segmento INTEGER, mensagens INTEGER, documentos BLOB, '
+                    'contagens BLOB, posicoes BLOB, PRIMARY KEY (termo, segmento)) WITHOUT ROWID')
+    vocabulario = {}
+    textos = conversa.textos
+    for segmento, inicio in enumerate(range(0, len(conversa), MENSAGENS_POR_SEGMENTO)):
+        termo_ids, ids, posicoes = array('q'), array('q'), array('q')
+        for id_mensagem, texto in enumerate(islice(textos, MENSAGENS_POR_SEGMENTO), inicio):
+            termos = tokenizar(texto)
+            termo_ids.extend([vocabulario.setdefault(termo, len(vocabulario)) for termo in termos])
+            ids.extend([id_mensagem] * len(termos))
+            posicoes.extend(range(len(termos)))
+        linhas = linhas_segmento(segmento, np.frombuffer(termo_ids, dtype=np.int64), np.frombuffer(ids, dtype=np.int64),
+                                 np.frombuffer(posicoes, dtype=np.int64), list(vocabulario))
+        conexao.executemany('INSERT INTO termos VALUES (?, ?, ?, ?, ?, ?)', linhas)
+    conexao.executemany('INSERT INTO meta VALUES (?, ?)', [('versao', str(VERSAO_INDICE)),
+                                                          ('impressao', str(mensagens.impressao)),
+                                                          ('mensagens', str(len(conversa)))])
+    conexao.commit()
+
+
+# Função para construir o índice em disco; o arquivo só aparece no caminho final quando está completo.
+# Cada construção grava em seu próprio arquivo temporário, na mesma pasta, para que duas construções
+# simultâneas (outro processo, ou outra Conversa do mesmo arquivo) não escrevam no mesmo banco.
+def construir_indice(mensagens, caminho):
+    descritor, temporario = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(caminho) or '.')
+    os.close(descritor)
+    try:
+        conexao = sqlite3.connect(temporario)
+        try:
+            gravar_indice(conexao, mensagens)
+        finally:
+            conexao.close()
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.remove(temporario)
+        raise
+
+
+# Índice invertido de uma conversa: termo -> mensagens em que aparece, com as posições de cada ocorrência.
+# Os ids das mensagens são as posições na conversa inteira (ordenada por timestamp), então um recorte
+# é só um intervalo de ids. As consultas custam proporcionalmente às listas de ocorrências lidas.
+class IndiceInvertido:
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self.trava = threading.Lock()
+        self.meta = dict(conexao.execute('SELECT chave, valor FROM meta'))
+
+    # Função para verificar se o índice foi construído para essa conversa, no formato atual
+    def valido_para(self, mensagens):
+        return (self.meta.get('versao') == str(VERSAO_INDICE) and self.meta.get('impressao') == str(mensagens.impressao)
+                and self.meta.get('mensagens') == str(len(mensagens.completa())))
+
+    # Função para ler as ocorrências de um termo: (ids das mensagens, ocorrências por mensagem, posições)
+    # As posições vêm agrupadas por mensagem, na mesma ordem dos ids.
+    def ocorrencias(self, termo):
+        with self.trava:
+            linhas = self.conexao.execute('SELECT documentos, contagens, posicoes FROM termos WHERE termo = ? '
+                                          'ORDER BY segmento', (termo,)).fetchall()
+        ids, contagens, posicoes = [], [], []
+        for documentos, contagens_bloco, posicoes_bloco in linhas:
+            contagens_bloco = decodificar_varint(contagens_bloco)
+            delta = decodificar_varint(posicoes_bloco)
+            acumulado = np.cumsum(delta)
+            inicios = np.r_[0, np.cumsum(contagens_bloco)[:-1]]
+            ids.append(np.cumsum(decodificar_varint(documentos)))
+            contagens.append(contagens_bloco)
+            posicoes.append(acumulado - np.repeat(acumulado[inicios] - delta[inicios], contagens_bloco))
+        if not linhas:
+            vazio = np.zeros(0, dtype=np.int64)
+            return vazio, vazio, vazio
+        return np.concatenate(ids), np.concatenate(contagens), np.concatenate(posicoes)
+
+    # Função para contar as ocorrências de um termo ou de uma expressão de várias palavras em cada mensagem
+    # Devolve (ids das mensagens, ocorrências por mensagem), com os ids em ordem crescente.
+    def frequencia(self, consulta):
+        palavras = tokenizar(consulta)
+        if not palavras:
+            vazio = np.zeros(0, dtype=np.int64)
+            return vazio, vazio
+        if len(palavras) == 1:
+            ids, contagens, _ = self.ocorrencias(palavras[0])
+            return ids, contagens
+        # A expressão ocorre onde a k-ésima palavra aparece k posições depois do início
+        chaves = None
+        for k, palavra in enumerate(palavras):
+            ids, contagens, posicoes = self.ocorrencias(palavra)
+            chaves_palavra = np.repeat(ids, contagens) * FATOR_POSICAO + posicoes - k
+            chaves = chaves_palavra if chaves is None else np.intersect1d(chaves, chaves_palavra, assume_unique=True)
+            if not len(chaves):
+                break
+        return np.unique(chaves // FATOR_POSICAO, return_counts=True)
+
+    # Função para buscar as mensagens (ids na conversa inteira) que contêm o termo ou a expressão
+    def buscar(self, consulta):
+        return self.frequencia(consulta)[0]
+
+    # Função para somar, por id de usuário, as ocorrências de uma lista de termos nas mensagens do recorte
+    # Um termo repetido na lista é contado uma vez para cada repetição.
+    def contar_por_usuario(self, mensagens, termos):
+        usuario_id = mensagens.completa().usuario_id
+        total = np.zeros(len(mensagens.nomes), dtype=np.int64)
+        for termo in termos:
+            ids, contagens = self.frequencia(termo)
+            inicio, fim = np.searchsorted(ids, [mensagens.inicio, mensagens.fim])
+            total += np.bincount(usuario_id[ids[inicio:fim]], weights=contagens[inicio:fim],
+                                 minlength=len(total)).astype(np.int64)
+        return total
+
+
+# Função para obter o índice da conversa: do cache da conversa, do disco ou construindo-o.
+# Conversas sem impressão digital (montadas em memória) têm o índice construído só em memória.
+# Threads que pedem o índice ao mesmo tempo esperam uma única construção (Conversa.derivado).
+def obter_indice(mensagens, pasta=PASTA_INDICES, tamanho_maximo_mb=TAMANHO_MAXIMO_MB):
+    return mensagens.derivado('indice_invertido', lambda: abrir_indice(mensagens, pasta, tamanho_maximo_mb))
+
+
+# Função para abrir o índice da conversa guardado no disco, construindo-o se faltar ou estiver desatualizado.
+# Abrir um índice marca o uso (data de modificação); depois de construir um, os usados há mais tempo são
+# apagados até a pasta caber em tamanho_maximo_mb, como no cache de resultados.
+def abrir_indice(mensagens, pasta, tamanho_maximo_mb=TAMANHO_MAXIMO_MB):
+    if mensagens.impressao is None:
+        conexao = sqlite3.connect(':memory:', check_same_thread=False)
+        gravar_indice(conexao, mensagens)
+        return IndiceInvertido(conexao)
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f'{mensagens.impressao}.sqlite')
+    if os.path.exists(caminho):
+        indice = IndiceInvertido(sqlite3.connect(caminho, check_same_thread=False))
+        if indice.valido_para(mensagens):
+            os.utime(caminho)
+            return indice
+        indice.conexao.close()
+    construir_indice(mensagens, caminho)
+    indice = IndiceInvertido(sqlite3.connect(caminho, check_same_thread=False))
+    limitar_pasta(pasta, tamanho_maximo_mb * 1024 * 1024, '.sqlite', manter=caminho)
+    return indice
+
+
+# Função principal: busca de texto e contagem de termos por usuário pela linha de comando
+def main(argv=None):
+    from analise_total import carregar_conversa
+
+    parser = argparse.ArgumentParser(description='Consulta o índice invertido de uma conversa exportada do WhatsApp.')
+    parser.add_argument('conversa', help='Arquivo exportado da conversa')
+    parser.add_argument('--buscar', metavar='TEXTO', help='Mostra as mensagens que contêm essa palavra ou expressão')
+    parser.add_argument('--contar', nargs='+', metavar='TERMO', help='Conta esses termos (ou expressões) por usuário')
+    parser.add_argument('--limite', type=int, default=20, help='Máximo de mensagens mostradas na busca')
+    parser.add_argument('--pasta', default=PASTA_INDICES, help='Pasta onde os índices são guardados')
+    parser.add_argument('--cache-mb', type=float, default=TAMANHO_MAXIMO_MB,
+                        help='Tamanho máximo da pasta de índices (os menos usados são apagados)')
+    parser.add_argument('--mmap', action='store_true', help='Mapeia o arquivo em memória ao carregar a conversa')
+    args = parser.parse_args(argv)
+
+    mensagens = carregar_conversa(args.conversa, args.mmap)
+    indice = obter_indice(mensagens, args.pasta, args.cache_mb)
+    if args.buscar:
+        ids = indice.buscar(args.buscar)
+        print(f'{len(ids)} mensagens contêm "{args.buscar}"')
+        for i in ids[:args.limite].tolist():
+            data, hora, usuario, texto = mensagens[i]
+            print(f'{data} {hora} - {usuario}: {texto}')
+    if args.contar:
+        contagem = indice.contar_por_usuario(mensagens, args.contar)
+        for i in np.argsort(-contagem, kind='stable'):
+            if contagem[i]:
+                print(f'{mensagens.nomes[i]}: {contagem[i]}')
+
+
+if __name__ == '__main__':
+    main()
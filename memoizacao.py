@@ -0,0 +1,211 @@
+import os
+import re
+import sys
+import json
+import pickle
+import types
+import hashlib
+import inspect
+from functools import lru_cache
+
+PASTA_RESULTADOS = os.path.join('cache_analises', 'resultados')
+
+# Tamanho máximo da pasta de resultados; acima dele os menos usados recentemente são apagados
+TAMANHO_MAXIMO_MB = 256
+
+# Pasta dos módulos do projeto: só o código daqui entra na versão de uma análise
+PASTA_PROJETO = os.path.dirname(os.path.abspath(__file__))
+
+
+# Função para calcular o sha256 de um arquivo de código do projeto (uma vez por processo)
+@lru_cache(maxsize=None)
+def hash_arquivo(caminho):
+    with open(caminho, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# Função para encontrar o arquivo de um módulo do projeto pelo nome (None para bibliotecas externas)
+def arquivo_modulo_projeto(nome_modulo):
+    caminho = os.path.join(PASTA_PROJETO, *nome_modulo.split('.')) + '.py'
+    return caminho if os.path.isfile(caminho) else None
+
+
+# Função para listar os nomes usados por um código, incluindo funções internas e compreensões
+def nomes_usados(codigo):
+    nomes = set(codigo.co_names)
+    for constante in codigo.co_consts:
+        if isinstance(constante, types.CodeType):
+            nomes |= nomes_usados(constante)
+    return nomes
+
+
+# Função para calcular a versão do código de uma análise: o seu código-fonte, o das funções auxiliares do mesmo
+# módulo que ela chama (recursivamente), as constantes simples do módulo que ela lê e o conteúdo dos arquivos
+# dos outros módulos do projeto que ela usa (importados no topo ou dentro da função). Expressões regulares
+# compiladas no módulo entram pelo padrão e pelas flags.
+# Mudar uma análise (ou algo de que ela depende) invalida só os resultados dela.
+@lru_cache(maxsize=None)
+def versao_codigo(funcao):
+    modulo = sys.modules[funcao.__module__]
+    partes = {}
+    pendentes = [funcao]
+    vistas = set()
+    while pendentes:
+        atual = pendentes.pop()
+        if atual in vistas:
+            continue
+        vistas.add(atual)
+        partes[f'fonte:{atual.__qualname__}'] = inspect.getsource(atual)
+        for nome in sorted(nomes_usados(atual.__code__)):
+            valor = getattr(modulo, nome, None)
+            origem = getattr(valor, '__module__', None)
+            if isinstance(valor, types.FunctionType) and origem == modulo.__name__:
+                pendentes.append(valor)
+            elif isinstance(valor, (bool, int, float, str, tuple)):
+                partes[f'constante:{nome}'] = repr(valor)
+            elif isinstance(valor, re.Pattern):
+                partes[f'constante:{nome}'] = repr((valor.pattern, valor.flags))
+            else:
+                nome_modulo = valor.__name__ if isinstance(valor, types.ModuleType) else origem or nome
+                caminho = arquivo_modulo_projeto(nome_modulo)
+                if caminho and nome_modulo != modulo.__name__:
+                    partes[f'modulo:{nome_modulo}'] = hash_arquivo(caminho)
+    return hashlib.sha256(json.dumps(partes, sort_keys=True).encode()).hexdigest()
+
+
+# Função para calcular a impressão digital da entrada de uma análise.
+# Para uma Conversa, a impressão do arquivo e o recorte [inicio, fim); para uma pasta de mídia, o nome,
+# tamanho e data de modificação de cada arquivo (sem ler o conteúdo). None quando a entrada não é identificável.
+def impressao_entrada(argumento):
+    if isinstance(argumento, str):
+        if not os.path.isdir(argumento):
+            return hashlib.sha256(f'sem pasta:{os.path.abspath(argumento)}'.encode()).hexdigest()
+        hash_sha = hashlib.sha256()
+        with os.scandir(argumento) as entradas:
+            for entrada in sorted(entradas, key=lambda e: e.name):
+                estado = entrada.stat()
+                hash_sha.update(f'{entrada.name}\0{estado.st_size}\0{estado.st_mtime_ns}\n'.encode())
+        return hash_sha.hexdigest()
+    impressao = getattr(argumento, 'impressao', None)
+    if impressao is None:
+        return None
+    return f'{impressao}:{argumento.inicio}:{argumento.fim}'
+
+
+# Função para calcular a versão do código que produz uma entrada: o arquivo do módulo da classe (Conversa), os
+# módulos do projeto de que ele importa funções (como colunas.py) e os das colunas (TextosMapeados com --mmap).
+# Os tipos das colunas entram também, porque o modo de carregamento muda o resultado de algumas análises
+# (a contagem de palavras mapeada só separa por espaços ASCII), e a versao_carregador da Conversa, que cobre o
+# código que leu o arquivo (processar_mensagens, carregar_conversa_mapeada, mesclar_exportacoes).
+def versao_entrada(argumento):
+    modulo = sys.modules.get(type(argumento).__module__)
+    colunas = getattr(argumento, 'colunas', ())
+    origens = {type(argumento).__module__} | {type(coluna).__module__ for coluna in colunas}
+    if modulo is not None:
+        origens |= {getattr(valor, '__module__', None) for valor in vars(modulo).values()
+                    if isinstance(valor, (types.FunctionType, type))}
+    partes = {'colunas': [f'{type(coluna).__module__}.{type(coluna).__name__}' for coluna in colunas],
+              'carregador': getattr(argumento, 'versao_carregador', None)}
+    for nome_modulo in sorted(filter(None, origens)):
+        caminho = arquivo_modulo_projeto(nome_modulo)
+        if caminho:
+            partes[f'modulo:{nome_modulo}'] = hash_arquivo(caminho)
+    return partes
+
+
+# Função para apagar os arquivos (com essa extensão) de data de modificação mais antiga até a pasta caber em
+# tamanho_maximo bytes (LRU, com o uso marcado por os.utime). O arquivo 'manter' (recém-gravado) nunca é apagado.
+def limitar_pasta(pasta, tamanho_maximo, extensao, manter=None):
+    arquivos = []
+    with os.scandir(pasta) as entradas:
+        for entrada in entradas:
+            if entrada.name.endswith(extensao):
+                try:
+                    estado = entrada.stat()
+                except FileNotFoundError:  # apagado por outra thread
+                    continue
+                arquivos.append((estado.st_mtime_ns, estado.st_size, entrada.path))
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    for _, tamanho, caminho in sorted(arquivos):
+        if total <= tamanho_maximo:
+            break
+        if manter is not None and os.path.samefile(caminho, manter):
+            continue
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+        total -= tamanho
+
+
+# Cache em disco dos resultados das análises, endereçado pelo conteúdo:
+# a chave é o hash de (entrada, nome da análise, versão do código, parâmetros). Cada resultado é um arquivo
+# pickle; ler um resultado atualiza a data de modificação, e ao gravar os arquivos mais antigos são apagados
+# até a pasta caber em tamanho_maximo_mb (LRU). As análises em 'ignorar' (como a de --detalhar, que precisa
+# rodar para ser perfilada) são sempre recalculadas e não são guardadas.
+class CacheResultados:
+    def __init__(self, pasta=PASTA_RESULTADOS, tamanho_maximo_mb=TAMANHO_MAXIMO_MB, ignorar=()):
+        self.pasta = pasta
+        self.tamanho_maximo = tamanho_maximo_mb * 1024 * 1024
+        self.ignorar = set(ignorar)
+
+    # Função para calcular a chave de uma análise sobre uma entrada (None se não puder ser guardada)
+    def chave(self, funcao, argumento, parametros=None):
+        if funcao.__name__ in self.ignorar:
+            return None
+        entrada = impressao_entrada(argumento)
+        if entrada is None:
+            return None
+        partes = [entrada, funcao.__name__, versao_codigo(funcao), versao_entrada(argumento), parametros or {}]
+        return hashlib.sha256(json.dumps(partes, sort_keys=True, default=str).encode()).hexdigest()
+
+    def caminho(self, chave):
+        return os.path.join(self.pasta, chave + '.pickle')
+
+    # Função para ler um resultado guardado (None se não existir ou estiver corrompido)
+    def ler(self, chave):
+        if chave is None:
+            return None
+        caminho = self.caminho(chave)
+        try:
+            with open(caminho, 'rb') as f:
+                resultado = pickle.load(f)
+            os.utime(caminho)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return resultado
+
+    # Função para guardar um resultado (escrita atômica) e aplicar o limite de tamanho
+    def gravar(self, chave, resultado):
+        if chave is None:
+            return
+        os.makedirs(self.pasta, exist_ok=True)
+        caminho = self.caminho(chave)
+        temporario = f'{caminho}.{os.getpid()}.tmp'
+        with open(temporario, 'wb') as f:
+            pickle.dump(resultado, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+        self.limitar_tamanho()
+
+    # Função para apagar os resultados usados há mais tempo até a pasta caber no limite
+    def limitar_tamanho(self):
+        limitar_pasta(self.pasta, self.tamanho_maximo, '.pickle')
+
+    # Função para obter o resultado de uma análise do cache ou calculá-lo e guardá-lo.
+    # Se 'registro' (do Perfilador) for informado, marca nele se o resultado veio do cache.
+    def executar(self, funcao, argumento, registro=None):
+        chave = self.chave(funcao, argumento)
+        resultado = self.ler(chave)
+        if registro is not None:
+            registro['cache'] = resultado is not None
+        if resultado is None:
+            resultado = funcao(argumento)
+            self.gravar(chave, resultado)
+        return resultado
+
+
+# Função para executar uma análise passando pelo cache, se houver um
+def executar_com_cache(cache, funcao, argumento, registro=None):
+    if cache is None:
+        return funcao(argumento)
+    return cache.executar(funcao, argumento, registro)
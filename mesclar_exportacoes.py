@@ -0,0 +1,109 @@
+import re
+import heapq
+import hashlib
+import argparse
+from datetime import date
+from itertools import groupby
+from operator import itemgetter
+
+from conversa import criar_conversa_colunas
+from memoizacao import versao_codigo
+
+# Mesmo formato de linha lido por processar_mensagens em analise_total
+PADRAO_MENSAGEM = re.compile(r'^(\d{2}/\d{2}/\d{4}) (\d{2}:\d{2}) - (.*?): (.*)$')
+
+EPOCH = date(1970, 1, 1)
+
+
+# Função para calcular a impressão digital de uma mensagem: hash do texto (o timestamp e o remetente
+# completam a chave de deduplicação)
+def hash_texto(texto):
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=16).digest()
+
+
+# Função para ler uma exportação em streaming, linha a linha.
+# Produz (timestamp, indice, data, hora, usuario, texto) na ordem do arquivo e, ao terminar, guarda em
+# impressoes[indice] o sha256 do arquivo (o mesmo de impressao_digital), calculado na mesma leitura.
+def ler_exportacao(caminho, indice, impressoes):
+    hash_sha = hashlib.sha256()
+    # Datas, horas e nomes se repetem muito: cada valor distinto vira uma única string compartilhada
+    datas, textos_horas, nomes = {}, {}, {}
+    with open(caminho, 'rb') as f:
+        for linha in f:
+            hash_sha.update(linha)
+            resultado = PADRAO_MENSAGEM.match(linha.decode('utf-8').rstrip('\r\n'))
+            if not resultado:
+                continue
+            data, hora, usuario, texto = resultado.groups()
+            if data in datas:
+                data, segundos = datas[data]
+            else:
+                dia = date(int(data[6:]), int(data[3:5]), int(data[0:2]))
+                segundos = (dia - EPOCH).days * 86400
+                datas[data] = (data, segundos)
+            hora = textos_horas.setdefault(hora, hora)
+            usuario = nomes.setdefault(usuario, usuario)
+            yield (segundos + int(hora[0:2]) * 3600 + int(hora[3:5]) * 60, indice, data, hora, usuario, texto)
+    impressoes[indice] = hash_sha.hexdigest()
+
+
+# Função para juntar várias exportações da mesma conversa sem repetir mensagens.
+# Cada exportação já está em ordem cronológica, então um merge de k vias por timestamp percorre todas em uma
+# única passada, com uma linha de cada arquivo em memória. Uma mensagem é identificada por (timestamp, remetente,
+# hash do texto); como a mesma pessoa pode mandar o mesmo texto duas vezes no mesmo minuto, cada chave aparece
+# no resultado o maior número de vezes que aparece em uma única exportação. Em 'estatisticas' (dict opcional)
+# ficam as mensagens lidas e as duplicadas descartadas.
+def mensagens_mescladas(caminhos, impressoes, estatisticas=None):
+    fluxos = [ler_exportacao(caminho, indice, impressoes) for indice, caminho in enumerate(caminhos)]
+    lidas = duplicadas = 0
+    # Em um mesmo minuto, heapq.merge mantém a ordem das exportações, e cada uma mantém a ordem do arquivo
+    for _, grupo in groupby(heapq.merge(*fluxos, key=itemgetter(0)), key=itemgetter(0)):
+        vistas_por_exportacao = {}
+        mantidas = {}
+        for _, indice, data, hora, usuario, texto in grupo:
+            lidas += 1
+            chave = (usuario, hash_texto(texto))
+            vistas = vistas_por_exportacao[chave, indice] = vistas_por_exportacao.get((chave, indice), 0) + 1
+            if vistas > mantidas.get(chave, 0):
+                mantidas[chave] = vistas
+                yield data, hora, usuario, texto
+            else:
+                duplicadas += 1
+    if estatisticas is not None:
+        estatisticas.update(lidas=lidas, duplicadas=duplicadas)
+
+
+# Função para montar uma única Conversa em colunas a partir de várias exportações sobrepostas.
+# A impressão digital da conversa mesclada é o hash das impressões dos arquivos na ordem dada: em um mesmo
+# minuto essa ordem decide a posição das mensagens, e os caches por conversa (como o índice invertido) guardam
+# posições, então só valem para a mesma sequência de exportações.
+def mesclar_exportacoes(caminhos, estatisticas=None):
+    impressoes = [None] * len(caminhos)
+    datas, horas, usuarios, textos = [], [], [], []
+    for data, hora, usuario, texto in mensagens_mescladas(caminhos, impressoes, estatisticas):
+        datas.append(data)
+        horas.append(hora)
+        usuarios.append(usuario)
+        textos.append(texto)
+    impressao = hashlib.sha256(''.join(impressoes).encode()).hexdigest()
+    return criar_conversa_colunas(datas, horas, usuarios, textos, impressao, versao_codigo(mesclar_exportacoes))
+
+
+# Função principal: grava as exportações mescladas em um novo arquivo, no mesmo formato
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Junta exportações sobrepostas da mesma conversa, sem duplicatas.')
+    parser.add_argument('exportacoes', nargs='+', help='Arquivos exportados da mesma conversa')
+    parser.add_argument('--saida', default='conversa_mesclada.txt')
+    args = parser.parse_args(argv)
+
+    estatisticas = {}
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        for data, hora, usuario, texto in mensagens_mescladas(args.exportacoes, [None] * len(args.exportacoes),
+                                                              estatisticas):
+            f.write(f'{data} {hora} - {usuario}: {texto}\n')
+    print(f"{estatisticas['lidas']} mensagens lidas, {estatisticas['duplicadas']} duplicadas descartadas, "
+          f"{estatisticas['lidas'] - estatisticas['duplicadas']} gravadas em {args.saida}")
+
+
+if __name__ == '__main__':
+    main()
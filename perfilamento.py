@@ -0,0 +1,85 @@
+import io
+import sys
+import json
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# Função para ler o pico de memória residente do processo (em MB)
+def pico_rss_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # No Linux ru_maxrss vem em KB, no macOS em bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+
+# Registra tempo de parede, tempo de CPU, crescimento do pico de memória e linhas processadas de cada análise.
+# Uma única análise (analise_detalhada) pode ser capturada também com cProfile e tracemalloc.
+# Quando várias análises rodam em threads ao mesmo tempo, relogio_cpu=time.thread_time mede só a thread atual.
+class Perfilador:
+    def __init__(self, analise_detalhada=None, top_funcoes=25, relogio_cpu=time.process_time):
+        self.analise_detalhada = analise_detalhada
+        self.top_funcoes = top_funcoes
+        self.relogio_cpu = relogio_cpu
+        self.registros = []
+
+    @contextmanager
+    def medir(self, nome, linhas=None):
+        detalhar = nome == self.analise_detalhada
+        registro = {'analise': nome, 'linhas': linhas}
+        perfil = None
+        if detalhar:
+            # cProfile, pstats e tracemalloc só são importados quando uma análise é detalhada
+            import pstats
+            import cProfile
+            import tracemalloc
+
+            tracemalloc.start()
+            perfil = cProfile.Profile()
+            perfil.enable()
+        rss_antes = pico_rss_mb()
+        cpu_antes = self.relogio_cpu()
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            registro['segundos'] = time.perf_counter() - inicio
+            registro['cpu_segundos'] = self.relogio_cpu() - cpu_antes
+            rss_depois = pico_rss_mb()
+            registro['pico_memoria_delta_mb'] = rss_depois - rss_antes if rss_antes is not None else None
+            if registro['linhas'] and registro['segundos'] > 0:
+                registro['linhas_por_segundo'] = registro['linhas'] / registro['segundos']
+            if detalhar:
+                perfil.disable()
+                _, pico = tracemalloc.get_traced_memory()
+                maiores = tracemalloc.take_snapshot().statistics('lineno')[:10]
+                tracemalloc.stop()
+                registro['tracemalloc_pico_mb'] = pico / (1024 * 1024)
+                registro['tracemalloc_maiores_alocacoes'] = [str(estatistica) for estatistica in maiores]
+                saida = io.StringIO()
+                pstats.Stats(perfil, stream=saida).sort_stats('cumulative').print_stats(self.top_funcoes)
+                registro['cprofile'] = saida.getvalue()
+            self.registros.append(registro)
+
+    # Função para salvar os registros em um arquivo JSON
+    def salvar_json(self, caminho):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump({'pico_rss_mb': pico_rss_mb(), 'analises': self.registros}, f, indent=2, ensure_ascii=False)
+
+    # Função para montar a tabela de resumo que vai ao final do relatório
+    def tabela_resumo(self):
+        total = sum(r['segundos'] for r in self.registros) or 1
+        linhas = ["Perfil de execução das análises:\n",
+                  f"{'Análise':<40}{'Parede (s)':>12}{'CPU (s)':>10}{'% total':>9}{'Δ pico MB':>11}{'Linhas':>11}\n"]
+        for r in sorted(self.registros, key=lambda r: r['segundos'], reverse=True):
+            delta = f"{r['pico_memoria_delta_mb']:.1f}" if r['pico_memoria_delta_mb'] is not None else '-'
+            processadas = r['linhas'] if r['linhas'] is not None else '-'
+            linhas.append(f"{r['analise']:<40}{r['segundos']:>12.3f}{r['cpu_segundos']:>10.3f}"
+                          f"{r['segundos'] / total * 100:>8.1f}%{delta:>11}{processadas:>11}\n")
+        return ''.join(linhas) + '\n'
@@ -0,0 +1,65 @@
+import json
+from collections import namedtuple
+
+# Resultado de uma análise:
+# - nome: identificador da análise (nome da função)
+# - dados: estrutura serializável em JSON (dicts, listas, números e textos)
+# - texto: bloco já formatado para o relatório em texto
+Resultado = namedtuple('Resultado', ['nome', 'dados', 'texto'])
+
+FORMATOS = ('txt', 'json', 'parquet')
+
+
+# Função para montar o relatório em texto a partir dos resultados
+def renderizar_texto(resultados, rodape=''):
+    return ''.join(resultado.texto for resultado in resultados) + rodape
+
+
+# Função para montar o relatório em JSON ({nome da análise: dados})
+def renderizar_json(resultados, extras=None):
+    documento = {'analises': {resultado.nome: resultado.dados for resultado in resultados}}
+    if extras:
+        documento.update(extras)
+    return json.dumps(documento, indent=2, ensure_ascii=False, default=str)
+
+
+# Função para achatar os dados de uma análise em linhas (analise, chave, valor_numero, valor_texto)
+# As chaves aninhadas são unidas com '/', por exemplo "Positivo/Fulano" ou "audios/0/bytes".
+def achatar_dados(nome, dados, prefixo=''):
+    if isinstance(dados, dict):
+        for chave, valor in dados.items():
+            yield from achatar_dados(nome, valor, f'{prefixo}/{chave}' if prefixo else str(chave))
+    elif isinstance(dados, (list, tuple)):
+        for i, valor in enumerate(dados):
+            yield from achatar_dados(nome, valor, f'{prefixo}/{i}' if prefixo else str(i))
+    elif isinstance(dados, bool) or not isinstance(dados, (int, float)):
+        yield nome, prefixo, None, None if dados is None else str(dados)
+    else:
+        yield nome, prefixo, float(dados), None
+
+
+# Função para salvar os resultados em Parquet, em formato longo (uma linha por valor)
+def salvar_parquet(caminho, resultados):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    linhas = [linha for resultado in resultados for linha in achatar_dados(resultado.nome, resultado.dados)]
+    tabela = pa.table({
+        'analise': pa.array([linha[0] for linha in linhas], pa.string()),
+        'chave': pa.array([linha[1] for linha in linhas], pa.string()),
+        'valor_numero': pa.array([linha[2] for linha in linhas], pa.float64()),
+        'valor_texto': pa.array([linha[3] for linha in linhas], pa.string()),
+    })
+    pq.write_table(tabela, caminho)
+
+
+# Função para salvar o relatório no formato escolhido com uma única escrita
+def salvar_relatorio(caminho, resultados, formato='txt', rodape='', extras=None):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato '{formato}' não suportado. Use um de: {', '.join(FORMATOS)}")
+    if formato == 'parquet':
+        salvar_parquet(caminho, resultados)
+        return
+    conteudo = renderizar_texto(resultados, rodape) if formato == 'txt' else renderizar_json(resultados, extras)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        f.write(conteudo)
@@ -0,0 +1,265 @@
+import re
+import argparse
+import unicodedata
+from collections import namedtuple
+from itertools import chain, islice
+
+import numpy as np
+
+# Rótulos de sentimento (códigos usados nos arrays) e os nomes mostrados nos relatórios
+NEGATIVO, NEUTRO, POSITIVO = -1, 0, 1
+NOMES_SENTIMENTO = {POSITIVO: 'Positivo', NEGATIVO: 'Negativo', NEUTRO: 'Neutro'}
+
+# Léxico de polaridade em português (sem acentos, como os tokens depois de normalizados), com gírias e abreviações
+LEXICO = {
+    # Positivas
+    'bom': 1, 'boa': 1, 'bons': 1, 'boas': 1, 'otimo': 1.5, 'otima': 1.5, 'legal': 1, 'massa': 1, 'top': 1,
+    'show': 1, 'bacana': 1, 'daora': 1, 'dahora': 1, 'lindo': 1, 'linda': 1, 'lindos': 1, 'lindas': 1,
+    'feliz': 1, 'felizes': 1, 'alegria': 1, 'amo': 1.5, 'amei': 2, 'adoro': 1.5, 'adorei': 2, 'gostei': 1,
+    'curti': 1, 'parabens': 2, 'obrigado': 1, 'obrigada': 1, 'obg': 1, 'brigado': 1, 'brigada': 1, 'valeu': 1,
+    'vlw': 1, 'tmj': 1, 'sucesso': 1, 'maravilha': 1.5, 'maravilhoso': 2, 'maravilhosa': 2, 'perfeito': 2,
+    'perfeita': 2, 'excelente': 2, 'sensacional': 2, 'incrivel': 2, 'fantastico': 2, 'fantastica': 2,
+    'genial': 1.5, 'amor': 1, 'querido': 1, 'querida': 1, 'fofo': 1, 'fofa': 1, 'eba': 1, 'oba': 1, 'uhul': 1,
+    'demais': 0.5, 'sim': 0.25, 'concordo': 0.5, 'melhor': 1, 'gentil': 1, 'divertido': 1, 'divertida': 1,
+    # Negativas
+    'ruim': -1, 'chato': -1, 'chata': -1, 'triste': -1, 'tristeza': -1, 'pessimo': -2, 'pessima': -2,
+    'horrivel': -2, 'odeio': -2, 'odio': -1.5, 'raiva': -1.5, 'merda': -2, 'bosta': -2, 'droga': -1, 'saco': -1,
+    'lixo': -2, 'cansado': -1, 'cansada': -1, 'cansativo': -1, 'dificil': -0.5, 'problema': -1,
+    'problemas': -1, 'errado': -1, 'errada': -1, 'pior': -1.5, 'mal': -1, 'medo': -1, 'preocupado': -1,
+    'preocupada': -1, 'chateado': -1, 'chateada': -1, 'irritado': -1.5, 'irritada': -1.5, 'decepcao': -1.5,
+    'decepcionado': -1.5, 'decepcionada': -1.5, 'aff': -1, 'affs': -1, 'afe': -1, 'pqp': -1, 'desisto': -1.5,
+    'sofrendo': -1.5, 'sofrer': -1, 'infelizmente': -1, 'lamentavel': -1.5, 'nojo': -1.5, 'idiota': -2,
+    'burro': -1.5, 'burra': -1.5, 'socorro': -1, 'odiei': -2, 'detesto': -2, 'absurdo': -1.5, 'vergonha': -1,
+}
+
+# Emojis com polaridade (as risadas são contadas à parte, por PADRAO_RISADA)
+EMOJIS = {
+    '❤': 1.5, '♥': 1.5, '😍': 1.5, '🥰': 1.5, '😘': 1, '😊': 1, '😁': 1, '😄': 1, '😃': 1, '🙂': 0.5,
+    '👏': 1, '🙏': 0.5, '🎉': 1, '🥳': 1, '👍': 1, '💪': 1, '✨': 0.5,
+    '😢': -1.5, '😭': -1.5, '😡': -2, '😠': -1.5, '🤬': -2, '👎': -1, '😞': -1, '😔': -1, '💔': -1.5,
+    '😤': -1, '😩': -1, '😫': -1, '🙄': -1,
+}
+
+# Risadas (como em pontuacao_usuarios_mais_engracados, mais as variações comuns) contam como sinal positivo
+PADRAO_RISADA = re.compile(r'k{2,}|(?:ha){2,}|ha{2,}|(?:he){2,}|(?:hue){2,}|(?:rs){2,}|rs{2,}|😂|🤣|😆',
+                           re.IGNORECASE)
+PESO_RISADA = 1.0
+
+# Negações invertem a polaridade das próximas JANELA_NEGACAO palavras; intensificadores reforçam a seguinte
+NEGACOES = {'nao', 'n', 'ñ', 'nem', 'nunca', 'jamais'}
+JANELA_NEGACAO = 3
+INTENSIFICADORES = {'muito', 'muita', 'mto', 'mt', 'super', 'mega', 'tao', 'bem', 'bastante', 'extremamente',
+                    'totalmente'}
+FATOR_INTENSIFICADOR = 1.5
+
+# Confiança mínima para aceitar o rótulo do léxico; abaixo dela a mensagem vai para o modelo
+LIMIAR_CONFIANCA = 0.5
+
+# Mensagens sem nenhum sinal e com até esse número de palavras são neutras com confiança total
+# (mais longas que isso vão para o modelo, que pode encontrar o que o léxico não conhece)
+MAX_PALAVRAS_SEM_SINAL = 8
+
+# Um sinal a cada PALAVRAS_POR_SINAL palavras basta para confiança total no rótulo
+PALAVRAS_POR_SINAL = 10
+
+# Mensagens processadas por bloco; só os arrays do bloco e a tabela de tokens distintos ficam em memória
+MENSAGENS_POR_BLOCO = 100_000
+
+# Textos enviados ao modelo por chamada
+LOTE_MODELO = 32
+
+CARACTERES_BORDA = '.,!?;:()[]{}"\'*~_-…'
+
+# Pontuação de um token distinto: polaridade do léxico e dos emojis, e se é risada, negação ou intensificador
+PontuacaoToken = namedtuple('PontuacaoToken', ['polaridade', 'risada', 'negacao', 'intensificador'])
+
+# Comparação da cascata com o modelo aplicado a todas as mensagens da amostra
+AvaliacaoCascata = namedtuple('AvaliacaoCascata', ['mensagens', 'escaladas', 'concordancia',
+                                                   'concordancia_lexico', 'confusao'])
+
+
+# Função para normalizar um token para o léxico: sem pontuação nas bordas, sem acentos
+# e com letras repetidas colapsadas ("muuuito" -> "muito")
+def normalizar_token(token):
+    token = token.strip(CARACTERES_BORDA)
+    token = ''.join(c for c in unicodedata.normalize('NFKD', token) if not unicodedata.combining(c))
+    return re.sub(r'(.)\1{2,}', r'\1', token)
+
+
+# Função para pontuar um token distinto (cada token é pontuado uma única vez por tabela)
+def pontuar_token(token):
+    normalizado = normalizar_token(token)
+    polaridade = LEXICO.get(normalizado, 0) + sum(EMOJIS.get(c, 0) for c in token)
+    return PontuacaoToken(polaridade, PESO_RISADA if PADRAO_RISADA.search(token) else 0.0,
+                          normalizado in NEGACOES, normalizado in INTENSIFICADORES)
+
+
+# Função para somar os sinais positivos e negativos de cada texto de um bloco.
+# Os tokens distintos são pontuados uma vez (e guardados em 'tabela' entre os blocos); negação e intensificação
+# são aplicadas com deslocamentos do array de tokens, sem laço por mensagem.
+# Devolve (positivo, negativo, palavras) por texto.
+def sinais_bloco(textos, tabela):
+    tokens = [texto.lower().split() for texto in textos]
+    palavras = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+    ids = {}
+    inverso = np.fromiter((ids.setdefault(token, len(ids)) for token in chain.from_iterable(tokens)),
+                          dtype=np.int64, count=int(palavras.sum()))
+    pontuacoes = [tabela[token] if token in tabela else tabela.setdefault(token, pontuar_token(token))
+                  for token in ids]
+    if not pontuacoes:
+        zeros = np.zeros(len(textos))
+        return zeros, zeros.copy(), palavras
+    polaridade, risada, negacao, intensificador = (np.array(coluna)[inverso] for coluna in zip(*pontuacoes))
+    mensagem = np.repeat(np.arange(len(textos)), palavras)
+
+    # Cada palavra é afetada pelas negações e intensificadores logo antes dela, na mesma mensagem
+    # (blocos com menos tokens que a distância não têm o que deslocar)
+    for distancia in range(1, min(JANELA_NEGACAO + 1, len(mensagem))):
+        mesma = mensagem[distancia:] == mensagem[:-distancia]
+        negada = np.zeros(len(mensagem), dtype=bool)
+        negada[distancia:] = negacao[:-distancia] & mesma
+        polaridade = np.where(negada, -polaridade, polaridade)
+        if distancia == 1:
+            intensificada = np.zeros(len(mensagem), dtype=bool)
+            intensificada[1:] = intensificador[:-1] & mesma
+            polaridade = np.where(intensificada, polaridade * FATOR_INTENSIFICADOR, polaridade)
+
+    positivo = np.bincount(mensagem, weights=np.maximum(polaridade, 0) + risada, minlength=len(textos))
+    negativo = np.bincount(mensagem, weights=np.maximum(-polaridade, 0), minlength=len(textos))
+    return positivo, negativo, palavras
+
+
+# Função para classificar os textos só pelo léxico. Devolve (rótulos, confiança), com rótulos -1/0/1.
+# A confiança é a concordância entre os sinais (1 quando todos apontam para o mesmo lado, 0 em um empate),
+# reduzida quando há poucos sinais para o tamanho da mensagem.
+def classificar_lexico(textos):
+    textos = iter(textos)
+    tabela = {}
+    rotulos, confiancas = [], []
+    while True:
+        bloco = list(islice(textos, MENSAGENS_POR_BLOCO))
+        if not bloco:
+            break
+        positivo, negativo, palavras = sinais_bloco(bloco, tabela)
+        total = positivo + negativo
+        saldo = positivo - negativo
+        rotulos.append(np.sign(saldo).astype(np.int8))
+        com_sinal = total > 0
+        concordancia = np.abs(saldo) / np.where(com_sinal, total, 1)
+        suficiencia = np.minimum(1, total * PALAVRAS_POR_SINAL / np.maximum(palavras, 1))
+        sem_sinal = np.where(palavras <= MAX_PALAVRAS_SEM_SINAL, 1.0, 0.0)
+        confiancas.append(np.where(com_sinal, concordancia * suficiencia, sem_sinal))
+    if not rotulos:
+        return np.zeros(0, dtype=np.int8), np.zeros(0)
+    return np.concatenate(rotulos), np.concatenate(confiancas)
+
+
+# Função para converter o rótulo do modelo em -1/0/1
+# (aceita estrelas, como "4 stars" do nlptown, e rótulos positive/negative/neutral)
+def rotulo_modelo(rotulo):
+    rotulo = rotulo.lower()
+    if 'star' in rotulo:
+        estrelas = int(rotulo.split()[0])
+        return POSITIVO if estrelas >= 4 else NEGATIVO if estrelas <= 2 else NEUTRO
+    if 'pos' in rotulo:
+        return POSITIVO
+    if 'neg' in rotulo:
+        return NEGATIVO
+    return NEUTRO
+
+
+# Função para classificar textos com o modelo, em lotes (até 512 caracteres por texto).
+# Um lote que falhar é refeito mensagem a mensagem; mensagens que falharem recebem None.
+def classificar_modelo(modelo, textos):
+    textos = [texto[:512] for texto in textos]
+    rotulos = []
+    for inicio in range(0, len(textos), LOTE_MODELO):
+        lote = textos[inicio:inicio + LOTE_MODELO]
+        try:
+            rotulos.extend(rotulo_modelo(saida['label']) for saida in modelo(lote))
+        except Exception:
+            for texto in lote:
+                try:
+                    rotulos.append(rotulo_modelo(modelo(texto)[0]['label']))
+                except Exception:
+                    rotulos.append(None)  # Ignorar erros na análise
+    return rotulos
+
+
+# Função para classificar os textos em cascata: o léxico rotula todas as mensagens e só as de confiança
+# abaixo do limiar vão para o modelo (carregar_modelo só é chamada se houver alguma).
+# Sem carregar_modelo, fica o rótulo do léxico. Devolve (rótulos, índices das mensagens enviadas ao modelo).
+def classificar_cascata(textos, carregar_modelo=None, limiar=LIMIAR_CONFIANCA):
+    textos = list(textos)
+    rotulos, confianca = classificar_lexico(textos)
+    if carregar_modelo is None:
+        return rotulos, np.zeros(0, dtype=np.int64)
+    escaladas = np.flatnonzero(confianca < limiar)
+    if not len(escaladas):
+        return rotulos, escaladas
+    modelo = carregar_modelo()
+    for indice, rotulo in zip(escaladas.tolist(), classificar_modelo(modelo, [textos[i] for i in escaladas])):
+        if rotulo is not None:
+            rotulos[indice] = rotulo
+    return rotulos, escaladas
+
+
+# Função para medir a cascata contra o modelo aplicado a todas as mensagens (em uma amostra, se 'amostra'
+# for dado). As mensagens escaladas recebem o mesmo rótulo do modelo, então a discordância vem só do léxico.
+# A matriz de confusão tem linhas = modelo e colunas = cascata, na ordem Negativo, Neutro, Positivo.
+def avaliar_cascata(textos, carregar_modelo, limiar=LIMIAR_CONFIANCA, amostra=None, semente=0):
+    textos = list(textos)
+    if amostra is not None and amostra < len(textos):
+        indices = np.sort(np.random.default_rng(semente).choice(len(textos), amostra, replace=False))
+        textos = [textos[i] for i in indices]
+    referencia = classificar_modelo(carregar_modelo(), textos)
+    validas = np.array([rotulo is not None for rotulo in referencia], dtype=bool)
+    referencia = np.array([NEUTRO if rotulo is None else rotulo for rotulo in referencia], dtype=np.int8)
+    rotulos, confianca = classificar_lexico(textos)
+    escaladas = confianca < limiar
+    cascata = np.where(escaladas, referencia, rotulos)
+    confusao = np.zeros((3, 3), dtype=np.int64)
+    np.add.at(confusao, (referencia[validas] + 1, cascata[validas] + 1), 1)
+    aceitas = validas & ~escaladas
+    return AvaliacaoCascata(
+        mensagens=int(validas.sum()),
+        escaladas=int((escaladas & validas).sum()),
+        concordancia=float((cascata == referencia)[validas].mean()) if validas.any() else 0.0,
+        concordancia_lexico=float((rotulos == referencia)[aceitas].mean()) if aceitas.any() else 0.0,
+        confusao=confusao)
+
+
+# Função principal: mostra quantas mensagens o léxico resolve sozinho e, com --avaliar, a concordância
+# da cascata com o modelo completo
+def main(argv=None):
+    from analise_total import carregar_conversa, carregar_modelo_sentimento
+
+    parser = argparse.ArgumentParser(description='Sentimento em cascata: léxico em português e modelo só quando necessário.')
+    parser.add_argument('conversa', help='Arquivo exportado da conversa')
+    parser.add_argument('--limiar', type=float, default=LIMIAR_CONFIANCA,
+                        help='Confiança mínima do léxico; abaixo dela a mensagem vai para o modelo')
+    parser.add_argument('--avaliar', action='store_true', help='Compara a cascata com o modelo em todas as mensagens')
+    parser.add_argument('--amostra', type=int, help='Avalia só uma amostra aleatória com esse número de mensagens')
+    args = parser.parse_args(argv)
+
+    textos = list(carregar_conversa(args.conversa).textos)
+    if args.avaliar:
+        avaliacao = avaliar_cascata(textos, carregar_modelo_sentimento, args.limiar, args.amostra)
+        print(f"Mensagens avaliadas: {avaliacao.mensagens}")
+        print(f"Enviadas ao modelo: {avaliacao.escaladas} "
+              f"({avaliacao.escaladas / max(avaliacao.mensagens, 1):.1%})")
+        print(f"Concordância da cascata com o modelo: {avaliacao.concordancia:.1%}")
+        print(f"Concordância do léxico nas mensagens que ele resolve: {avaliacao.concordancia_lexico:.1%}")
+        print("Matriz de confusão (linhas = modelo, colunas = cascata; Negativo, Neutro, Positivo):")
+        print(avaliacao.confusao)
+        return
+    rotulos, confianca = classificar_lexico(textos)
+    escaladas = int((confianca < args.limiar).sum())
+    print(f"Mensagens: {len(textos)}; resolvidas pelo léxico: {len(textos) - escaladas}; "
+          f"iriam para o modelo: {escaladas} ({escaladas / max(len(textos), 1):.1%})")
+    for codigo in (POSITIVO, NEUTRO, NEGATIVO):
+        print(f"{NOMES_SENTIMENTO[codigo]} (léxico): {int((rotulos == codigo).sum())}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from socketserver import ThreadingMixIn, UnixStreamServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import analise_total
+from memoizacao import impressao_entrada
+
+
+# Mantém conversas já processadas e resultados de análises em memória, entre requisições.
+# Uma conversa é identificada pelo caminho; o carimbo (mtime, tamanho) do arquivo invalida
+# a conversa e todos os resultados dela quando a exportação muda no disco.
+# Com mapear=True as conversas residentes guardam só os deslocamentos dos textos no arquivo mapeado.
+# A trava protege só os dicionários: carregar conversas e rodar análises acontece fora dela, então um acerto
+# no cache não espera uma análise longa. Pedidos iguais simultâneos esperam o mesmo cálculo (em_andamento).
+class EstadoServidor:
+    def __init__(self, capacidade_resultados=256, mapear=False):
+        self.capacidade_resultados = capacidade_resultados
+        self.mapear = mapear
+        self.conversas = {}
+        self.resultados = OrderedDict()
+        self.em_andamento = {}
+        self.trava = threading.Lock()
+
+    # Função para identificar a versão de um arquivo sem lê-lo
+    def carimbo(self, caminho):
+        info = os.stat(caminho)
+        return info.st_mtime_ns, info.st_size
+
+    # Função para fazer um cálculo uma única vez por chave: quem chega enquanto ele roda espera o mesmo Future
+    # (e recebe a mesma exceção, se falhar). 'calcular' deve guardar o valor no cache antes de terminar.
+    def calcular_uma_vez(self, chave, calcular):
+        with self.trava:
+            futuro = self.em_andamento.get(chave)
+            dono = futuro is None
+            if dono:
+                futuro = self.em_andamento[chave] = Future()
+        if not dono:
+            return futuro.result()
+        try:
+            valor = calcular()
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        else:
+            futuro.set_result(valor)
+            return valor
+        finally:
+            with self.trava:
+                del self.em_andamento[chave]
+
+    # Função para obter a conversa processada, reprocessando apenas se o arquivo mudou
+    def conversa(self, caminho):
+        carimbo = self.carimbo(caminho)
+        with self.trava:
+            em_memoria = self.conversas.get(caminho)
+        if em_memoria and em_memoria[0] == carimbo:
+            return carimbo, em_memoria[1]
+        return carimbo, self.calcular_uma_vez(('conversa', caminho, carimbo),
+                                              lambda: self.carregar(caminho, carimbo))
+
+    def carregar(self, caminho, carimbo):
+        mensagens = analise_total.carregar_conversa(caminho, self.mapear)
+        with self.trava:
+            self.conversas[caminho] = (carimbo, mensagens)
+            # Resultados da versão anterior deixam de valer
+            for chave in [chave for chave in self.resultados if chave[0] == caminho and chave[1] != carimbo]:
+                del self.resultados[chave]
+        return mensagens
+
+    # Função para validar o pedido e montar a entrada e a chave da análise.
+    # Erros do pedido: KeyError (análise inexistente), ValueError ou OSError (parâmetros ou arquivos inválidos).
+    # desde/ate recortam a conversa pelo índice de timestamps.
+    def preparar(self, nome, conversa=None, pasta=None, desde=None, ate=None):
+        funcao = analise_total.ANALISES_POR_NOME.get(nome)
+        if funcao is None:
+            raise KeyError(f"Análise '{nome}' não existe")
+        midia = nome in {f.__name__ for f, _ in analise_total.ANALISES_MIDIA}
+        if midia and not pasta:
+            raise ValueError(f"A análise '{nome}' precisa do parâmetro 'pasta'")
+        if not midia and not conversa:
+            raise ValueError(f"A análise '{nome}' precisa do parâmetro 'conversa'")
+
+        if midia:
+            if not os.path.isdir(pasta):
+                raise FileNotFoundError(f"Pasta '{pasta}' não existe")
+            # Nome, tamanho e mtime de cada arquivo (como no cache em disco): o mtime da pasta sozinho não
+            # muda quando um arquivo existente é regravado
+            return funcao, pasta, (os.path.abspath(pasta), impressao_entrada(pasta), nome)
+        caminho = os.path.abspath(conversa)
+        carimbo, mensagens = self.conversa(caminho)
+        if desde or ate:
+            mensagens = mensagens.intervalo(desde, ate)
+        return funcao, mensagens, (caminho, carimbo, nome, desde, ate)
+
+    # Função para responder a uma análise já preparada, usando o cache LRU de resultados
+    def executar(self, funcao, argumento, chave):
+        with self.trava:
+            if chave in self.resultados:
+                self.resultados.move_to_end(chave)
+                return self.resultados[chave], True
+
+        def calcular():
+            resultado = funcao(argumento)
+            with self.trava:
+                self.resultados[chave] = resultado
+                if len(self.resultados) > self.capacidade_resultados:
+                    self.resultados.popitem(last=False)
+            return resultado
+
+        return self.calcular_uma_vez(chave, calcular), False
+
+    # Função para responder a uma análise pelo nome
+    def analisar(self, nome, conversa=None, pasta=None, desde=None, ate=None):
+        return self.executar(*self.preparar(nome, conversa, pasta, desde, ate))
+
+
+class ManipuladorAnalises(BaseHTTPRequestHandler):
+    estado = None
+
+    def responder(self, status, corpo):
+        conteudo = json.dumps(corpo, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(conteudo)))
+        self.end_headers()
+        self.wfile.write(conteudo)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parametros = {chave: valores[0] for chave, valores in parse_qs(url.query).items()}
+        if url.path == '/analises':
+            self.responder(200, sorted(analise_total.ANALISES_POR_NOME))
+            return
+        if url.path != '/analise':
+            self.responder(404, {'erro': f'Caminho {url.path} desconhecido. Use /analises ou /analise'})
+            return
+        inicio = time.perf_counter()
+        try:
+            preparada = self.estado.preparar(parametros.get('nome'), parametros.get('conversa'),
+                                             parametros.get('pasta'), parametros.get('desde'), parametros.get('ate'))
+        except KeyError as e:
+            self.responder(404, {'erro': str(e.args[0])})
+            return
+        except (ValueError, OSError) as e:
+            self.responder(400, {'erro': str(e)})
+            return
+        except Exception as e:
+            self.responder(500, {'erro': f'{type(e).__name__}: {e}'})
+            return
+        # Qualquer erro dentro da análise é um erro do servidor, mesmo um KeyError ou ValueError interno
+        try:
+            resultado, do_cache = self.estado.executar(*preparada)
+        except Exception as e:
+            self.responder(500, {'erro': f'{type(e).__name__}: {e}'})
+            return
+        self.responder(200, {'nome': resultado.nome, 'dados': resultado.dados, 'texto': resultado.texto,
+                             'cache': do_cache, 'segundos': time.perf_counter() - inicio})
+
+    # Em socket Unix o endereço do cliente é uma string vazia
+    def address_string(self):
+        return self.client_address[0] if self.client_address else 'unix'
+
+
+class ServidorUnix(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+# Função para carregar antecipadamente os modelos pesados, que ficam residentes no processo
+def pre_carregar_modelos():
+    analise_total.carregar_modelo_sentimento()
+    analise_total.carregar_corretor_ortografico()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local que mantém conversas e modelos em memória.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--socket', help='Escuta em um socket Unix nesse caminho em vez de TCP')
+    parser.add_argument('--capacidade-cache', type=int, default=256, help='Máximo de resultados no cache LRU')
+    parser.add_argument('--conversa', action='append', default=[], help='Conversa para carregar já na inicialização')
+    parser.add_argument('--mmap', action='store_true', help='Mantém os textos das conversas em arquivos mapeados')
+    parser.add_argument('--sem-modelos', action='store_true', help='Não pré-carrega o BERT e o SpellChecker')
+    args = parser.parse_args()
+
+    ManipuladorAnalises.estado = EstadoServidor(args.capacidade_cache, args.mmap)
+    if not args.sem_modelos:
+        pre_carregar_modelos()
+    for conversa in args.conversa:
+        ManipuladorAnalises.estado.conversa(os.path.abspath(conversa))
+
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        servidor = ServidorUnix(args.socket, ManipuladorAnalises)
+        print(f'Servidor de análises em unix:{args.socket}')
+    else:
+        servidor = ThreadingHTTPServer((args.host, args.porta), ManipuladorAnalises)
+        print(f'Servidor de análises em http://{args.host}:{args.porta}')
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
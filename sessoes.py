@@ -0,0 +1,57 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Silêncio (em segundos) a partir do qual a próxima mensagem abre uma nova sessão de conversa
+INTERVALO_SESSAO_PADRAO = 3600
+
+# Segmentação da conversa em sessões:
+# - sessao_id: sessão de cada mensagem (0, 1, 2, ...)
+# - inicio: índice da primeira mensagem de cada sessão
+# - iniciador: id do usuário que abriu cada sessão
+# - tamanho: número de mensagens de cada sessão
+Sessoes = namedtuple('Sessoes', ['sessao_id', 'inicio', 'iniciador', 'tamanho'])
+
+
+# Função para dividir a conversa em sessões em uma passada vetorizada sobre os timestamps (ordenados)
+def segmentar_sessoes(timestamps, usuario_id, intervalo_max=INTERVALO_SESSAO_PADRAO):
+    timestamps = np.asarray(timestamps)
+    n = len(timestamps)
+    nova = np.empty(n, dtype=bool)
+    nova[:1] = True
+    nova[1:] = np.diff(timestamps) > intervalo_max
+    inicio = np.flatnonzero(nova)
+    sessao_id = np.cumsum(nova) - 1
+    tamanho = np.diff(np.append(inicio, n))
+    return Sessoes(sessao_id, inicio, np.asarray(usuario_id)[inicio], tamanho)
+
+
+# Função para calcular o tempo desde a última mensagem de outro usuário, para cada mensagem.
+# Devolve (índices das mensagens com resposta válida, tempos em segundos). Só conta quando essa
+# mensagem anterior está na mesma sessão; com apenas_trocas=True só as mensagens que trocam de
+# falante (a primeira de cada sequência) são consideradas.
+def tempos_resposta(timestamps, usuario_id, sessao_id, apenas_trocas=False):
+    timestamps = np.asarray(timestamps)
+    usuario_id = np.asarray(usuario_id)
+    n = len(usuario_id)
+    indices = np.arange(n)
+    troca = np.empty(n, dtype=bool)
+    troca[:1] = True
+    troca[1:] = usuario_id[1:] != usuario_id[:-1]
+    # A mensagem anterior de outro usuário é a que vem logo antes do início da sequência atual
+    inicio_sequencia = np.maximum.accumulate(np.where(troca, indices, 0))
+    anterior = inicio_sequencia - 1
+    valido = anterior >= 0
+    valido[valido] &= sessao_id[anterior[valido]] == sessao_id[valido]
+    if apenas_trocas:
+        valido &= troca
+    selecionados = indices[valido]
+    return selecionados, timestamps[selecionados] - timestamps[anterior[selecionados]]
+
+
+# Função para calcular a média de uma métrica por usuário com reduções do NumPy
+# Devolve {id do usuário: média} apenas para quem tem pelo menos um valor.
+def media_por_usuario(usuario_id, valores, n_usuarios):
+    contagem = np.bincount(usuario_id, minlength=n_usuarios)
+    soma = np.bincount(usuario_id, weights=valores, minlength=n_usuarios)
+    return {int(usuario): soma[usuario] / contagem[usuario] for usuario in np.flatnonzero(contagem)}
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# Os módulos do projeto ficam na raiz do repositório
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+LINHAS_CONVERSA = [
+    '01/01/2024 10:00 - Ana: bom dia pessoal',
+    '01/01/2024 10:01 - Bruno: bom dia! tudo bem?',
+    '01/01/2024 10:01 - Ana: kkkkk tudo ótimo',
+    '01/01/2024 10:05 - Carla: <Mídia oculta>',
+    '01/01/2024 23:59 - Bruno: alguém viu o jogo?',
+    '02/01/2024 08:00 - Carla: "bom dia pessoal"',
+    '02/01/2024 08:02 - Ana: não gostei do jogo, muito ruim',
+    '03/02/2024 12:00 - Bruno: https://exemplo.com olha isso kkkk',
+]
+
+
+# Exportação pequena no formato do Android, gravada em um arquivo temporário
+@pytest.fixture
+def arquivo_conversa(tmp_path):
+    caminho = tmp_path / 'conversa.txt'
+    caminho.write_text('\n'.join(LINHAS_CONVERSA) + '\n', encoding='utf-8')
+    return str(caminho)
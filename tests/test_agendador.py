@@ -0,0 +1,72 @@
+import pytest
+
+import agendador
+import analise_total
+from agendador import executar_concorrente
+from perfilamento import Perfilador
+
+# As análises pesadas dependem de modelos que não fazem parte dos testes
+LEVES = [nome for nome in analise_total.ANALISES_POR_NOME if nome not in agendador.ANALISES_EM_PROCESSO]
+
+
+# Algumas análises gravam índices em cache_analises/, relativo à pasta atual
+@pytest.fixture(autouse=True)
+def pasta_temporaria(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def executar_sequencial(mensagens, pasta, selecionadas):
+    perfil = Perfilador()
+    resultados = analise_total.executar_analises(mensagens, pasta, pasta, perfil, selecionadas)
+    return resultados, [registro['analise'] for registro in perfil.registros]
+
+
+def executar_em_paralelo(mensagens, pasta, selecionadas, preparar=None):
+    perfil = Perfilador()
+    resultados = executar_concorrente(lambda: mensagens, {'pasta_midia': pasta, 'pasta_audio': pasta},
+                                      analise_total.ANALISES_MIDIA, analise_total.ANALISES_TEXTO, perfil,
+                                      selecionadas, contar_arquivos=analise_total.contar_arquivos, preparar=preparar)
+    return resultados, [registro['analise'] for registro in perfil.registros]
+
+
+# O pipeline concorrente devolve os mesmos resultados, na mesma ordem, que a execução sequencial
+def test_concorrente_igual_ao_sequencial(arquivo_conversa, tmp_path):
+    mensagens = analise_total.carregar_conversa(arquivo_conversa)
+    pasta = str(tmp_path / 'midia')
+    assert executar_em_paralelo(mensagens, pasta, LEVES) == executar_sequencial(mensagens, pasta, LEVES)
+
+
+# Uma análise leve enviada a um processo separado (spawn) também dá o mesmo resultado
+def test_analise_em_processo(arquivo_conversa, tmp_path, monkeypatch):
+    monkeypatch.setattr(agendador, 'ANALISES_EM_PROCESSO', ('mensagens_por_mes',))
+    mensagens = analise_total.carregar_conversa(arquivo_conversa)
+    pasta = str(tmp_path / 'midia')
+    selecionadas = ['mensagens_por_mes', 'periodo_mais_ativo']
+    assert executar_em_paralelo(mensagens, pasta, selecionadas) == executar_sequencial(mensagens, pasta, selecionadas)
+
+
+# Carregador de um modelo que não está instalado (executado no processo de trabalho)
+def carregar_modelo_ausente():
+    raise ModuleNotFoundError('modelo_ausente')
+
+
+# Um modelo que falha ao ser adiantado não derruba o pipeline se a análise não chegar a precisar dele
+def test_falha_ao_adiantar_modelo(arquivo_conversa, tmp_path, monkeypatch):
+    monkeypatch.setattr(agendador, 'ANALISES_EM_PROCESSO', ('mensagens_por_mes',))
+    mensagens = analise_total.carregar_conversa(arquivo_conversa)
+    pasta = str(tmp_path / 'midia')
+    selecionadas = ['mensagens_por_mes']
+    preparar = {'mensagens_por_mes': carregar_modelo_ausente}
+    assert (executar_em_paralelo(mensagens, pasta, selecionadas, preparar) ==
+            executar_sequencial(mensagens, pasta, selecionadas))
+
+
+def test_sentimento_nao_e_adiantado():
+    assert 'analise_sentimento' not in analise_total.PREPARACAO_MODELOS
+
+
+@pytest.mark.parametrize('selecionadas', [[], ['figurinha_mais_usada']])
+def test_sem_analises_de_texto(arquivo_conversa, tmp_path, selecionadas):
+    mensagens = analise_total.carregar_conversa(arquivo_conversa)
+    pasta = str(tmp_path / 'midia')
+    assert executar_em_paralelo(mensagens, pasta, selecionadas) == executar_sequencial(mensagens, pasta, selecionadas)
@@ -0,0 +1,68 @@
+import os
+import random
+from collections import Counter
+
+import pytest
+
+import agregacao_externa
+from agregacao_externa import ContadorExterno, configurar, configuracao
+
+
+# Chaves simples ou tuplas (usuário, palavra), como nas análises (no modo 'disco' as chaves precisam ser ordenáveis
+# entre si, então um contador usa um único formato de chave)
+def chaves_aleatorias(n, semente=0, tuplas=False):
+    rng = random.Random(semente)
+    palavras = [f'palavra{i}' for i in range(300)]
+    if tuplas:
+        return [(f'u{rng.randrange(5)}', rng.choice(palavras)) for _ in range(n)]
+    return [rng.choice(palavras) for _ in range(n)]
+
+
+@pytest.mark.parametrize('modo', ['disco', 'sqlite'])
+@pytest.mark.parametrize('maximo_runs', [64, 3])
+@pytest.mark.parametrize('tuplas', [False, True])
+def test_despejo_igual_a_counter(monkeypatch, tmp_path, modo, maximo_runs, tuplas):
+    monkeypatch.setattr(agregacao_externa, 'MAXIMO_RUNS', maximo_runs)
+    chaves = chaves_aleatorias(5000, tuplas=tuplas)
+    extra = ('u9', 'extra') if tuplas else 'extra'
+    esperado = Counter(chaves)
+    with ContadorExterno(orcamento_mb=0.002, modo=modo, pasta=str(tmp_path)) as contador:
+        for i in range(0, len(chaves), 7):
+            contador.atualizar(chaves[i:i + 7])
+        contador.adicionar(extra, 3)
+        assert contador.temporaria is not None
+        if modo == 'disco':
+            assert len(contador.runs) < maximo_runs
+        itens = list(contador.itens())
+        assert dict(itens) == esperado + Counter({extra: 3})
+        assert len(itens) == len(dict(itens))
+        assert [total for _, total in contador.mais_comuns(10)] == \
+               [total for _, total in (esperado + Counter({extra: 3})).most_common(10)]
+    # Os arquivos temporários são apagados ao sair do 'with'
+    assert os.listdir(tmp_path) == []
+
+
+def test_sem_despejo_mantem_ordem_do_counter():
+    chaves = chaves_aleatorias(500, semente=1)
+    with ContadorExterno() as contador:
+        contador.atualizar(chaves)
+        assert list(contador.itens()) == list(Counter(chaves).items())
+        assert contador.mais_comuns(5) == Counter(chaves).most_common(5)
+        assert contador.temporaria is None
+
+
+@pytest.mark.parametrize('modo', ['disco', 'sqlite'])
+def test_contador_vazio(modo):
+    with ContadorExterno(orcamento_mb=0.001, modo=modo) as contador:
+        assert list(contador.itens()) == []
+        assert contador.mais_comuns(3) == []
+
+
+def test_configuracao_global(monkeypatch):
+    monkeypatch.setattr(agregacao_externa, 'configuracao', dict(configuracao))
+    configurar(1, 'sqlite')
+    contador = ContadorExterno()
+    assert contador.modo == 'sqlite'
+    assert contador.limite == 1024 * 1024 // agregacao_externa.BYTES_POR_CHAVE
+    with pytest.raises(ValueError):
+        configurar(1, 'memoria')
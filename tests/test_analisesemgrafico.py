@@ -0,0 +1,49 @@
+import random
+import re
+from collections import Counter
+
+import pytest
+
+from analisesemgrafico import contar_palavras, FrequenciasPalavras, palavras_mais_usadas, processar_mensagens
+
+
+def mensagens_aleatorias(n, vocabulario, semente=0):
+    rng = random.Random(semente)
+    # Distribuição de cauda longa: poucas palavras frequentes e muitas raras
+    palavras = [f'palavra{i}' for i in range(vocabulario)]
+    pesos = [1 / (i + 1) for i in range(vocabulario)]
+    return [['01/01/2024', '10:00:00', 'Ana', ' '.join(rng.choices(palavras, pesos, k=5))] for _ in range(n)]
+
+
+def contagem_exata(mensagens):
+    return Counter(palavra for m in mensagens for palavra in re.findall(r'\b\w{4,}\b', m[3].lower()))
+
+
+def test_sem_poda_e_exata():
+    mensagens = mensagens_aleatorias(500, 30)
+    contagem, erro_maximo = contar_palavras(mensagens, limite_vocabulario=100)
+    assert erro_maximo == 0
+    assert contagem == contagem_exata(mensagens)
+
+
+@pytest.mark.parametrize('limite', [5, 20, 50])
+def test_poda_respeita_o_erro_maximo(limite):
+    mensagens = mensagens_aleatorias(2000, 400, semente=limite)
+    contagem, erro_maximo = contar_palavras(mensagens, limite_vocabulario=limite)
+    exata = contagem_exata(mensagens)
+    assert erro_maximo > 0
+    assert len(contagem) <= 2 * limite
+    for palavra, total in contagem.items():
+        assert exata[palavra] - erro_maximo <= total <= exata[palavra]
+
+
+def test_frequencias_compartilham_a_contagem():
+    mensagens = mensagens_aleatorias(50, 10)
+    frequencias = FrequenciasPalavras(mensagens, limite_vocabulario=100)
+    assert frequencias.erro_maximo == 0
+    assert palavras_mais_usadas(frequencias, 3) == contagem_exata(mensagens).most_common(3)
+
+
+def test_conversa_vazia():
+    assert contar_palavras([]) == (Counter(), 0)
+    assert processar_mensagens([]) == []
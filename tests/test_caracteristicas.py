@@ -0,0 +1,84 @@
+import random
+import re
+from collections import Counter
+
+import numpy as np
+import pytest
+
+import analise_total
+import caracteristicas
+from caracteristicas import (caracteristicas_mensagens, extrair_caracteristicas, faixa_comprimento, mais_frequentes,
+                             RISADA, PERGUNTA, MIDIA, SISTEMA, CITACAO, URL, FAIXA_MUITO_LONGA)
+from conversa import criar_conversa
+
+PEDACOS = ['kk', 'KKK', 'haha', 'HAAA', 'rss', 'k', 'ha', '😂', '🤣', '?', '(arquivo anexado)', '<Mídia oculta>',
+           'WhatsApp', 'https://x.com', 'www.site', 'HTTP://X', 'oi', 'tudo bem', '"', ' ', 'ação']
+
+# Detectores originais, aplicados mensagem a mensagem
+REFERENCIA = [(RISADA, re.compile(r'(k{2,}|ha{2,}|rs{2,}|😂|🤣)', re.IGNORECASE)), (PERGUNTA, re.compile(r'\?')),
+              (MIDIA, re.compile(r'\(arquivo|<mídia', re.IGNORECASE)), (SISTEMA, re.compile('whatsapp', re.IGNORECASE)),
+              (URL, re.compile(r'https?://|www\.'))]
+
+
+def textos_aleatorios(n, semente=0):
+    rng = random.Random(semente)
+    return [''.join(rng.choice(PEDACOS) for _ in range(rng.randint(0, 4))) for _ in range(n)] + ['x' * 501, 'x' * 500]
+
+
+def conversa_de(textos):
+    return criar_conversa([['01/01/2024', '10:00', f'u{i % 3}', texto] for i, texto in enumerate(textos)])
+
+
+def referencia(texto):
+    bits = sum(bit for bit, padrao in REFERENCIA if padrao.search(texto))
+    if len(texto) >= 3 and texto[0] == '"' and texto[-1] == '"':
+        bits |= CITACAO
+    return bits, int(np.searchsorted([0, 20, 100, 500], len(texto)))
+
+
+@pytest.mark.parametrize('por_bloco', [100_000, 4, 1])
+def test_igual_a_busca_por_mensagem(monkeypatch, por_bloco):
+    monkeypatch.setattr(caracteristicas, 'MENSAGENS_POR_BLOCO', por_bloco)
+    textos = textos_aleatorios(400)
+    obtido = extrair_caracteristicas(conversa_de(textos))
+    assert [(int(c) & 0xFF, int(f)) for c, f in zip(obtido, faixa_comprimento(obtido))] == list(map(referencia, textos))
+
+
+def test_faixas_de_comprimento():
+    textos = ['', 'a', 'a' * 20, 'a' * 21, 'a' * 100, 'a' * 101, 'a' * 500, 'a' * 501]
+    assert faixa_comprimento(extrair_caracteristicas(conversa_de(textos))).tolist() == [0, 1, 1, 2, 2, 3, 3, 4]
+    assert FAIXA_MUITO_LONGA == 4
+
+
+def test_conversa_vazia():
+    assert len(caracteristicas_mensagens(criar_conversa([]))) == 0
+
+
+def test_recortes_compartilham_o_array():
+    conversa = conversa_de(textos_aleatorios(50))
+    completa = caracteristicas_mensagens(conversa)
+    assert np.array_equal(caracteristicas_mensagens(conversa[10:20]), completa[10:20])
+    assert conversa.cache['caracteristicas'] is not None
+    assert caracteristicas_mensagens(conversa[10:20]).base is conversa.cache['caracteristicas']
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_mais_frequentes_como_counter(semente):
+    ids = np.random.default_rng(semente).integers(0, 6, 40)
+    assert mais_frequentes(ids) == Counter(ids.tolist()).most_common()
+    assert mais_frequentes(np.array([], dtype=np.int64)) == []
+
+
+# As análises que usam o bitmask devolvem o mesmo que as versões mensagem a mensagem
+def test_analises_iguais_as_originais():
+    textos = textos_aleatorios(300, semente=3)
+    conversa = conversa_de(textos)
+    risada = REFERENCIA[0][1]
+    pontos = Counter()
+    for i in range(1, len(conversa)):
+        if risada.search(conversa[i][3]):
+            pontos[conversa[i - 1][2]] += 1
+    assert analise_total.pontuacao_usuarios_mais_engracados(conversa).dados == dict(pontos.most_common())
+    perguntas = Counter(m[2] for m in conversa if '?' in m[3]).most_common(1)[0]
+    assert analise_total.usuario_que_faz_mais_perguntas(conversa).dados == {'usuario': perguntas[0],
+                                                                            'perguntas': perguntas[1]}
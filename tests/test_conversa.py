@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from conversa import criar_conversa, limite_epoch
+
+
+def mensagens_aleatorias(n, semente=0):
+    rng = np.random.default_rng(semente)
+    # Segundos aleatórios em 2023-2024, fora de ordem, com minutos repetidos
+    mensagens = []
+    for i, segundos in enumerate(rng.integers(0, 2 * 365 * 86400, n) // 60 * 60):
+        momento = datetime(2023, 1, 1) + timedelta(seconds=int(segundos))
+        mensagens.append([momento.strftime('%d/%m/%Y'), momento.strftime('%H:%M'), f'u{i % 4}', f'texto {i}'])
+    return mensagens
+
+
+def momento(mensagem):
+    return datetime.strptime(f'{mensagem[0]} {mensagem[1]}', '%d/%m/%Y %H:%M')
+
+
+def test_ordena_de_forma_estavel():
+    mensagens = mensagens_aleatorias(300)
+    conversa = criar_conversa(mensagens)
+    esperado = sorted(mensagens, key=momento)
+    assert [list(m) for m in conversa] == esperado
+    assert conversa.nomes == list(dict.fromkeys(m[2] for m in esperado))
+    assert [conversa.nomes[u] for u in conversa.usuario_id] == [m[2] for m in esperado]
+
+
+@pytest.mark.parametrize('desde, ate', [(None, None), ('2023-03-01', None), (None, '2023-03-01'),
+                                        ('2023-06-10 12:30', '2024-01-01'), ('2030-01-01', None),
+                                        ('2024-02-01', '2023-01-01')])
+def test_intervalo_igual_a_filtro(desde, ate):
+    mensagens = mensagens_aleatorias(300, semente=1)
+    conversa = criar_conversa(mensagens)
+    inicio = datetime.fromisoformat(desde) if desde else datetime.min
+    # Um limite final dado só como data inclui o dia inteiro
+    fim = datetime.fromisoformat(ate) if ate else datetime.max
+    if ate and len(ate) == 10:
+        fim = fim.replace(hour=23, minute=59, second=59)
+        esperado = [m for m in sorted(mensagens, key=momento) if inicio <= momento(m) <= fim]
+    else:
+        esperado = [m for m in sorted(mensagens, key=momento) if inicio <= momento(m) < fim]
+    assert [list(m) for m in conversa.intervalo(desde, ate)] == esperado
+
+
+def test_intervalo_de_um_recorte_fica_dentro_dele():
+    conversa = criar_conversa(mensagens_aleatorias(100))
+    recorte = conversa[10:20]
+    assert [list(m) for m in recorte.intervalo()] == [list(m) for m in recorte]
+    assert len(recorte.intervalo('2000-01-01', '2100-01-01')) == 10
+
+
+@pytest.mark.parametrize('frequencia', ['mes', 'semana'])
+def test_periodos_cobrem_a_conversa(frequencia):
+    conversa = criar_conversa(mensagens_aleatorias(400, semente=2))
+    periodos = conversa.periodos(frequencia)
+    assert sum(len(recorte) for _, recorte in periodos) == len(conversa)
+    for rotulo, recorte in periodos:
+        for mensagem in recorte:
+            data = momento(mensagem).date()
+            if frequencia == 'mes':
+                assert rotulo == data.strftime('%Y-%m')
+            else:
+                # As semanas começam na segunda-feira
+                assert datetime.fromisoformat(rotulo).weekday() == 0
+                assert 0 <= (data - datetime.fromisoformat(rotulo).date()).days < 7
+    assert len({rotulo for rotulo, _ in periodos}) == len(periodos)
+
+
+def test_periodos_de_conversa_vazia_e_frequencia_invalida():
+    assert criar_conversa([]).periodos('mes') == []
+    with pytest.raises(ValueError):
+        criar_conversa(mensagens_aleatorias(3)).periodos('ano')
+
+
+def test_recortes_e_indices():
+    conversa = criar_conversa(mensagens_aleatorias(50))
+    lista = [list(m) for m in conversa]
+    assert [list(m) for m in conversa[5:12]] == lista[5:12]
+    assert list(conversa[5:12][2]) == lista[7]
+    assert list(conversa[-1]) == lista[-1]
+    assert len(conversa[30:10]) == 0
+    assert conversa[5:12].completa().fim == 50
+    with pytest.raises(IndexError):
+        conversa[50]
+    with pytest.raises(ValueError):
+        conversa[::2]
+
+
+def test_contagens_por_mensagem():
+    conversa = criar_conversa([['01/01/2024', '10:00', 'a', t] for t in ['', 'olá  mundo', '"citação"', '""', 'a b']])
+    assert conversa.comprimentos().tolist() == [0, 10, 9, 2, 3]
+    assert conversa.contagem_palavras().tolist() == [0, 2, 1, 1, 2]
+    assert conversa.entre_aspas().tolist() == [False, False, True, False, False]
+
+
+def test_limite_epoch():
+    assert limite_epoch(None) is None
+    assert limite_epoch(5) == 5
+    assert limite_epoch('1970-01-02') == 86400
+    assert limite_epoch('1970-01-01', final=True) == 86400
+    assert limite_epoch('1970-01-01 00:01') == 60
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+import duplicatas
+from duplicatas import (hashes_shingles, assinaturas_minhash, componentes, agrupar_quase_duplicatas,
+                        BASE_HASH, TAMANHO_SHINGLE)
+
+MASCARA = (1 << 64) - 1
+
+TEXTOS = ['bom dia pessoal', 'oi', '', 'kkkkkkkkkk', 'mensagem encaminhada várias vezes 😂', 'abcd', 'abcde']
+
+
+# Hash de cada trecho calculado em Python, com o mesmo polinômio módulo 2**64
+def hashes_referencia(texto, k=TAMANHO_SHINGLE):
+    texto = texto.ljust(k, '\0')
+    hashes = []
+    for inicio in range(len(texto) - k + 1):
+        h = 0
+        for caractere in texto[inicio:inicio + k]:
+            h = (h * int(BASE_HASH) + ord(caractere)) & MASCARA
+        hashes.append(h)
+    return hashes
+
+
+def test_hashes_shingles_igual_a_referencia():
+    hashes, inicios = hashes_shingles(TEXTOS)
+    fins = np.r_[inicios[1:], len(hashes)]
+    for texto, inicio, fim in zip(TEXTOS, inicios, fins):
+        assert hashes[inicio:fim].tolist() == hashes_referencia(texto), repr(texto)
+
+
+def test_assinaturas_igual_a_referencia():
+    assinaturas = assinaturas_minhash(TEXTOS, n_permutacoes=8, semente=3)
+    rng = np.random.default_rng(3)
+    a = (rng.integers(1, 2 ** 63, 8, dtype=np.uint64) | np.uint64(1)).tolist()
+    b = rng.integers(0, 2 ** 63, 8, dtype=np.uint64).tolist()
+    for i, texto in enumerate(TEXTOS):
+        esperado = [min(((a[p] * h + b[p]) & MASCARA) >> 32 for h in hashes_referencia(texto)) for p in range(8)]
+        assert assinaturas[i].tolist() == esperado
+
+
+def test_blocos_nao_mudam_as_assinaturas(monkeypatch):
+    esperado = assinaturas_minhash(TEXTOS)
+    monkeypatch.setattr(duplicatas, 'MENSAGENS_POR_BLOCO', 2)
+    assert np.array_equal(assinaturas_minhash(TEXTOS), esperado)
+
+
+# Componentes conexas por busca em largura
+def componentes_referencia(n, arestas):
+    vizinhos = [[] for _ in range(n)]
+    for u, v in arestas:
+        vizinhos[u].append(v)
+        vizinhos[v].append(u)
+    rotulos = [None] * n
+    for inicio in range(n):
+        if rotulos[inicio] is None:
+            grupo, pendentes = {inicio}, [inicio]
+            while pendentes:
+                for v in vizinhos[pendentes.pop()]:
+                    if v not in grupo:
+                        grupo.add(v)
+                        pendentes.append(v)
+            for v in grupo:
+                rotulos[v] = min(grupo)
+    return rotulos
+
+
+@pytest.mark.parametrize('semente', range(5))
+def test_componentes_igual_a_referencia(semente):
+    rng = np.random.default_rng(semente)
+    n = 60
+    arestas = rng.integers(0, n, (40, 2))
+    obtido = componentes(n, arestas[:, 0], arestas[:, 1])
+    assert obtido.tolist() == componentes_referencia(n, arestas.tolist())
+
+
+def test_agrupa_copias_e_quase_copias():
+    base = 'Pessoal, amanhã a reunião começa às 9h na sala 3, tragam o relatório impresso por favor'
+    textos = [base, 'oi gente', '  ' + base.upper() + ' ', 'nada a ver com o resto da conversa de hoje',
+              base.replace('9h', '10h'), 'oi gente']
+    grupos = agrupar_quase_duplicatas(textos).tolist()
+    assert grupos == [0, 1, 0, 3, 0, 1]
+
+
+@pytest.mark.parametrize('textos', [[], ['só uma'], ['igual', 'igual'], ['', ''], ['ab', 'cd']])
+def test_entradas_minimas(textos):
+    grupos = agrupar_quase_duplicatas(textos)
+    assert len(grupos) == len(textos)
+    assert all(grupos[i] <= i for i in range(len(textos)))
@@ -0,0 +1,60 @@
+import random
+
+import numpy as np
+import pytest
+
+import estatisticas_caracteres
+from estatisticas_caracteres import estatisticas_bloco, porcentagens_medias_por_usuario, SINAIS_PONTUACAO
+
+# Caracteres que exercitam as regras de str.istitle() e str.split(): titlecase (ǅ), letras sem caixa (ª, 中),
+# espaços Unicode, dígitos, pontuação, apóstrofo e código fora do BMP (𝐀 é maiúscula, 😂 não tem caixa)
+ALFABETO = 'aAbBéÉǅǆªß中 \t  \x1c1٣.,!?\'-😂𝐀𝐚'
+
+
+# Contagens feitas com os métodos de str, caractere a caractere
+def estatisticas_referencia(texto):
+    palavras = texto.split()
+    return (len(texto), sum(c.isupper() for c in texto), sum(c in SINAIS_PONTUACAO for c in texto),
+            sum(c.isdigit() for c in texto), sum(c.isalpha() for c in texto), len(palavras),
+            sum(palavra.istitle() for palavra in palavras))
+
+
+def comparar(textos):
+    obtido = estatisticas_bloco(textos)
+    for i, texto in enumerate(textos):
+        assert tuple(int(campo[i]) for campo in obtido) == estatisticas_referencia(texto), repr(texto)
+
+
+@pytest.mark.parametrize('textos', [
+    [], [''], ['', ''], [' '], ['Olá Mundo', 'olá', 'OLÁ', 'Ab1 Cd'], ["O'Neil Da-Silva"], ['ǅungla ǅUNGLA'],
+    ['  Bom\tDia Pessoal  '], ['😂 Kkk 𝐀bc'], ['Ab', '', 'cD'],
+])
+def test_casos_conhecidos(textos):
+    comparar(textos)
+
+
+def test_textos_aleatorios():
+    rng = random.Random(0)
+    comparar([''.join(rng.choice(ALFABETO) for _ in range(rng.randint(0, 12))) for _ in range(2000)])
+
+
+def test_sem_palavras():
+    estatisticas = estatisticas_bloco(['Olá, Mundo!'], palavras=False)
+    assert estatisticas.palavras is None and estatisticas.palavras_titulo is None
+    assert estatisticas.pontuacao.tolist() == [2]
+
+
+@pytest.mark.parametrize('por_bloco', [100_000, 3])
+def test_medias_por_usuario(monkeypatch, por_bloco):
+    monkeypatch.setattr(estatisticas_caracteres, 'MENSAGENS_POR_BLOCO', por_bloco)
+    rng = random.Random(1)
+    textos = [''.join(rng.choice(ALFABETO) for _ in range(rng.randint(0, 10))) for _ in range(100)]
+    usuario_id = np.array([rng.randrange(4) for _ in textos])
+    contagens, medias = porcentagens_medias_por_usuario(iter(textos), usuario_id, 5,
+                                                        [('maiusculas', 'caracteres'), ('palavras_titulo', 'palavras')])
+    for k, (numerador, denominador) in enumerate([(1, 0), (6, 5)]):
+        for u in range(5):
+            valores = [r[numerador] / r[denominador] * 100
+                       for r, dono in zip(map(estatisticas_referencia, textos), usuario_id) if dono == u and r[denominador]]
+            assert contagens[k, u] == len(valores)
+            assert medias[k, u] == pytest.approx(sum(valores) / len(valores) if valores else 0)
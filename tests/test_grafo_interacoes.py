@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+import grafo_interacoes
+from grafo_interacoes import Grafo, construir_grafo, comunidades, pagerank, graus
+
+
+# Implementação direta, mensagem a mensagem, do crédito descrito em construir_grafo
+def grafo_referencia(usuario_id, timestamps, n_usuarios, janela=600, meia_vida=120, max_anteriores=5):
+    matriz = np.zeros((n_usuarios, n_usuarios))
+    for i in range(len(usuario_id)):
+        vistos = set()
+        for k in range(1, max_anteriores + 1):
+            if i - k < 0:
+                break
+            anterior = usuario_id[i - k]
+            decorrido = timestamps[i] - timestamps[i - k]
+            if decorrido <= janela and anterior != usuario_id[i] and anterior not in vistos:
+                matriz[anterior, usuario_id[i]] += 2 ** (-decorrido / meia_vida)
+            vistos.add(anterior)
+    return matriz
+
+
+def como_matriz(grafo):
+    matriz = np.zeros((grafo.n_usuarios, grafo.n_usuarios))
+    np.add.at(matriz, (grafo.origem, grafo.destino), grafo.peso)
+    return matriz
+
+
+def conversa_aleatoria(n, n_usuarios, semente=0):
+    rng = np.random.default_rng(semente)
+    usuario_id = rng.integers(0, n_usuarios, n)
+    timestamps = np.cumsum(rng.integers(0, 400, n))
+    return usuario_id, timestamps
+
+
+@pytest.mark.parametrize('por_bloco, limite_densa', [(1_000_000, 4_000_000), (7, 4_000_000), (7, 0), (1, 0)])
+def test_igual_a_referencia(monkeypatch, por_bloco, limite_densa):
+    monkeypatch.setattr(grafo_interacoes, 'MENSAGENS_POR_BLOCO', por_bloco)
+    monkeypatch.setattr(grafo_interacoes, 'LIMITE_MATRIZ_DENSA', limite_densa)
+    usuario_id, timestamps = conversa_aleatoria(300, 6)
+    obtido = como_matriz(construir_grafo(usuario_id, timestamps, 6))
+    assert np.allclose(obtido, grafo_referencia(usuario_id, timestamps, 6))
+
+
+@pytest.mark.parametrize('n', [0, 1, 2])
+def test_conversas_minimas(n):
+    usuario_id, timestamps = conversa_aleatoria(n, 3)
+    grafo = construir_grafo(usuario_id, timestamps, 3)
+    assert np.allclose(como_matriz(grafo), grafo_referencia(usuario_id, timestamps, 3))
+    assert len(comunidades(grafo)) == 3
+    assert len(pagerank(grafo)) == 3
+
+
+def test_sem_usuarios():
+    grafo = construir_grafo([], [], 0)
+    assert len(comunidades(grafo)) == 0
+    assert len(pagerank(grafo)) == 0
+    assert all(len(grau) == 0 for grau in graus(grafo))
+
+
+def test_comunidades_separa_grupos():
+    # Dois pares que só conversam entre si
+    origem = np.array([0, 1, 2, 3])
+    destino = np.array([1, 0, 3, 2])
+    rotulos = comunidades(Grafo(origem, destino, np.ones(4), 4))
+    assert rotulos[0] == rotulos[1]
+    assert rotulos[2] == rotulos[3]
+    assert rotulos[0] != rotulos[2]
+
+
+def test_pagerank_soma_um():
+    usuario_id, timestamps = conversa_aleatoria(200, 5, semente=3)
+    assert np.isclose(pagerank(construir_grafo(usuario_id, timestamps, 5)).sum(), 1)
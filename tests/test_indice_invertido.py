@@ -0,0 +1,114 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+import indice_invertido
+from conversa import criar_conversa
+from indice_invertido import codificar_varint, decodificar_varint, obter_indice, tokenizar
+
+
+@pytest.mark.parametrize('valores', [[], [0], [127], [128], [0, 1, 127, 128, 16383, 16384, 2**32, 2**62]])
+def test_varint_ida_e_volta(valores):
+    dados, tamanhos = codificar_varint(valores)
+    assert decodificar_varint(dados.tobytes()).tolist() == valores
+    assert int(tamanhos.sum()) == len(dados)
+
+
+def test_varint_aleatorio():
+    valores = np.random.default_rng(0).integers(0, 2**40, 1000)
+    assert np.array_equal(decodificar_varint(codificar_varint(valores)[0].tobytes()), valores)
+
+
+def conversa_aleatoria(n, semente=0):
+    rng = random.Random(semente)
+    vocabulario = ['bom', 'dia', 'não', 'aguento', 'mais', 'vc', 'blz', 'kkk']
+    mensagens = []
+    for i in range(n):
+        texto = ' '.join(rng.choice(vocabulario) for _ in range(rng.randint(0, 8)))
+        mensagens.append([f'{1 + i // 1440:02d}/01/2024', f'{i // 60 % 24:02d}:{i % 60:02d}',
+                          rng.choice(['Ana', 'Bruno', 'Carla']), texto])
+    return criar_conversa(mensagens)
+
+
+# Ocorrências da expressão em cada mensagem, contando posição a posição
+def frequencia_referencia(conversa, consulta):
+    palavras = tokenizar(consulta)
+    contagens = {}
+    for i, texto in enumerate(conversa.textos):
+        termos = tokenizar(texto)
+        n = sum(termos[j:j + len(palavras)] == palavras for j in range(len(termos) - len(palavras) + 1))
+        if n:
+            contagens[i] = n
+    return list(contagens), list(contagens.values())
+
+
+@pytest.mark.parametrize('por_segmento', [500_000, 7])
+@pytest.mark.parametrize('consulta', ['bom', 'bom dia', 'não aguento mais', 'kkk kkk', 'inexistente', 'dia inexistente'])
+def test_frequencia_igual_a_referencia(monkeypatch, por_segmento, consulta):
+    monkeypatch.setattr(indice_invertido, 'MENSAGENS_POR_SEGMENTO', por_segmento)
+    conversa = conversa_aleatoria(300)
+    ids, contagens = obter_indice(conversa).frequencia(consulta)
+    assert (ids.tolist(), contagens.tolist()) == frequencia_referencia(conversa, consulta)
+
+
+def test_contar_por_usuario_no_recorte():
+    conversa = conversa_aleatoria(200, semente=1)
+    recorte = conversa[50:120]
+    esperado = np.zeros(len(conversa.nomes), dtype=np.int64)
+    for usuario, texto in zip(recorte.usuario_id.tolist(), recorte.textos):
+        esperado[usuario] += tokenizar(texto).count('vc') + tokenizar(texto).count('blz')
+    assert obter_indice(recorte).contar_por_usuario(recorte, ['vc', 'blz']).tolist() == esperado.tolist()
+
+
+def test_consulta_vazia():
+    ids, contagens = obter_indice(conversa_aleatoria(20)).frequencia('  ')
+    assert len(ids) == len(contagens) == 0
+
+
+def test_conversa_vazia():
+    conversa = criar_conversa([])
+    indice = obter_indice(conversa)
+    assert len(indice.buscar('bom')) == 0
+    assert indice.contar_por_usuario(conversa, ['bom']).tolist() == []
+
+
+def test_indice_em_disco_reaproveitado(tmp_path):
+    conversa = conversa_aleatoria(50)
+    conversa.impressao = 'abc'
+    indice = obter_indice(conversa, str(tmp_path))
+    assert (tmp_path / 'abc.sqlite').exists()
+    outra = conversa_aleatoria(50)
+    outra.impressao = 'abc'
+    reaberto = obter_indice(outra, str(tmp_path))
+    assert reaberto is not indice and reaberto.valido_para(outra)
+    assert np.array_equal(reaberto.buscar('bom dia'), indice.buscar('bom dia'))
+
+
+
+def indice_em_disco(pasta, impressao, semente, tamanho_maximo_mb=indice_invertido.TAMANHO_MAXIMO_MB):
+    conversa = conversa_aleatoria(200, semente)
+    conversa.impressao = impressao
+    obter_indice(conversa, str(pasta), tamanho_maximo_mb)
+    return pasta / f'{impressao}.sqlite'
+
+
+# Cada reexportação gera um índice novo; acima do limite os usados há mais tempo são apagados,
+# mas nunca o que acabou de ser construído
+def test_limite_apaga_indices_menos_usados(tmp_path):
+    pasta = tmp_path / 'indices'
+    tamanhos = {}
+    for i, impressao in enumerate(['a', 'b', 'c']):
+        caminho = indice_em_disco(pasta, impressao, i)
+        tamanhos[impressao] = caminho.stat().st_size
+        os.utime(caminho, ns=(i * 10**9, i * 10**9))
+    tamanhos['d'] = indice_em_disco(tmp_path / 'medida', 'd', 3).stat().st_size
+    # Reabrir 'a' marca o uso, então 'b' passa a ser o menos usado
+    indice_em_disco(pasta, 'a', 0)
+    limite = (tamanhos['a'] + tamanhos['c'] + tamanhos['d']) / (1024 * 1024)
+    indice_em_disco(pasta, 'd', 3, limite)
+    assert sorted(caminho.stem for caminho in pasta.glob('*.sqlite')) == ['a', 'c', 'd']
+    # Com limite zero só fica o índice recém-construído
+    indice_em_disco(pasta, 'e', 4, 0)
+    assert [caminho.stem for caminho in pasta.glob('*.sqlite')] == ['e']
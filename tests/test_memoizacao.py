@@ -0,0 +1,83 @@
+import os
+import re
+
+import analise_total
+import mesclar_exportacoes
+from memoizacao import CacheResultados, versao_codigo, versao_entrada, executar_com_cache
+
+
+def contar_mensagens(mensagens):
+    contar_mensagens.chamadas += 1
+    return len(mensagens)
+
+
+contar_mensagens.chamadas = 0
+
+
+def test_resultado_reaproveitado(arquivo_conversa, tmp_path):
+    cache = CacheResultados(str(tmp_path / 'resultados'))
+    mensagens = analise_total.carregar_conversa(arquivo_conversa)
+    antes = contar_mensagens.chamadas
+    registro = {}
+    assert executar_com_cache(cache, contar_mensagens, mensagens, registro) == 8
+    assert registro['cache'] is False
+    assert executar_com_cache(cache, contar_mensagens, mensagens, registro) == 8
+    assert registro['cache'] is True
+    assert contar_mensagens.chamadas == antes + 1
+
+
+def test_chave_distingue_recorte_e_modo_de_carregamento(arquivo_conversa, tmp_path):
+    cache = CacheResultados(str(tmp_path))
+    em_memoria = analise_total.carregar_conversa(arquivo_conversa)
+    mapeada = analise_total.carregar_conversa(arquivo_conversa, True)
+    funcao = analise_total.numero_palavras_por_pessoa
+    assert cache.chave(funcao, em_memoria) == cache.chave(funcao, em_memoria.completa())
+    assert cache.chave(funcao, em_memoria) != cache.chave(funcao, em_memoria[1:])
+    assert cache.chave(funcao, em_memoria) != cache.chave(funcao, mapeada)
+    assert 'modulo:textos_mapeados' in versao_entrada(mapeada)
+    assert 'modulo:colunas' in versao_entrada(em_memoria)
+
+
+# Mudar o código que lê o arquivo (o parser das linhas) muda a chave, mesmo com as mesmas linhas lidas
+def test_chave_cobre_o_carregador(arquivo_conversa, tmp_path, monkeypatch):
+    cache = CacheResultados(str(tmp_path))
+    funcao = analise_total.mensagens_por_mes
+    original = cache.chave(funcao, analise_total.carregar_conversa(arquivo_conversa))
+    mesclada = cache.chave(funcao, mesclar_exportacoes.mesclar_exportacoes([arquivo_conversa]))
+
+    processar = analise_total.processar_mensagens
+
+    def processar_mensagens(dados):
+        return processar(dados)
+
+    monkeypatch.setattr(analise_total, 'processar_mensagens', processar_mensagens)
+    padrao = mesclar_exportacoes.PADRAO_MENSAGEM.pattern.replace('(.*?)', '([^:]*?)')
+    monkeypatch.setattr(mesclar_exportacoes, 'PADRAO_MENSAGEM', re.compile(padrao))
+    versao_codigo.cache_clear()
+    try:
+        assert cache.chave(funcao, analise_total.carregar_conversa(arquivo_conversa)) != original
+        assert cache.chave(funcao, mesclar_exportacoes.mesclar_exportacoes([arquivo_conversa])) != mesclada
+    finally:
+        monkeypatch.undo()
+        versao_codigo.cache_clear()
+
+
+def test_analise_ignorada_sempre_recalcula(arquivo_conversa, tmp_path):
+    cache = CacheResultados(str(tmp_path), ignorar=['contar_mensagens'])
+    mensagens = analise_total.carregar_conversa(arquivo_conversa)
+    registro = {}
+    executar_com_cache(cache, contar_mensagens, mensagens, registro)
+    executar_com_cache(cache, contar_mensagens, mensagens, registro)
+    assert registro['cache'] is False
+    assert not list(tmp_path.glob('*.pickle'))
+    assert cache.chave(contar_mensagens, mensagens) is None
+
+
+def test_limite_apaga_os_menos_usados(tmp_path):
+    cache = CacheResultados(str(tmp_path), tamanho_maximo_mb=0.01)
+    for i in range(5):
+        cache.gravar(f'chave{i}', 'x' * 4000)
+        os.utime(cache.caminho(f'chave{i}'), ns=(i * 10**9, i * 10**9))
+    cache.limitar_tamanho()
+    assert cache.ler('chave4') is not None
+    assert cache.ler('chave0') is None
@@ -0,0 +1,78 @@
+import pytest
+
+import analise_total
+from benchmark.gerador import gerar_exportacao
+from conversa import criar_conversa
+from mesclar_exportacoes import mesclar_exportacoes, main
+
+
+def gravar(caminho, linhas, fim_de_linha='\n'):
+    with open(caminho, 'w', encoding='utf-8', newline='') as f:
+        f.write(''.join(linha + fim_de_linha for linha in linhas))
+    return str(caminho)
+
+
+@pytest.fixture
+def original(tmp_path):
+    caminho = gerar_exportacao(str(tmp_path / 'original.txt'), 600, semente=5)
+    with open(caminho, encoding='utf-8') as f:
+        linhas = [linha for linha in f.read().splitlines() if ' - ' in linha and ': ' in linha.split(' - ', 1)[1]]
+    return caminho, linhas
+
+
+def test_exportacoes_sobrepostas_reproduzem_a_original(tmp_path, original):
+    caminho, linhas = original
+    partes = [gravar(tmp_path / 'a.txt', linhas[:300]),
+              gravar(tmp_path / 'b.txt', linhas[200:500], '\r\n'),
+              gravar(tmp_path / 'c.txt', linhas[450:])]
+    estatisticas = {}
+    mesclada = mesclar_exportacoes(partes, estatisticas)
+    assert list(mesclada) == list(analise_total.carregar_conversa(caminho))
+    assert estatisticas == {'lidas': 300 + 300 + len(linhas) - 450, 'duplicadas': 100 + 50}
+
+
+def test_impressao_depende_da_ordem(tmp_path, original):
+    _, linhas = original
+    a = gravar(tmp_path / 'a.txt', linhas[:100])
+    b = gravar(tmp_path / 'b.txt', linhas[50:])
+    assert mesclar_exportacoes([a, b]).impressao == mesclar_exportacoes([a, b]).impressao
+    assert mesclar_exportacoes([a, b]).impressao != mesclar_exportacoes([b, a]).impressao
+    assert mesclar_exportacoes([a, b]).impressao != mesclar_exportacoes([a]).impressao
+
+
+# A mesma mensagem repetida no mesmo minuto fica o maior número de vezes que aparece em uma única exportação
+def test_repeticoes_no_mesmo_minuto(tmp_path):
+    repetida = '01/01/2024 10:00 - Ana: kkk'
+    a = gravar(tmp_path / 'a.txt', [repetida, repetida, '01/01/2024 10:00 - Bruno: kkk'])
+    b = gravar(tmp_path / 'b.txt', [repetida, '01/01/2024 10:01 - Ana: oi'])
+    mesclada = mesclar_exportacoes([a, b])
+    assert [(usuario, texto) for _, _, usuario, texto in mesclada] == \
+           [('Ana', 'kkk'), ('Ana', 'kkk'), ('Bruno', 'kkk'), ('Ana', 'oi')]
+
+
+def test_exportacoes_vazias(tmp_path):
+    vazia = gravar(tmp_path / 'vazia.txt', [])
+    assert len(mesclar_exportacoes([vazia])) == 0
+    assert len(mesclar_exportacoes([vazia, vazia])) == 0
+
+
+def test_linha_de_comando(tmp_path, original):
+    caminho, linhas = original
+    a = gravar(tmp_path / 'a.txt', linhas[:400])
+    b = gravar(tmp_path / 'b.txt', linhas[100:])
+    saida = tmp_path / 'mesclada.txt'
+    main([a, b, '--saida', str(saida)])
+    assert list(analise_total.carregar_conversa(str(saida))) == list(analise_total.carregar_conversa(caminho))
+
+
+
+# Com mensagens de exportações diferentes no mesmo minuto, a ordem dos argumentos muda as posições das
+# mensagens; o índice invertido construído para uma ordem não pode ser reaproveitado na outra
+def test_indice_nao_reaproveitado_entre_ordens(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    a = gravar(tmp_path / 'ea.txt', ['01/01/2024 10:00 - A: blz', '01/01/2024 10:00 - B: oi'])
+    b = gravar(tmp_path / 'eb.txt', ['01/01/2024 10:00 - B: oi', '01/01/2024 10:00 - C: vc'])
+    for caminhos in ([a, b], [b, a]):
+        mesclada = mesclar_exportacoes(caminhos)
+        em_memoria = criar_conversa(list(mesclada))
+        assert analise_total.uso_girias_abreviacoes(mesclada) == analise_total.uso_girias_abreviacoes(em_memoria)
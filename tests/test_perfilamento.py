@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from perfilamento import Perfilador
+
+
+def test_registro_basico():
+    perfil = Perfilador()
+    with perfil.medir('contar', 1000):
+        sum(range(10000))
+    registro, = perfil.registros
+    assert registro['analise'] == 'contar' and registro['linhas'] == 1000
+    assert registro['segundos'] >= 0 and registro['cpu_segundos'] >= 0
+    assert 'cprofile' not in registro
+
+
+# Só a análise detalhada recebe cProfile e tracemalloc
+def test_analise_detalhada():
+    perfil = Perfilador(analise_detalhada='detalhada', top_funcoes=5)
+    with perfil.medir('detalhada', 10):
+        [str(i) for i in range(1000)]
+    with perfil.medir('simples', 10):
+        pass
+    detalhada, simples = perfil.registros
+    assert 'cumulative' in detalhada['cprofile']
+    assert detalhada['tracemalloc_pico_mb'] > 0
+    assert 'tracemalloc_pico_mb' not in simples
+
+
+# O registro é gravado mesmo quando a análise falha
+def test_registro_com_excecao():
+    perfil = Perfilador()
+    with pytest.raises(ZeroDivisionError):
+        with perfil.medir('quebrada'):
+            1 / 0
+    assert [registro['analise'] for registro in perfil.registros] == ['quebrada']
+
+
+@pytest.mark.parametrize('linhas', [None, 0])
+def test_sem_linhas(linhas):
+    perfil = Perfilador()
+    with perfil.medir('vazia', linhas):
+        pass
+    assert 'linhas_por_segundo' not in perfil.registros[0]
+    assert 'vazia' in perfil.tabela_resumo()
+
+
+def test_tabela_e_json_vazios(tmp_path):
+    perfil = Perfilador()
+    assert perfil.tabela_resumo().startswith('Perfil de execução')
+    caminho = tmp_path / 'perfil.json'
+    perfil.salvar_json(caminho)
+    assert json.loads(caminho.read_text(encoding='utf-8'))['analises'] == []
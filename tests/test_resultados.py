@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from resultados import Resultado, achatar_dados, renderizar_json, renderizar_texto, salvar_relatorio
+
+RESULTADOS = [
+    Resultado('primeira', {'Ana': 3, 'Bruno': 1.5}, 'Primeira:\nAna 3\n'),
+    Resultado('segunda', {'audios': [{'nome': 'a.opus', 'bytes': 10}], 'ativo': True, 'vazio': None}, 'Segunda\n'),
+]
+
+
+def test_renderizar_texto():
+    assert renderizar_texto(RESULTADOS, 'fim\n') == 'Primeira:\nAna 3\nSegunda\nfim\n'
+    assert renderizar_texto([]) == ''
+
+
+def test_renderizar_json():
+    documento = json.loads(renderizar_json(RESULTADOS, {'perfil': []}))
+    assert documento == {'analises': {'primeira': {'Ana': 3, 'Bruno': 1.5},
+                                      'segunda': {'audios': [{'nome': 'a.opus', 'bytes': 10}], 'ativo': True,
+                                                  'vazio': None}},
+                         'perfil': []}
+    assert json.loads(renderizar_json([])) == {'analises': {}}
+
+
+# Números viram valor_numero; textos, booleanos e None ficam em valor_texto
+def test_achatar_dados():
+    assert list(achatar_dados('segunda', RESULTADOS[1].dados)) == [
+        ('segunda', 'audios/0/nome', None, 'a.opus'),
+        ('segunda', 'audios/0/bytes', 10.0, None),
+        ('segunda', 'ativo', None, 'True'),
+        ('segunda', 'vazio', None, None),
+    ]
+    assert list(achatar_dados('escalar', 7)) == [('escalar', '', 7.0, None)]
+    assert list(achatar_dados('vazia', {})) == []
+
+
+@pytest.mark.parametrize('formato', ['txt', 'json'])
+def test_salvar_relatorio(tmp_path, formato):
+    caminho = tmp_path / f'relatorio.{formato}'
+    salvar_relatorio(caminho, RESULTADOS, formato, rodape='fim\n')
+    conteudo = caminho.read_text(encoding='utf-8')
+    assert conteudo == (renderizar_texto(RESULTADOS, 'fim\n') if formato == 'txt' else renderizar_json(RESULTADOS))
+
+
+def test_formato_invalido(tmp_path):
+    with pytest.raises(ValueError):
+        salvar_relatorio(tmp_path / 'relatorio.csv', RESULTADOS, 'csv')
+    assert not (tmp_path / 'relatorio.csv').exists()
@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+import analise_total
+from analise_total import ANALISES_POR_NOME, carregar_conversa, salvar_resumo_txt, selecionar_analises
+
+
+def test_selecao_padrao_inclui_todas_em_ordem():
+    assert selecionar_analises() == list(ANALISES_POR_NOME)
+
+
+def test_apenas_e_pular():
+    assert selecionar_analises(apenas=['mensagens_por_mes', 'figurinha_mais_usada']) == [
+        'figurinha_mais_usada', 'mensagens_por_mes']
+    assert 'mensagens_por_mes' not in selecionar_analises(pular=['mensagens_por_mes'])
+    assert selecionar_analises(apenas=['mensagens_por_mes'], pular=['mensagens_por_mes']) == []
+
+
+@pytest.mark.parametrize('argumentos', [{'apenas': ['nao_existe']}, {'pular': ['nao_existe']}])
+def test_analise_desconhecida(argumentos):
+    with pytest.raises(ValueError, match='nao_existe'):
+        selecionar_analises(**argumentos)
+
+
+# O relatório só contém as análises selecionadas, na ordem do registro
+def test_relatorio_com_selecao(arquivo_conversa, tmp_path):
+    selecionadas = selecionar_analises(apenas=['periodo_mais_ativo', 'mensagens_por_mes'])
+    caminho = tmp_path / 'resumo.json'
+    resultados = salvar_resumo_txt(caminho, carregar_conversa(arquivo_conversa), str(tmp_path), str(tmp_path),
+                                   formato='json', selecionadas=selecionadas)
+    assert [resultado.nome for resultado in resultados] == ['periodo_mais_ativo', 'mensagens_por_mes']
+    documento = json.loads(caminho.read_text(encoding='utf-8'))
+    assert list(documento['analises']) == ['periodo_mais_ativo', 'mensagens_por_mes']
+    assert [registro['analise'] for registro in documento['perfil']] == list(documento['analises'])
+
+
+# O resultado de uma análise não depende de quais outras foram selecionadas
+def test_selecao_nao_altera_resultados(arquivo_conversa, tmp_path):
+    mensagens = carregar_conversa(arquivo_conversa)
+    sozinha = analise_total.executar_analises(mensagens, str(tmp_path), str(tmp_path), analise_total.Perfilador(),
+                                              ['mensagens_por_mes'])
+    juntas = analise_total.executar_analises(mensagens, str(tmp_path), str(tmp_path), analise_total.Perfilador(),
+                                             ['periodo_mais_ativo', 'mensagens_por_mes'])
+    assert sozinha == juntas[1:]
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from sentimento_lexico import (classificar_lexico, classificar_cascata, sinais_bloco,
+                               POSITIVO, NEGATIVO, NEUTRO, JANELA_NEGACAO)
+
+
+# Blocos com menos tokens que a janela de negação (0, 1 e 2 tokens) não podem quebrar os deslocamentos
+@pytest.mark.parametrize('textos', [[], [''], ['oi'], ['bom dia'], ['bom', 'ok'], ['', 'ruim']])
+def test_blocos_pequenos(textos):
+    rotulos, confiancas = classificar_lexico(textos)
+    assert len(rotulos) == len(confiancas) == len(textos)
+    positivo, negativo, palavras = sinais_bloco(textos, {})
+    assert len(positivo) == len(negativo) == len(palavras) == len(textos)
+
+
+def test_janela_maior_que_o_bloco():
+    assert JANELA_NEGACAO >= 2
+    assert classificar_lexico(['não bom'])[0].tolist() == [NEGATIVO]
+
+
+def test_polaridade_e_negacao():
+    rotulos, _ = classificar_lexico(['que dia bom', 'que dia ruim', 'não é bom', 'ok'])
+    assert rotulos.tolist() == [POSITIVO, NEGATIVO, NEGATIVO, NEUTRO]
+
+
+# A negação não atravessa a fronteira entre mensagens do mesmo bloco
+def test_negacao_nao_passa_para_a_mensagem_seguinte():
+    rotulos, _ = classificar_lexico(['não', 'bom'])
+    assert rotulos.tolist() == [NEUTRO, POSITIVO]
+
+
+def test_blocos_nao_mudam_o_resultado(monkeypatch):
+    import sentimento_lexico
+    textos = ['não é bom', 'muito bom', 'kkkk', 'que ódio', 'oi'] * 7
+    esperado = classificar_lexico(textos)
+    monkeypatch.setattr(sentimento_lexico, 'MENSAGENS_POR_BLOCO', 3)
+    obtido = classificar_lexico(textos)
+    assert np.array_equal(esperado[0], obtido[0])
+    assert np.allclose(esperado[1], obtido[1])
+
+
+def test_cascata_sem_modelo():
+    rotulos, escaladas = classificar_cascata(['bom dia', 'oi'])
+    assert rotulos.tolist() == [POSITIVO, NEUTRO]
+    assert len(escaladas) == 0
+
+
+# Só as mensagens de baixa confiança chegam ao modelo, e o rótulo dele substitui o do léxico
+def test_cascata_escala_para_o_modelo():
+    vistos = []
+
+    def modelo(lote):
+        vistos.extend(lote)
+        return [{'label': '5 stars'} for _ in lote]
+
+    textos = ['bom dia', 'bom mas ruim', 'oi']
+    rotulos, escaladas = classificar_cascata(textos, lambda: modelo)
+    assert escaladas.tolist() == [1]
+    assert vistos == ['bom mas ruim']
+    assert rotulos.tolist() == [POSITIVO, POSITIVO, NEUTRO]
+
+
+def test_cascata_nao_carrega_modelo_sem_escaladas():
+    def carregar():
+        raise AssertionError('o modelo não devia ser carregado')
+
+    assert classificar_cascata(['bom dia'], carregar)[0].tolist() == [POSITIVO]
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+import analise_total
+from resultados import Resultado
+from servidor import EstadoServidor
+
+
+@pytest.fixture
+def analises_falsas(monkeypatch):
+    chamadas = []
+
+    def lenta(mensagens):
+        chamadas.append(len(mensagens))
+        time.sleep(0.3)
+        return Resultado('lenta', {}, '')
+
+    def quebrada(mensagens):
+        return {}['interna']
+
+    analises = dict(analise_total.ANALISES_POR_NOME, lenta=lenta, quebrada=quebrada)
+    monkeypatch.setattr(analise_total, 'ANALISES_POR_NOME', analises)
+    return chamadas
+
+
+def test_resultado_vem_do_cache(arquivo_conversa):
+    estado = EstadoServidor()
+    resultado, do_cache = estado.analisar('mensagens_por_mes', arquivo_conversa)
+    assert not do_cache
+    assert estado.analisar('mensagens_por_mes', arquivo_conversa) == (resultado, True)
+
+
+def test_pedidos_iguais_calculam_uma_vez(arquivo_conversa, analises_falsas):
+    estado = EstadoServidor()
+    threads = [threading.Thread(target=estado.analisar, args=('lenta', arquivo_conversa)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert analises_falsas == [8]
+    assert estado.em_andamento == {}
+
+
+# Um acerto no cache não espera uma análise longa de outra requisição
+def test_acerto_nao_espera_analise_longa(arquivo_conversa, analises_falsas):
+    estado = EstadoServidor()
+    estado.analisar('mensagens_por_mes', arquivo_conversa)
+    lenta = threading.Thread(target=estado.analisar, args=('lenta', arquivo_conversa))
+    lenta.start()
+    time.sleep(0.05)
+    inicio = time.perf_counter()
+    assert estado.analisar('mensagens_por_mes', arquivo_conversa)[1]
+    assert time.perf_counter() - inicio < 0.2
+    lenta.join()
+
+
+def test_erros_do_pedido_e_da_analise(arquivo_conversa, analises_falsas):
+    estado = EstadoServidor()
+    with pytest.raises(KeyError, match='não existe'):
+        estado.preparar('inexistente', arquivo_conversa)
+    with pytest.raises(ValueError):
+        estado.preparar('mensagens_por_mes')
+    # O KeyError de dentro da análise não se confunde com a validação e não deixa cálculo pendente
+    preparada = estado.preparar('quebrada', arquivo_conversa)
+    with pytest.raises(KeyError, match='interna'):
+        estado.executar(*preparada)
+    assert estado.em_andamento == {}
+
+
+def test_conversa_alterada_invalida_resultados(arquivo_conversa):
+    estado = EstadoServidor()
+    estado.analisar('mensagens_por_mes', arquivo_conversa)
+    with open(arquivo_conversa, 'a', encoding='utf-8') as f:
+        f.write('04/03/2024 09:00 - Ana: mais uma\n')
+    resultado, do_cache = estado.analisar('mensagens_por_mes', arquivo_conversa)
+    assert not do_cache
+
+
+# Análises diferentes que usam o mesmo índice invertido, pedidas ao mesmo tempo em uma conversa nova,
+# constroem o índice uma única vez e não disputam o arquivo temporário
+def test_analises_simultaneas_compartilham_indice(arquivo_conversa, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    nomes = ['uso_girias_abreviacoes', 'palavras_carinhosas_por_pessoa', 'expressoes_frustracao_por_pessoa']
+    for rodada in range(5):
+        with open(arquivo_conversa, 'a', encoding='utf-8') as f:
+            f.write(f'05/03/2024 10:0{rodada} - Ana: blz vc viu, amor?\n')
+        estado = EstadoServidor()
+        largada = threading.Barrier(len(nomes))
+        respostas, erros = {}, []
+
+        def pedir(nome):
+            largada.wait()
+            try:
+                respostas[nome] = estado.analisar(nome, arquivo_conversa)[0]
+            except Exception as e:
+                erros.append(e)
+
+        threads = [threading.Thread(target=pedir, args=(nome,)) for nome in nomes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert erros == []
+        mensagens = estado.conversa(arquivo_conversa)[1]
+        assert respostas == {nome: analise_total.ANALISES_POR_NOME[nome](mensagens) for nome in nomes}
+    assert not list((tmp_path / 'cache_analises' / 'indices').glob('*.tmp'))
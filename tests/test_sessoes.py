@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from sessoes import segmentar_sessoes, tempos_resposta, media_por_usuario
+
+
+def conversa_aleatoria(n, semente=0):
+    rng = np.random.default_rng(semente)
+    timestamps = np.cumsum(rng.choice([0, 30, 600, 5000], n))
+    return timestamps, rng.integers(0, 3, n)
+
+
+# Percorre as mensagens uma a uma, como as versões originais das análises
+def referencia(timestamps, usuario_id, intervalo, apenas_trocas):
+    sessao, sessoes, indices, tempos = -1, [], [], []
+    for i in range(len(timestamps)):
+        if i == 0 or timestamps[i] - timestamps[i - 1] > intervalo:
+            sessao += 1
+        sessoes.append(sessao)
+        if apenas_trocas and i > 0 and usuario_id[i] == usuario_id[i - 1]:
+            continue
+        j = i - 1
+        while j >= 0 and usuario_id[j] == usuario_id[i]:
+            j -= 1
+        if j >= 0 and sessoes[j] == sessao:
+            indices.append(i)
+            tempos.append(timestamps[i] - timestamps[j])
+    return sessoes, indices, tempos
+
+
+@pytest.mark.parametrize('n', [0, 1, 2, 500])
+@pytest.mark.parametrize('apenas_trocas', [False, True])
+def test_igual_a_referencia(n, apenas_trocas):
+    timestamps, usuario_id = conversa_aleatoria(n)
+    sessoes = segmentar_sessoes(timestamps, usuario_id, 3600)
+    indices, tempos = tempos_resposta(timestamps, usuario_id, sessoes.sessao_id, apenas_trocas)
+    esperado = referencia(timestamps, usuario_id, 3600, apenas_trocas)
+    assert (sessoes.sessao_id.tolist(), indices.tolist(), tempos.tolist()) == esperado
+    assert sessoes.tamanho.sum() == n
+    assert sessoes.iniciador.tolist() == [usuario_id[i] for i in sessoes.inicio]
+
+
+def test_sessoes_pelo_intervalo():
+    sessoes = segmentar_sessoes([0, 10, 3611, 3612, 10000], [0, 1, 1, 0, 2], intervalo_max=3600)
+    assert sessoes.sessao_id.tolist() == [0, 0, 1, 1, 2]
+    assert sessoes.inicio.tolist() == [0, 2, 4]
+    assert sessoes.iniciador.tolist() == [0, 1, 2]
+    assert sessoes.tamanho.tolist() == [2, 2, 1]
+
+
+def test_media_por_usuario():
+    assert media_por_usuario(np.array([0, 2, 2]), np.array([1.0, 2.0, 4.0]), 4) == {0: 1.0, 2: 3.0}
+    assert media_por_usuario(np.array([], dtype=np.int64), np.array([]), 3) == {}
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+import analise_total
+import textos_mapeados
+from benchmark.gerador import gerar_exportacao
+
+# Textos com acentos, emojis, espaços ASCII variados e aspas
+LINHAS = ['bom dia', '', 'olá  mundo\tcom tab', '"citação inteira"', '""', '😂😂 kkk', ' espaço no início ',
+          'ação é ótima', '"a"', 'x']
+
+
+@pytest.fixture
+def arquivo_variado(tmp_path):
+    caminho = tmp_path / 'variado.txt'
+    linhas = [f'01/01/2024 10:{i:02d} - Usuário {i % 3}: {texto}' for i, texto in enumerate(LINHAS)]
+    caminho.write_text('\n'.join(linhas) + '\n', encoding='utf-8')
+    return str(caminho)
+
+
+def comparar(em_memoria, mapeada):
+    assert list(mapeada) == list(em_memoria)
+    assert np.array_equal(mapeada.comprimentos(), em_memoria.comprimentos())
+    assert np.array_equal(mapeada.contagem_palavras(), em_memoria.contagem_palavras())
+    assert np.array_equal(mapeada.entre_aspas(), em_memoria.entre_aspas())
+    assert [mapeada.texto(i) for i in range(len(mapeada))] == list(em_memoria.textos)
+
+
+@pytest.mark.parametrize('por_bloco', [100_000, 3, 1])
+def test_mapeada_igual_a_em_memoria(monkeypatch, arquivo_variado, por_bloco):
+    monkeypatch.setattr(textos_mapeados, 'MENSAGENS_POR_BLOCO', por_bloco)
+    em_memoria = analise_total.carregar_conversa(arquivo_variado)
+    mapeada = analise_total.carregar_conversa(arquivo_variado, True)
+    comparar(em_memoria, mapeada)
+    comparar(em_memoria[2:7], mapeada[2:7])
+    comparar(em_memoria[5:5], mapeada[5:5])
+
+
+def test_exportacao_sintetica(tmp_path):
+    caminho = gerar_exportacao(str(tmp_path / 'sintetica.txt'), 500, semente=7)
+    comparar(analise_total.carregar_conversa(caminho), analise_total.carregar_conversa(caminho, True))
+
+
+def test_arquivo_vazio(tmp_path):
+    caminho = tmp_path / 'vazio.txt'
+    caminho.write_text('', encoding='utf-8')
+    mapeada = analise_total.carregar_conversa(str(caminho), True)
+    assert len(mapeada) == 0
+    assert len(mapeada.comprimentos()) == len(mapeada.contagem_palavras()) == len(mapeada.entre_aspas()) == 0
+
+
+# A contagem mapeada só separa por espaços ASCII (documentado em contagem_palavras)
+def test_espacos_unicode_nao_separam_palavras(tmp_path):
+    caminho = tmp_path / 'nbsp.txt'
+    caminho.write_text('01/01/2024 10:00 - Ana: a\u00a0b c\n', encoding='utf-8')
+    assert analise_total.carregar_conversa(str(caminho), True).contagem_palavras().tolist() == [2]
+    assert analise_total.carregar_conversa(str(caminho)).contagem_palavras().tolist() == [3]
+
+
+# Na conversa mapeada, estas análises trabalham sobre os arrays: numero_palavras_por_pessoa não decodifica
+# nenhum texto e mensagens_mais_citadas decodifica só as mensagens entre aspas
+def test_analises_sem_decodificar(monkeypatch, arquivo_variado):
+    decodificadas = []
+    iterar, ler = textos_mapeados.TextosMapeados.iterar, textos_mapeados.TextosMapeados.__getitem__
+
+    def iterar_contando(self, inicio, fim):
+        decodificadas.extend(range(inicio, fim))
+        return iterar(self, inicio, fim)
+
+    def ler_contando(self, indice):
+        decodificadas.append(indice)
+        return ler(self, indice)
+
+    monkeypatch.setattr(textos_mapeados.TextosMapeados, 'iterar', iterar_contando)
+    monkeypatch.setattr(textos_mapeados.TextosMapeados, '__getitem__', ler_contando)
+    mapeada = analise_total.carregar_conversa(arquivo_variado, True)
+    em_memoria = analise_total.carregar_conversa(arquivo_variado)
+    assert analise_total.numero_palavras_por_pessoa(mapeada) == analise_total.numero_palavras_por_pessoa(em_memoria)
+    assert decodificadas == []
+    assert analise_total.mensagens_mais_citadas(mapeada) == analise_total.mensagens_mais_citadas(em_memoria)
+    assert sorted(decodificadas) == np.flatnonzero(em_memoria.entre_aspas()).tolist()
@@ -0,0 +1,93 @@
+import numpy as np
+
+# Espaços em branco ASCII que str.split() também considera separadores
+ESPACOS_ASCII = np.zeros(256, dtype=bool)
+ESPACOS_ASCII[[9, 10, 11, 12, 13, 28, 29, 30, 31, 32]] = True
+
+# Mensagens processadas por bloco nas operações vetorizadas, para limitar os arrays temporários
+MENSAGENS_POR_BLOCO = 100_000
+
+
+# Coluna de textos que aponta para um arquivo mapeado em memória (mmap).
+# Cada mensagem é um par (deslocamento, tamanho em bytes) no arquivo; o texto só é decodificado
+# quando alguém lê aquela mensagem. Comprimentos, contagem de palavras e detecção de citações
+# são calculados direto sobre os bytes com o NumPy, sem criar strings.
+class TextosMapeados:
+    def __init__(self, mapa, deslocamentos, tamanhos):
+        self.mapa = mapa
+        self.bytes = np.frombuffer(mapa, dtype=np.uint8) if len(mapa) else np.zeros(0, dtype=np.uint8)
+        self.deslocamentos = np.asarray(deslocamentos, dtype=np.int64)
+        self.tamanhos = np.asarray(tamanhos, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.deslocamentos)
+
+    def __getitem__(self, indice):
+        inicio = int(self.deslocamentos[indice])
+        return self.mapa[inicio:inicio + int(self.tamanhos[indice])].decode('utf-8')
+
+    def __iter__(self):
+        return self.iterar(0, len(self))
+
+    # Função para decodificar, sob demanda, os textos das mensagens [inicio, fim)
+    def iterar(self, inicio, fim):
+        mapa = self.mapa
+        for deslocamento, tamanho in zip(self.deslocamentos[inicio:fim].tolist(), self.tamanhos[inicio:fim].tolist()):
+            yield mapa[deslocamento:deslocamento + tamanho].decode('utf-8')
+
+    # Função para obter a mesma coluna em outra ordem (usada ao ordenar a conversa por timestamp)
+    def reordenar(self, ordem):
+        return TextosMapeados(self.mapa, self.deslocamentos[ordem], self.tamanhos[ordem])
+
+    # Função para somar, por mensagem, uma marcação calculada sobre os bytes de cada bloco de mensagens.
+    # marcar recebe o trecho de bytes do bloco (com 'contexto' bytes extras antes) e devolve uma marca por byte.
+    def somar_por_mensagem(self, deslocamentos, tamanhos, marcar, contexto=0):
+        somas = np.zeros(len(deslocamentos), dtype=np.int64)
+        for bloco in range(0, len(deslocamentos), MENSAGENS_POR_BLOCO):
+            deslocamentos_bloco = deslocamentos[bloco:bloco + MENSAGENS_POR_BLOCO]
+            tamanhos_bloco = tamanhos[bloco:bloco + MENSAGENS_POR_BLOCO]
+            base = int(deslocamentos_bloco.min())
+            limite = int((deslocamentos_bloco + tamanhos_bloco).max())
+            marcas = marcar(self.bytes[base - contexto:limite])
+            acumulado = np.zeros(limite - base + 1, dtype=np.int64)
+            np.cumsum(marcas, out=acumulado[1:])
+            locais = deslocamentos_bloco - base
+            somas[bloco:bloco + len(locais)] = acumulado[locais + tamanhos_bloco] - acumulado[locais]
+        return somas
+
+    # Função para calcular o comprimento em caracteres das mensagens [inicio, fim):
+    # em UTF-8, cada caractere tem exatamente um byte que não é de continuação (10xxxxxx)
+    def comprimentos(self, inicio, fim):
+        return self.somar_por_mensagem(self.deslocamentos[inicio:fim], self.tamanhos[inicio:fim],
+                                       lambda trecho: (trecho & 0xC0) != 0x80)
+
+    # Função para contar as palavras (como str.split(), separando só por espaços ASCII) das mensagens [inicio, fim)
+    # Uma palavra começa em um byte que não é espaço precedido por um espaço, ou no primeiro byte da mensagem.
+    def contagem_palavras(self, inicio, fim):
+        deslocamentos = self.deslocamentos[inicio:fim]
+        tamanhos = self.tamanhos[inicio:fim]
+        com_texto = tamanhos > 0
+        primeiro = np.zeros(len(deslocamentos), dtype=bool)
+        primeiro[com_texto] = ~ESPACOS_ASCII[self.bytes[deslocamentos[com_texto]]]
+
+        def inicios_de_palavra(trecho):
+            espaco = ESPACOS_ASCII[trecho]
+            return ~espaco[1:] & espaco[:-1]
+
+        # Do segundo byte em diante, o byte anterior sempre pertence à própria mensagem
+        resto = self.somar_por_mensagem(deslocamentos[com_texto] + 1, tamanhos[com_texto] - 1,
+                                        inicios_de_palavra, contexto=1)
+        contagem = primeiro.astype(np.int64)
+        contagem[com_texto] += resto
+        return contagem
+
+    # Função para marcar as mensagens [inicio, fim) que estão entre aspas duplas ("...")
+    def entre_aspas(self, inicio, fim):
+        deslocamentos = self.deslocamentos[inicio:fim]
+        tamanhos = self.tamanhos[inicio:fim]
+        candidatas = tamanhos >= 3
+        marcadas = np.zeros(len(deslocamentos), dtype=bool)
+        primeiro = self.bytes[deslocamentos[candidatas]]
+        ultimo = self.bytes[deslocamentos[candidatas] + tamanhos[candidatas] - 1]
+        marcadas[candidatas] = (primeiro == ord('"')) & (ultimo == ord('"'))
+        return marcadas